@@ -0,0 +1,292 @@
+"""In-process micro-benchmarks for the CRUD layer.
+
+Usage:
+    python benchmarks/bench_crud.py --sizes 10k,100k --output results.json
+    python benchmarks/bench_crud.py --sizes 10k --compare previous.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.corpus import (
+    CORPUS_SIZES, DEFAULT_SEED, WORDS, LANGUAGES, build_corpus, corpus_dir
+)
+from src.config import settings
+from src.database import init_db
+from src.crud import (
+    create_snippet, get_snippet, search_snippets, update_snippet, delete_snippet
+)
+from src.schemas import SnippetCreate, SnippetUpdate
+
+RESULT_SCHEMA_VERSION = 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100.0 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(name: str, corpus_size: int, samples_ns: List[int], rows: int) -> Dict:
+    """Turn raw timings into the JSON result record."""
+    samples_ms = sorted(s / 1e6 for s in samples_ns)
+    total_s = sum(samples_ns) / 1e9
+    return {
+        "benchmark": name,
+        "corpus_size": corpus_size,
+        "iterations": len(samples_ms),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4),
+        "min_ms": round(samples_ms[0], 4),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p95_ms": round(percentile(samples_ms, 95), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "max_ms": round(samples_ms[-1], 4),
+        "ops_per_sec": round(len(samples_ms) / total_s, 2) if total_s else 0.0,
+        "rows_per_sec": round(rows / total_s, 2) if total_s else 0.0,
+    }
+
+
+async def measure(
+    fn: Callable[[int], Awaitable[int]],
+    iterations: int,
+    warmup: int
+) -> tuple:
+    """Run `fn(i)` repeatedly; it returns the number of rows it touched."""
+    for i in range(warmup):
+        await fn(i)
+    samples = []
+    rows = 0
+    for i in range(warmup, warmup + iterations):
+        start = time.perf_counter_ns()
+        rows += await fn(i)
+        samples.append(time.perf_counter_ns() - start)
+    return samples, rows
+
+
+def _live_ids(db_path: Path) -> List[int]:
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute(
+            "SELECT id FROM snippets WHERE deleted_at IS NULL ORDER BY id"
+        )]
+    finally:
+        conn.close()
+
+
+def _read_benchmarks(rng: random.Random, ids: List[int]) -> Dict[str, Callable]:
+    deep_page = max(1, (len(ids) // 20) * 9 // 10)
+
+    async def get_by_id(i):
+        return 1 if await get_snippet(rng.choice(ids)) else 0
+
+    async def search_all(i):
+        items, _ = await search_snippets(page=1, page_size=20)
+        return len(items)
+
+    async def search_fts(i):
+        items, _ = await search_snippets(query=rng.choice(WORDS), page=1, page_size=20)
+        return len(items)
+
+    async def search_tag(i):
+        items, _ = await search_snippets(tag=rng.choice(LANGUAGES), page=1, page_size=20)
+        return len(items)
+
+    async def search_combined(i):
+        items, _ = await search_snippets(
+            query=rng.choice(WORDS), tag=rng.choice(LANGUAGES), page=1, page_size=20
+        )
+        return len(items)
+
+    async def search_deep_page(i):
+        items, _ = await search_snippets(page=deep_page, page_size=20)
+        return len(items)
+
+    return {
+        "get_snippet": get_by_id,
+        "search.no_filter": search_all,
+        "search.fts": search_fts,
+        "search.tag": search_tag,
+        "search.combined": search_combined,
+        "search.deep_page": search_deep_page,
+    }
+
+
+def _write_benchmarks(rng: random.Random, ids: List[int], run_tag: str) -> Dict[str, Callable]:
+    # Each write benchmark consumes its own ids so they never collide
+    update_ids = ids[: len(ids) // 2]
+    delete_ids = ids[len(ids) // 2:]
+    rng.shuffle(update_ids)
+    rng.shuffle(delete_ids)
+
+    def new_snippet(i):
+        return SnippetCreate(
+            title=f"bench {run_tag} {i}",
+            content=f"def bench_{i}():\n    return {i}\n" * 8,
+            tags=[rng.choice(LANGUAGES), "bench"]
+        )
+
+    async def create_new(i):
+        await create_snippet(None, new_snippet(i))
+        return 1
+
+    duplicate = new_snippet(-1)
+
+    async def create_duplicate(i):
+        await create_snippet(None, duplicate)
+        return 1
+
+    async def update(i):
+        snippet_id = update_ids[i % len(update_ids)]
+        updated = await update_snippet(snippet_id, SnippetUpdate(title=f"updated {run_tag} {i}"))
+        return 1 if updated else 0
+
+    async def delete(i):
+        return 1 if await delete_snippet(delete_ids[i % len(delete_ids)]) else 0
+
+    return {
+        "create_snippet.new": create_new,
+        "create_snippet.duplicate": create_duplicate,
+        "update_snippet": update,
+        "delete_snippet": delete,
+    }
+
+
+async def run_size(
+    size_name: str,
+    iterations: int,
+    warmup: int,
+    seed: int,
+    only: Optional[List[str]]
+) -> List[Dict]:
+    """Benchmark every CRUD function against one corpus size."""
+    size = CORPUS_SIZES[size_name]
+    print(f"[{size_name}] preparing corpus ({size} snippets)...", file=sys.stderr)
+    corpus = await build_corpus(size, seed)
+
+    # Writes mutate the database, so always work on a throwaway copy
+    work_path = corpus_dir() / f"work_{size}_{seed}.db"
+    shutil.copyfile(corpus, work_path)
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{work_path}"
+    # Bring cached corpora up to the current schema
+    await init_db()
+
+    rng = random.Random(seed)
+    ids = _live_ids(work_path)
+    benchmarks = _read_benchmarks(rng, ids)
+    benchmarks.update(_write_benchmarks(rng, ids, run_tag=str(seed)))
+
+    results = []
+    try:
+        for name, fn in benchmarks.items():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            samples, rows = await measure(fn, iterations, warmup)
+            result = summarize(name, size, samples, rows)
+            results.append(result)
+            print(
+                f"[{size_name}] {name:<26} p50={result['p50_ms']:.3f}ms "
+                f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms",
+                file=sys.stderr
+            )
+    finally:
+        work_path.unlink(missing_ok=True)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict, baseline_path: str) -> None:
+    """Print p50/p95 deltas against a previous result file."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {
+        (r["corpus_size"], r["benchmark"]): r for r in baseline.get("results", [])
+    }
+    print(f"{'benchmark':<34}{'p50 Δ%':>10}{'p95 Δ%':>10}", file=sys.stderr)
+    for result in current["results"]:
+        old = previous.get((result["corpus_size"], result["benchmark"]))
+        if not old:
+            continue
+        deltas = [
+            (result[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            for key in ("p50_ms", "p95_ms")
+        ]
+        label = f"{result['corpus_size']}:{result['benchmark']}"
+        print(f"{label:<34}{deltas[0]:>+10.1f}{deltas[1]:>+10.1f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnippetBox CRUD benchmarks")
+    parser.add_argument("--sizes", default="10k",
+                        help=f"Comma-separated corpus sizes ({', '.join(CORPUS_SIZES)})")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", default=None,
+                        help="Comma-separated benchmark name prefixes to run")
+    parser.add_argument("--output", default=None, help="Write JSON results to file")
+    parser.add_argument("--compare", default=None, help="Previous JSON results to diff against")
+    args = parser.parse_args()
+
+    sizes = [s.strip().lower() for s in args.sizes.split(",") if s.strip()]
+    unknown = [s for s in sizes if s not in CORPUS_SIZES]
+    if unknown:
+        parser.error(f"Unknown corpus size(s): {', '.join(unknown)}")
+    only = [p.strip() for p in args.only.split(",")] if args.only else None
+
+    results = []
+    for size_name in sizes:
+        results.extend(asyncio.run(
+            run_size(size_name, args.iterations, args.warmup, args.seed, only)
+        ))
+
+    report = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Deterministic snippet corpus generation for benchmarks."""
+import json
+import math
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import settings
+from src.database import init_db
+from src.utils import compute_content_hash, serialize_tags, epoch_ms
+
+# Bump whenever the generator changes so cached corpora are rebuilt
+CORPUS_VERSION = 2
+
+CORPUS_SIZES: Dict[str, int] = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+
+DEFAULT_SEED = 20240101
+DELETED_RATIO = 0.05
+INSERT_BATCH_SIZE = 10_000
+
+LANGUAGES = [
+    "python", "javascript", "typescript", "go", "rust", "java", "sql", "bash",
+    "c", "cpp", "csharp", "ruby", "php", "kotlin", "swift", "scala",
+]
+TOPICS = [
+    "algorithm", "sorting", "async", "http", "parsing", "regex", "testing",
+    "database", "cache", "logging", "config", "cli", "docker", "security",
+    "performance", "concurrency", "json", "datetime", "math", "io",
+]
+WORDS = [
+    "load", "parse", "build", "fetch", "render", "merge", "split", "index",
+    "query", "retry", "stream", "buffer", "token", "worker", "queue", "batch",
+    "client", "server", "handler", "result", "value", "record", "cursor", "page",
+]
+CODE_LINES = [
+    "def {w1}_{w2}({w3}):",
+    "    return {w1}({w3}) + {n}",
+    "for {w1} in {w2}_list:",
+    "    if {w1} is None: continue",
+    "{w1} = {w2}.get('{w3}', {n})",
+    "// TODO: {w1} the {w2} before {w3}",
+    "const {w1} = await {w2}({n});",
+    "SELECT {w1} FROM {w2} WHERE {w3} = {n};",
+    "    {w1}.append({w2}[{n}])",
+    "raise ValueError('{w1} {w2} failed')",
+]
+
+# Popular tags are used far more often than rare ones (Zipf-like)
+TAG_VOCABULARY = LANGUAGES + TOPICS + [f"topic-{i}" for i in range(500)]
+
+
+def corpus_dir() -> Path:
+    """Directory where generated corpora are cached between runs."""
+    path = Path(tempfile.gettempdir()) / "snippetbox-bench"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def corpus_path(size: int, seed: int = DEFAULT_SEED) -> Path:
+    """Path of the cached corpus database for a size/seed pair."""
+    return corpus_dir() / f"corpus_v{CORPUS_VERSION}_{size}_{seed}.db"
+
+
+def _tag_weights() -> List[float]:
+    return [1.0 / (rank + 1) ** 1.1 for rank in range(len(TAG_VOCABULARY))]
+
+
+def _content_length(rng: random.Random) -> int:
+    """Log-normal content size: most snippets are small, a few are huge."""
+    length = int(rng.lognormvariate(math.log(600), 1.1))
+    return max(20, min(length, settings.MAX_CONTENT_LENGTH))
+
+
+def _make_content(rng: random.Random, length: int) -> str:
+    lines = []
+    total = 0
+    while total < length:
+        line = rng.choice(CODE_LINES).format(
+            w1=rng.choice(WORDS), w2=rng.choice(WORDS),
+            w3=rng.choice(WORDS), n=rng.randint(0, 999)
+        )
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)[:length]
+
+
+def _make_tags(rng: random.Random, weights: List[float]) -> List[str]:
+    count = min(int(rng.expovariate(0.6)), settings.MAX_TAGS_COUNT)
+    tags = []
+    for tag in rng.choices(TAG_VOCABULARY, weights=weights, k=count):
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def generate_rows(size: int, seed: int = DEFAULT_SEED):
+    """Yield deterministic snippet rows ready for insertion."""
+    rng = random.Random(seed)
+    weights = _tag_weights()
+    start = epoch_ms(datetime(2024, 1, 1))
+    for i in range(size):
+        title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {rng.choice(LANGUAGES)} #{i}"
+        content = _make_content(rng, _content_length(rng))
+        tags = _make_tags(rng, weights)
+        created_at = start + i * 7000
+        deleted_at = created_at if rng.random() < DELETED_RATIO else None
+        yield (
+            title, content, serialize_tags(tags), created_at, created_at,
+            deleted_at, compute_content_hash(title, content)
+        )
+
+
+async def build_corpus(size: int, seed: int = DEFAULT_SEED, force: bool = False) -> Path:
+    """Build (or reuse) a corpus database with `size` snippets."""
+    path = corpus_path(size, seed)
+    manifest = path.with_suffix(".json")
+    if path.exists() and manifest.exists() and not force:
+        return path
+
+    for stale in (path, manifest):
+        if stale.exists():
+            stale.unlink()
+
+    # Create the schema through the regular init path so it tracks migrations
+    original_url = settings.DATABASE_URL
+    settings.DATABASE_URL = f"sqlite+aiosqlite:///{path}"
+    try:
+        await init_db()
+    finally:
+        settings.DATABASE_URL = original_url
+
+    conn = sqlite3.connect(path)
+    try:
+        batch = []
+        for row in generate_rows(size, seed):
+            batch.append(row)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                _insert_batch(conn, batch)
+                batch = []
+        if batch:
+            _insert_batch(conn, batch)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    manifest.write_text(json.dumps({
+        "version": CORPUS_VERSION,
+        "size": size,
+        "seed": seed,
+    }))
+    return path
+
+
+def _insert_batch(conn: sqlite3.Connection, rows: list) -> None:
+    conn.executemany(
+        """INSERT INTO snippets
+           (title, content, tags, created_at, updated_at, deleted_at, content_hash)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        rows
+    )
+    conn.commit()
@@ -0,0 +1,401 @@
+"""Mixed read/write load generator for the SnippetBox API.
+
+Drives `src.main:app` in-process through an ASGI transport, or a uvicorn
+server over loopback, with either a closed loop (fixed concurrency) or an
+open loop (fixed arrival rate).
+
+Usage:
+    python benchmarks/load_harness.py --concurrency 32 --duration 20
+    python benchmarks/load_harness.py --rate 500 --duration 20 --mix search=70,create=20,update=10
+    python benchmarks/load_harness.py --spawn-uvicorn --rate 300 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DEFAULT_MIX = "create=15,duplicate=10,update=10,delete=5,get=20,search=40"
+SEARCH_WORDS = ["load", "parse", "fetch", "render", "query", "worker", "stream", "cache"]
+SEARCH_TAGS = ["python", "go", "rust", "sql", "bench"]
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram with ~1% relative precision."""
+
+    PRECISION = 0.01
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.count = 0
+        self.min_us = math.inf
+        self.max_us = 0.0
+        self._log_base = math.log1p(self.PRECISION)
+
+    def record(self, value_us: float) -> None:
+        value_us = max(value_us, 1.0)
+        self.counts[int(math.log(value_us) / self._log_base)] += 1
+        self.count += 1
+        self.min_us = min(self.min_us, value_us)
+        self.max_us = max(self.max_us, value_us)
+
+    def record_corrected(self, value_us: float, expected_interval_us: float) -> None:
+        """Record a value and back-fill the samples a stalled client skipped."""
+        self.record(value_us)
+        if expected_interval_us <= 0:
+            return
+        missing = value_us - expected_interval_us
+        while missing >= expected_interval_us:
+            self.record(missing)
+            missing -= expected_interval_us
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(math.exp((index + 1) * self._log_base), self.max_us)
+        return self.max_us
+
+    def buckets_ms(self) -> List[Dict]:
+        """Collapse fine buckets into power-of-two millisecond ranges."""
+        ranges: Dict[float, int] = defaultdict(int)
+        for index, count in self.counts.items():
+            value_ms = math.exp(index * self._log_base) / 1000.0
+            upper = 2.0 ** math.ceil(math.log2(value_ms)) if value_ms > 0.0625 else 0.0625
+            ranges[upper] += count
+        return [{"le_ms": upper, "count": ranges[upper]} for upper in sorted(ranges)]
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "min_ms": round(self.min_us / 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) / 1000, 3),
+            "p90_ms": round(self.percentile(90) / 1000, 3),
+            "p99_ms": round(self.percentile(99) / 1000, 3),
+            "p999_ms": round(self.percentile(99.9) / 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3),
+        }
+
+
+class OpStats:
+    """Per-operation latency and outcome counters."""
+
+    def __init__(self):
+        self.service = LatencyHistogram()
+        self.response = LatencyHistogram()
+        self.outcomes: Dict[str, int] = defaultdict(int)
+
+    def to_dict(self, elapsed_s: float) -> Dict:
+        total = sum(self.outcomes.values())
+        errors = sum(
+            count for outcome, count in self.outcomes.items()
+            if not outcome.startswith("2")
+        )
+        return {
+            "requests": total,
+            "throughput_rps": round(total / elapsed_s, 2) if elapsed_s else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "service_time": self.service.summary(),
+            "response_time": self.response.summary(),
+            "response_histogram": self.response.buckets_ms(),
+        }
+
+
+class Workload:
+    """Generates a weighted mix of API operations."""
+
+    def __init__(self, mix: Dict[str, int], rng: random.Random):
+        self.ops = list(mix)
+        self.weights = [mix[op] for op in self.ops]
+        self.rng = rng
+        self.ids: List[int] = []
+        self.payloads: List[Dict] = []
+        self.counter = 0
+
+    def seed_payload(self) -> Dict:
+        self.counter += 1
+        n = self.counter
+        return {
+            "title": f"load {os.getpid()} {n}",
+            "content": f"def handler_{n}(request):\n    return {n}\n" * self.rng.randint(1, 40),
+            "tags": self.rng.sample(SEARCH_TAGS, self.rng.randint(0, 3)),
+        }
+
+    def next_request(self) -> Tuple[str, str, str, Optional[Dict]]:
+        op = self.rng.choices(self.ops, weights=self.weights, k=1)[0]
+        # Operations that need existing snippets fall back to a create
+        if op in ("duplicate", "update", "delete", "get") and not self.ids:
+            op = "create"
+
+        if op == "create":
+            payload = self.seed_payload()
+            self.payloads.append(payload)
+            return op, "POST", "/snippets", payload
+        if op == "duplicate":
+            return op, "POST", "/snippets", self.rng.choice(self.payloads)
+        if op == "update":
+            snippet_id = self.rng.choice(self.ids)
+            return op, "PATCH", f"/snippets/{snippet_id}", {
+                "tags": self.rng.sample(SEARCH_TAGS, self.rng.randint(0, 3))
+            }
+        if op == "delete":
+            snippet_id = self.ids.pop(self.rng.randrange(len(self.ids)))
+            return op, "DELETE", f"/snippets/{snippet_id}", None
+        if op == "get":
+            return op, "GET", f"/snippets/{self.rng.choice(self.ids)}", None
+
+        params = []
+        if self.rng.random() < 0.5:
+            params.append(f"query={self.rng.choice(SEARCH_WORDS)}")
+        if self.rng.random() < 0.4:
+            params.append(f"tag={self.rng.choice(SEARCH_TAGS)}")
+        params.append(f"page={self.rng.randint(1, 5)}")
+        return op, "GET", "/snippets?" + "&".join(params), None
+
+    def observe(self, op: str, response: httpx.Response) -> None:
+        if op == "create" and response.status_code == 201:
+            self.ids.append(response.json()["id"])
+
+
+class LoadRunner:
+    """Issues requests and records service and response times."""
+
+    def __init__(self, client: httpx.AsyncClient, workload: Workload, max_in_flight: int):
+        self.client = client
+        self.workload = workload
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.stats: Dict[str, OpStats] = defaultdict(OpStats)
+        self.total = OpStats()
+
+    async def _issue(self, intended_start: float, expected_interval: float = 0.0) -> None:
+        op, method, url, payload = self.workload.next_request()
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, json=payload)
+            outcome = str(response.status_code)
+            self.workload.observe(op, response)
+        except Exception as e:
+            outcome = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        finished = time.perf_counter()
+
+        service_us = (finished - started) * 1e6
+        # Measuring from the intended start removes coordinated omission
+        response_us = (finished - intended_start) * 1e6
+        expected_us = expected_interval * 1e6
+        for stats in (self.stats[op], self.total):
+            stats.outcomes[outcome] += 1
+            stats.service.record(service_us)
+            stats.response.record_corrected(response_us, expected_us)
+
+    async def run_closed_loop(self, concurrency: int, duration: float, worker_rate: float) -> None:
+        deadline = time.perf_counter() + duration
+        interval = 1.0 / worker_rate if worker_rate else 0.0
+
+        async def worker():
+            next_start = time.perf_counter()
+            while next_start < deadline:
+                await self._issue(next_start, interval)
+                if interval:
+                    next_start += interval
+                    delay = next_start - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                else:
+                    next_start = time.perf_counter()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def run_open_loop(self, rate: float, duration: float, poisson: bool, rng: random.Random) -> None:
+        start = time.perf_counter()
+        deadline = start + duration
+        next_start = start
+        tasks = set()
+        while next_start < deadline:
+            delay = next_start - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.in_flight >= self.max_in_flight:
+                # The generator itself is saturated; count instead of queueing
+                self.total.outcomes["dropped"] += 1
+            else:
+                task = asyncio.create_task(self._issue(next_start))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_start += rng.expovariate(rate) if poisson else 1.0 / rate
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("create", "duplicate", "update", "delete", "get", "search"):
+            raise ValueError(f"Unknown operation in mix: {name}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+async def _wait_for_health(client: httpx.AsyncClient, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() > deadline:
+            raise RuntimeError("Server did not become healthy in time")
+        await asyncio.sleep(0.2)
+
+
+async def run(args) -> Dict:
+    rng = random.Random(args.seed)
+    workload = Workload(parse_mix(args.mix), rng)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    server = None
+    app = None
+
+    if args.url or args.spawn_uvicorn:
+        base_url = args.url or f"http://127.0.0.1:{args.port}"
+        if args.spawn_uvicorn:
+            env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{args.database}",
+                       RATE_LIMIT_ENABLED=str(args.keep_rate_limit).lower(), LOG_LEVEL=args.log_level)
+            server = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "src.main:app",
+                 "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"],
+                cwd=str(Path(__file__).parent.parent), env=env
+            )
+        client = httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout)
+    else:
+        from src.config import settings
+        settings.DATABASE_URL = f"sqlite+aiosqlite:///{args.database}"
+        settings.RATE_LIMIT_ENABLED = args.keep_rate_limit
+        settings.LOG_LEVEL = args.log_level
+        from src.main import app
+        await app.router.startup()
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+            limits=limits, timeout=args.timeout
+        )
+
+    try:
+        await _wait_for_health(client, timeout=15)
+        runner = LoadRunner(client, workload, args.max_in_flight)
+
+        # Seed data outside the measured window
+        for _ in range(args.seed_snippets):
+            payload = workload.seed_payload()
+            response = await client.post("/snippets", json=payload)
+            workload.payloads.append(payload)
+            workload.observe("create", response)
+
+        started = time.perf_counter()
+        if args.rate:
+            await runner.run_open_loop(args.rate, args.duration, args.arrival == "poisson", rng)
+        else:
+            await runner.run_closed_loop(args.concurrency, args.duration, args.worker_rate)
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "target": args.url or ("uvicorn-loopback" if args.spawn_uvicorn else "asgi-in-process"),
+            "mode": "open-loop" if args.rate else "closed-loop",
+            "rate": args.rate,
+            "arrival": args.arrival if args.rate else None,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration_s": args.duration,
+            "elapsed_s": round(elapsed, 3),
+            "mix": parse_mix(args.mix),
+            "seed": args.seed,
+        },
+        "total": runner.total.to_dict(elapsed),
+        "operations": {op: stats.to_dict(elapsed) for op, stats in sorted(runner.stats.items())},
+    }
+
+
+def print_summary(report: Dict) -> None:
+    meta = report["meta"]
+    print(f"{meta['mode']} against {meta['target']} for {meta['elapsed_s']}s", file=sys.stderr)
+    header = f"{'op':<10}{'reqs':>8}{'rps':>10}{'err%':>8}{'p50':>10}{'p99':>10}{'p99.9':>10}"
+    print(header, file=sys.stderr)
+    rows = list(report["operations"].items()) + [("TOTAL", report["total"])]
+    for op, stats in rows:
+        rt = stats["response_time"]
+        print(
+            f"{op:<10}{stats['requests']:>8}{stats['throughput_rps']:>10.1f}"
+            f"{stats['error_rate'] * 100:>8.2f}{rt['p50_ms']:>10.2f}{rt['p99_ms']:>10.2f}{rt['p999_ms']:>10.2f}",
+            file=sys.stderr
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SnippetBox in-process load harness")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help="Weighted operations, e.g. create=20,duplicate=10,search=70")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Closed-loop workers")
+    parser.add_argument("--worker-rate", type=float, default=0.0,
+                        help="Closed-loop per-worker pacing (req/s); enables CO correction")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Open-loop arrival rate (req/s); overrides --concurrency")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--max-in-flight", type=int, default=1024)
+    parser.add_argument("--seed-snippets", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database", default=os.path.join(tempfile.gettempdir(), "snippetbox-load.db"))
+    parser.add_argument("--keep-rate-limit", action="store_true",
+                        help="Leave write rate limiting enabled on the target")
+    parser.add_argument("--log-level", default="WARNING", help="Server log level during the run")
+    parser.add_argument("--url", default=None, help="Target an already running server instead")
+    parser.add_argument("--spawn-uvicorn", action="store_true",
+                        help="Start a uvicorn server on loopback and target it")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", default=None, help="Write the JSON report to file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_summary(report)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+-- Row version for optimistic concurrency (ETag / If-Match)
+ALTER TABLE snippets ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,29 @@
+-- Archive for soft-deleted snippets purged by the retention job
+CREATE TABLE IF NOT EXISTS snippets_archive (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    deleted_at TIMESTAMP,
+    content_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- snippets_fts is an external-content table: removing rows must go through
+-- the 'delete' command with the old values, the content row is already gone
+DROP TRIGGER IF EXISTS snippets_ad;
+CREATE TRIGGER snippets_ad AFTER DELETE ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+
+DROP TRIGGER IF EXISTS snippets_au;
+CREATE TRIGGER snippets_au AFTER UPDATE OF title, content ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO snippets_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+
+-- Repair entries left stale by the previous triggers
+INSERT INTO snippets_fts(snippets_fts) VALUES ('rebuild');
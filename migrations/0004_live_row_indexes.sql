@@ -0,0 +1,17 @@
+-- Index strategy tailored to live-row listing
+
+-- content_hash is already indexed by its UNIQUE constraint
+DROP INDEX IF EXISTS idx_snippets_content_hash;
+
+-- Listing, counting and tag filtering over live rows: filter and order from
+-- one partial index; tags and deleted_at make the count and id scans covering
+DROP INDEX IF EXISTS idx_snippets_created_at;
+CREATE INDEX IF NOT EXISTS idx_snippets_live_listing
+    ON snippets(created_at DESC, id DESC, tags, deleted_at)
+    WHERE deleted_at IS NULL;
+
+-- Only deleted rows are looked up by deleted_at (retention job)
+DROP INDEX IF EXISTS idx_snippets_deleted_at;
+CREATE INDEX IF NOT EXISTS idx_snippets_deleted_at
+    ON snippets(deleted_at)
+    WHERE deleted_at IS NOT NULL;
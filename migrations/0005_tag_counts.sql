@@ -0,0 +1,46 @@
+-- Live snippet count per tag, maintained by triggers in the writing transaction
+CREATE TABLE IF NOT EXISTS tag_counts (
+    tag TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_tag_counts_count ON tag_counts(count DESC, tag);
+
+CREATE TRIGGER IF NOT EXISTS snippets_tags_ai AFTER INSERT ON snippets
+WHEN new.deleted_at IS NULL BEGIN
+    INSERT INTO tag_counts (tag, count)
+    SELECT DISTINCT value, 1 FROM json_each(new.tags) WHERE true
+    ON CONFLICT(tag) DO UPDATE SET count = count + 1;
+END;
+
+-- Only the difference between the old and new live tag sets is applied, so
+-- a soft delete decrements every tag and an edit touches only changed tags
+CREATE TRIGGER IF NOT EXISTS snippets_tags_au AFTER UPDATE OF tags, deleted_at ON snippets BEGIN
+    UPDATE tag_counts SET count = count - 1 WHERE tag IN (
+        SELECT value FROM json_each(old.tags) WHERE old.deleted_at IS NULL
+        EXCEPT
+        SELECT value FROM json_each(new.tags) WHERE new.deleted_at IS NULL
+    );
+    DELETE FROM tag_counts WHERE count <= 0 AND tag IN (SELECT value FROM json_each(old.tags));
+    INSERT INTO tag_counts (tag, count)
+    SELECT value, 1 FROM (
+        SELECT value FROM json_each(new.tags) WHERE new.deleted_at IS NULL
+        EXCEPT
+        SELECT value FROM json_each(old.tags) WHERE old.deleted_at IS NULL
+    ) WHERE true
+    ON CONFLICT(tag) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS snippets_tags_ad AFTER DELETE ON snippets
+WHEN old.deleted_at IS NULL BEGIN
+    UPDATE tag_counts SET count = count - 1
+    WHERE tag IN (SELECT DISTINCT value FROM json_each(old.tags));
+    DELETE FROM tag_counts WHERE count <= 0 AND tag IN (SELECT value FROM json_each(old.tags));
+END;
+
+-- Counts for existing rows
+INSERT INTO tag_counts (tag, count)
+SELECT j.value, COUNT(DISTINCT s.id)
+FROM snippets s, json_each(s.tags) j
+WHERE s.deleted_at IS NULL
+GROUP BY j.value;
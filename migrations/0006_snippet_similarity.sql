@@ -0,0 +1,26 @@
+-- MinHash signatures and LSH band buckets for near-duplicate lookup
+CREATE TABLE IF NOT EXISTS snippet_signatures (
+    snippet_id INTEGER PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS snippet_lsh (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    snippet_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, snippet_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_snippet_lsh_snippet ON snippet_lsh(snippet_id);
+
+-- Deleted snippets leave the index (signatures are written by the application)
+CREATE TRIGGER IF NOT EXISTS snippets_similarity_sd AFTER UPDATE OF deleted_at ON snippets
+WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL BEGIN
+    DELETE FROM snippet_lsh WHERE snippet_id = old.id;
+    DELETE FROM snippet_signatures WHERE snippet_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS snippets_similarity_ad AFTER DELETE ON snippets BEGIN
+    DELETE FROM snippet_lsh WHERE snippet_id = old.id;
+    DELETE FROM snippet_signatures WHERE snippet_id = old.id;
+END;
@@ -0,0 +1,21 @@
+"""Compute MinHash signatures for snippets created before similarity indexing."""
+import asyncio
+
+from src.similarity import signatures_for_batch, store_signature
+
+BATCH_SIZE = 100
+
+
+async def backfill(conn):
+    cursor = await conn.execute(
+        """SELECT id, content FROM snippets s
+           WHERE deleted_at IS NULL
+             AND NOT EXISTS (SELECT 1 FROM snippet_signatures g WHERE g.snippet_id = s.id)
+           LIMIT ?""",
+        (BATCH_SIZE,)
+    )
+    rows = await cursor.fetchall()
+    signatures = await asyncio.to_thread(signatures_for_batch, [row[1] for row in rows])
+    for row, signature in zip(rows, signatures):
+        await store_signature(conn, row[0], signature)
+    return len(rows)
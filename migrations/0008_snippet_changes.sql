@@ -0,0 +1,24 @@
+-- Ordered log of snippet changes for incremental sync; seq never goes back
+CREATE TABLE IF NOT EXISTS snippet_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    snippet_id INTEGER NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('create', 'update', 'delete')),
+    version INTEGER NOT NULL,
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS snippets_changes_ai AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version) VALUES (new.id, 'create', new.version);
+END;
+
+CREATE TRIGGER IF NOT EXISTS snippets_changes_au AFTER UPDATE ON snippets
+WHEN new.version != old.version BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version)
+    VALUES (new.id, CASE WHEN new.deleted_at IS NULL THEN 'update' ELSE 'delete' END, new.version);
+END;
+
+-- Purging an already soft-deleted row is not a change
+CREATE TRIGGER IF NOT EXISTS snippets_changes_ad AFTER DELETE ON snippets
+WHEN old.deleted_at IS NULL BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version) VALUES (old.id, 'delete', old.version + 1);
+END;
@@ -0,0 +1,159 @@
+-- Timestamps become integer milliseconds since the Unix epoch (UTC): smaller
+-- rows, integer comparisons in the listing index, no text parsing on reads.
+-- SQLite can't change a column's type or default in place, so snippets and
+-- snippets_archive are rebuilt; ids, rowids (FTS) and the AUTOINCREMENT
+-- high-water mark are preserved, and every trigger and index on snippets is
+-- recreated since dropping the old table drops them.
+
+CREATE TABLE snippets_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL DEFAULT '[]',
+    created_at INTEGER DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+    updated_at INTEGER DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)),
+    deleted_at INTEGER NULL,
+    content_hash TEXT NOT NULL UNIQUE,
+    version INTEGER NOT NULL DEFAULT 1
+);
+
+INSERT INTO snippets_new (id, title, content, tags, created_at, updated_at, deleted_at, content_hash, version)
+SELECT id, title, content, tags,
+       CASE WHEN typeof(created_at) = 'text'
+            THEN CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER) ELSE created_at END,
+       CASE WHEN typeof(updated_at) = 'text'
+            THEN CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400000) AS INTEGER) ELSE updated_at END,
+       CASE WHEN typeof(deleted_at) = 'text'
+            THEN CAST(ROUND((julianday(deleted_at) - 2440587.5) * 86400000) AS INTEGER) ELSE deleted_at END,
+       content_hash, version
+FROM snippets;
+
+-- Keep the high-water mark even if the newest rows were purged; new ids
+-- (and shard id allocation) continue from it
+DELETE FROM sqlite_sequence WHERE name = 'snippets_new';
+INSERT INTO sqlite_sequence (name, seq)
+SELECT 'snippets_new', seq FROM sqlite_sequence WHERE name = 'snippets';
+
+DROP TABLE snippets;
+ALTER TABLE snippets_new RENAME TO snippets;
+
+-- Listing index: integer sort key plus the columns range filters and counts need
+CREATE INDEX idx_snippets_live_listing
+    ON snippets(created_at DESC, id DESC, tags, updated_at, deleted_at)
+    WHERE deleted_at IS NULL;
+
+CREATE INDEX idx_snippets_deleted_at
+    ON snippets(deleted_at)
+    WHERE deleted_at IS NOT NULL;
+
+-- Full-text search (snippets_fts keeps its rows: ids are unchanged)
+CREATE TRIGGER snippets_ai AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippets_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+
+CREATE TRIGGER snippets_ad AFTER DELETE ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+
+CREATE TRIGGER snippets_au AFTER UPDATE OF title, content ON snippets BEGIN
+    INSERT INTO snippets_fts(snippets_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO snippets_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+
+-- Tag counts
+CREATE TRIGGER snippets_tags_ai AFTER INSERT ON snippets
+WHEN new.deleted_at IS NULL BEGIN
+    INSERT INTO tag_counts (tag, count)
+    SELECT DISTINCT value, 1 FROM json_each(new.tags) WHERE true
+    ON CONFLICT(tag) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER snippets_tags_au AFTER UPDATE OF tags, deleted_at ON snippets BEGIN
+    UPDATE tag_counts SET count = count - 1 WHERE tag IN (
+        SELECT value FROM json_each(old.tags) WHERE old.deleted_at IS NULL
+        EXCEPT
+        SELECT value FROM json_each(new.tags) WHERE new.deleted_at IS NULL
+    );
+    DELETE FROM tag_counts WHERE count <= 0 AND tag IN (SELECT value FROM json_each(old.tags));
+    INSERT INTO tag_counts (tag, count)
+    SELECT value, 1 FROM (
+        SELECT value FROM json_each(new.tags) WHERE new.deleted_at IS NULL
+        EXCEPT
+        SELECT value FROM json_each(old.tags) WHERE old.deleted_at IS NULL
+    ) WHERE true
+    ON CONFLICT(tag) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER snippets_tags_ad AFTER DELETE ON snippets
+WHEN old.deleted_at IS NULL BEGIN
+    UPDATE tag_counts SET count = count - 1
+    WHERE tag IN (SELECT DISTINCT value FROM json_each(old.tags));
+    DELETE FROM tag_counts WHERE count <= 0 AND tag IN (SELECT value FROM json_each(old.tags));
+END;
+
+-- Near-duplicate index
+CREATE TRIGGER snippets_similarity_sd AFTER UPDATE OF deleted_at ON snippets
+WHEN old.deleted_at IS NULL AND new.deleted_at IS NOT NULL BEGIN
+    DELETE FROM snippet_lsh WHERE snippet_id = old.id;
+    DELETE FROM snippet_signatures WHERE snippet_id = old.id;
+END;
+
+CREATE TRIGGER snippets_similarity_ad AFTER DELETE ON snippets BEGIN
+    DELETE FROM snippet_lsh WHERE snippet_id = old.id;
+    DELETE FROM snippet_signatures WHERE snippet_id = old.id;
+END;
+
+-- Change feed; changed_at is written explicitly since the column's
+-- CURRENT_TIMESTAMP default can't be changed without a rebuild
+UPDATE snippet_changes
+SET changed_at = CAST(ROUND((julianday(changed_at) - 2440587.5) * 86400000) AS INTEGER)
+WHERE typeof(changed_at) = 'text';
+
+CREATE TRIGGER snippets_changes_ai AFTER INSERT ON snippets BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version, changed_at)
+    VALUES (new.id, 'create', new.version, CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER));
+END;
+
+CREATE TRIGGER snippets_changes_au AFTER UPDATE ON snippets
+WHEN new.version != old.version BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version, changed_at)
+    VALUES (new.id, CASE WHEN new.deleted_at IS NULL THEN 'update' ELSE 'delete' END, new.version,
+            CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER));
+END;
+
+-- Purging an already soft-deleted row is not a change
+CREATE TRIGGER snippets_changes_ad AFTER DELETE ON snippets
+WHEN old.deleted_at IS NULL BEGIN
+    INSERT INTO snippet_changes (snippet_id, op, version, changed_at)
+    VALUES (old.id, 'delete', old.version + 1, CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER));
+END;
+
+-- Archive: same representation, so purged rows copy over unchanged
+CREATE TABLE snippets_archive_new (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    created_at INTEGER,
+    updated_at INTEGER,
+    deleted_at INTEGER,
+    content_hash TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    archived_at INTEGER DEFAULT (CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER))
+);
+
+INSERT INTO snippets_archive_new
+SELECT id, title, content, tags,
+       CASE WHEN typeof(created_at) = 'text'
+            THEN CAST(ROUND((julianday(created_at) - 2440587.5) * 86400000) AS INTEGER) ELSE created_at END,
+       CASE WHEN typeof(updated_at) = 'text'
+            THEN CAST(ROUND((julianday(updated_at) - 2440587.5) * 86400000) AS INTEGER) ELSE updated_at END,
+       CASE WHEN typeof(deleted_at) = 'text'
+            THEN CAST(ROUND((julianday(deleted_at) - 2440587.5) * 86400000) AS INTEGER) ELSE deleted_at END,
+       content_hash, version,
+       CASE WHEN typeof(archived_at) = 'text'
+            THEN CAST(ROUND((julianday(archived_at) - 2440587.5) * 86400000) AS INTEGER) ELSE archived_at END
+FROM snippets_archive;
+
+DROP TABLE snippets_archive;
+ALTER TABLE snippets_archive_new RENAME TO snippets_archive;
@@ -0,0 +1,194 @@
+"""Admission control: bounded concurrency and queues in front of SQLite-bound routes."""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src import timing
+from src.middleware import logger, READ_ONLY_POST_PATHS
+from src.utils import get_trace_id
+
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "snippetbox_admission_queue_depth",
+    "Requests waiting for an admission slot",
+    ("queue",),
+)
+ADMISSION_ACTIVE = REGISTRY.gauge(
+    "snippetbox_admission_active",
+    "Requests holding an admission slot",
+    ("queue",),
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "snippetbox_admission_wait_seconds",
+    "Time admitted requests spent queued",
+    ("queue",),
+)
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "snippetbox_admission_rejections",
+    "Requests shed with 503 by admission control",
+    ("queue", "reason"),
+)
+
+READ = "read"
+WRITE = "write"
+WRITE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+# Cheap or long-lived routes that must not take a slot
+EXEMPT_PATHS = {"/health", "/metrics", "/changes/stream", "/docs", "/redoc", "/openapi.json"}
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot be admitted; `reason` is queue_full or queue_timeout."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionQueue:
+    """At most `concurrency` requests run; up to `max_waiting` wait in FIFO order.
+
+    A finishing request hands its slot directly to the oldest waiter, so
+    newcomers cannot overtake the queue.
+    """
+
+    def __init__(self, name: str, concurrency: int, max_waiting: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.export()
+
+    def export(self) -> None:
+        """Point this queue's gauges at this instance."""
+        ADMISSION_QUEUE_DEPTH.labels(self.name).set_function(lambda: len(self._waiters))
+        ADMISSION_ACTIVE.labels(self.name).set_function(lambda: self.active)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> float:
+        """Wait for a slot; returns seconds spent queued or raises Overloaded."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return 0.0
+        if len(self._waiters) >= self.max_waiting:
+            raise Overloaded("queue_full")
+
+        start = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise Overloaded("queue_timeout")
+        return time.perf_counter() - start
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Slot changes hands; `active` stays the same
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionController:
+    """Separate read and write queues, sized from settings."""
+
+    def __init__(self):
+        self.queues: Dict[str, AdmissionQueue] = {
+            READ: AdmissionQueue(
+                READ, settings.ADMISSION_READ_CONCURRENCY,
+                settings.ADMISSION_READ_QUEUE, settings.ADMISSION_QUEUE_TIMEOUT
+            ),
+            WRITE: AdmissionQueue(
+                WRITE, settings.ADMISSION_WRITE_CONCURRENCY,
+                settings.ADMISSION_WRITE_QUEUE, settings.ADMISSION_QUEUE_TIMEOUT
+            ),
+        }
+
+    def queue_for(self, request: Request):
+        if request.url.path in EXEMPT_PATHS or request.method == "OPTIONS":
+            return None
+        is_write = request.method in WRITE_METHODS and request.url.path not in READ_ONLY_POST_PATHS
+        return self.queues[WRITE if is_write else READ]
+
+
+admission = AdmissionController()
+
+
+def overloaded_response(queue: str, reason: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={
+            "error_code": "SERVICE_OVERLOADED",
+            "message": f"Server is busy ({queue} {reason.replace('_', ' ')}), retry later",
+            "trace_id": get_trace_id()
+        },
+        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)}
+    )
+
+
+class AdmissionControlMiddleware:
+    """Shed load with a fast 503 instead of letting requests pile up on SQLite locks.
+
+    Pure ASGI so the slot is held until the last body chunk is sent:
+    streaming responses (raw content) read SQLite while the body streams,
+    after the endpoint itself has returned.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        queue = admission.queue_for(request)
+        if queue is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            waited = await queue.acquire()
+        except Overloaded as e:
+            ADMISSION_REJECTIONS.labels(queue.name, e.reason).inc()
+            logger.log("warning", "Request shed by admission control",
+                      queue=queue.name,
+                      reason=e.reason,
+                      method=request.method,
+                      path=request.url.path)
+            await overloaded_response(queue.name, e.reason)(scope, receive, send)
+            return
+
+        ADMISSION_WAIT.labels(queue.name).observe(waited)
+        timing.record("queue", waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            queue.release()
@@ -0,0 +1,157 @@
+"""Bounded background pool for side effects that run after a write commits.
+
+Requests hand off work that does not decide their response (in-memory index
+maintenance, log lines, change-feed wake-ups), so their latency only covers
+the commit itself.
+"""
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Hashable, List, NamedTuple, Optional
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src.middleware import logger
+from src.utils import get_trace_id, set_trace_id
+
+BACKGROUND_QUEUE_DEPTH = REGISTRY.gauge(
+    "snippetbox_background_queue_depth",
+    "Background jobs waiting for a worker",
+)
+BACKGROUND_TASKS = REGISTRY.counter(
+    "snippetbox_background_tasks",
+    "Background jobs finished, by outcome (ok/failed)",
+    ("task", "outcome"),
+)
+BACKGROUND_DURATION = REGISTRY.histogram(
+    "snippetbox_background_task_duration_seconds",
+    "Time to run one background job",
+    ("task",),
+)
+BACKGROUND_BACKPRESSURE = REGISTRY.counter(
+    "snippetbox_background_backpressure",
+    "Submissions that waited because the queue was full",
+)
+
+
+class _Job(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    thread: bool
+    trace_id: str
+
+
+class BackgroundPool:
+    """`workers` asyncio workers, plus a thread pool for blocking jobs.
+
+    - Jobs with the same `key` run one at a time in submission order (each
+      key maps to one worker), so e.g. an index add and a later discard for
+      one snippet cannot swap; jobs without a key go to the shortest queue
+    - At most `max_queued` jobs wait; beyond that `submit` waits for room,
+      slowing writers down instead of growing memory
+    - Failures are logged with the submitting request's trace id and
+      counted; they never reach the request, which has already committed
+    - Before `start` and after `drain`, jobs run inline in `submit`
+    """
+
+    def __init__(self, workers: int, threads: int, max_queued: int):
+        self.workers = max(workers, 1)
+        self.threads = max(threads, 1)
+        self.max_queued = max(max_queued, self.workers)
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.running = False
+
+    @property
+    def queued(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        per_worker = -(-self.max_queued // self.workers)
+        self._queues = [asyncio.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="snippetbox-bg")
+        self._tasks = [asyncio.create_task(self._worker(q)) for q in self._queues]
+        self.running = True
+
+    async def submit(self, name: str, fn: Callable[..., Any], *args,
+                     key: Optional[Hashable] = None, thread: bool = False, **kwargs) -> None:
+        """Queue `fn(*args, **kwargs)`; coroutine functions are awaited.
+
+        `thread=True` runs a blocking callable in the thread pool. Returns
+        once the job is queued, not when it has run.
+        """
+        job = _Job(name, fn, args, kwargs, thread, get_trace_id())
+        if not self.running:
+            await self._run(job, inline=True)
+            return
+        if key is None:
+            queue = min(self._queues, key=lambda q: q.qsize())
+        else:
+            queue = self._queues[hash(key) % len(self._queues)]
+        if queue.full():
+            BACKGROUND_BACKPRESSURE.inc()
+        await queue.put(job)
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            job = await queue.get()
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: _Job, inline: bool = False) -> None:
+        start = time.perf_counter()
+        if not inline:
+            set_trace_id(job.trace_id)
+        try:
+            call = partial(job.fn, *job.args, **job.kwargs)
+            if asyncio.iscoroutinefunction(job.fn):
+                await call()
+            elif job.thread and not inline:
+                ctx = contextvars.copy_context()
+                await asyncio.get_running_loop().run_in_executor(self._executor, ctx.run, call)
+            else:
+                call()
+        except Exception as e:
+            BACKGROUND_TASKS.labels(job.name, "failed").inc()
+            logger.log("error", "Background task failed", task=job.name, error=str(e))
+        else:
+            BACKGROUND_TASKS.labels(job.name, "ok").inc()
+        finally:
+            BACKGROUND_DURATION.labels(job.name).observe(time.perf_counter() - start)
+
+    async def drain(self, timeout: float) -> bool:
+        """Stop taking jobs, finish the queued ones, then stop the workers.
+
+        Returns False if jobs were still pending after `timeout` seconds;
+        those are dropped.
+        """
+        if not self.running:
+            return True
+        self.running = False
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues)), timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+            logger.log("warning", "Background pool drain timed out", dropped=self.queued)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=drained, cancel_futures=not drained)
+        self._tasks, self._queues, self._executor = [], [], None
+        return drained
+
+
+background_pool = BackgroundPool(
+    settings.BACKGROUND_WORKERS, settings.BACKGROUND_THREADS, settings.BACKGROUND_QUEUE_SIZE
+)
+BACKGROUND_QUEUE_DEPTH.set_function(lambda: background_pool.queued)
@@ -0,0 +1,122 @@
+"""Change feed consumers: local wake-ups, Server-Sent Events and in-process followers."""
+import asyncio
+import inspect
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Union
+
+from src.config import settings
+from src.crud import list_changes, CRUDException
+from src.database import shard_paths
+from src.middleware import logger
+
+
+class ChangeNotifier:
+    """Wakes stream consumers when this process commits a write.
+
+    Writes from other workers are picked up by polling every
+    CHANGE_FEED_POLL_SECONDS instead.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        self._event.set()
+        self._event = asyncio.Event()
+
+    def current(self) -> asyncio.Event:
+        """Event to wait on; take it before reading so no write is missed."""
+        return self._event
+
+    async def wait(self, event: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+change_notifier = ChangeNotifier()
+
+
+def format_event(event: str, data: dict, event_id: int = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def change_events(
+    since: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+    shard: int = 0
+) -> AsyncIterator[str]:
+    """Yield SSE frames for a shard's changes after `since` until the client leaves."""
+    last_sent = time.monotonic()
+    while not await is_disconnected():
+        wake = change_notifier.current()
+        try:
+            changes, has_more, _ = await list_changes(since, settings.CHANGE_FEED_PAGE_SIZE, shard)
+        except CRUDException as e:
+            yield format_event("expired", {"error_code": e.error_code, "message": e.message})
+            return
+
+        for change in changes:
+            yield format_event("change", change, change["seq"])
+            since = change["seq"]
+        if changes:
+            last_sent = time.monotonic()
+        if has_more:
+            continue
+
+        await change_notifier.wait(wake, settings.CHANGE_FEED_POLL_SECONDS)
+        if time.monotonic() - last_sent >= settings.CHANGE_FEED_HEARTBEAT_SECONDS:
+            # Comment frame keeps proxies from closing an idle stream
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+
+MaybeAwaitable = Union[None, Awaitable[None]]
+
+
+async def _call(callback: Callable[..., MaybeAwaitable], *args) -> None:
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def follow_changes(
+    on_change: Callable[[int], MaybeAwaitable],
+    on_reset: Callable[[], MaybeAwaitable]
+) -> None:
+    """Call `on_change(snippet_id)` for every change, including other workers'.
+
+    Polls every shard's feed every CHANGE_FEED_POLL_SECONDS; if a feed was
+    pruned past our position, `on_reset()` is called and following that
+    shard restarts from its latest. Callbacks may be coroutine functions.
+    """
+    positions: List[Optional[int]] = [None] * len(shard_paths())
+    while True:
+        more = False
+        for shard, since in enumerate(positions):
+            try:
+                if since is None:
+                    _, _, since = await list_changes(None, shard=shard)
+                changes, has_more, _ = await list_changes(since, settings.CHANGE_FEED_PAGE_SIZE, shard)
+                for change in changes:
+                    await _call(on_change, change["id"])
+                    since = change["seq"]
+                more = more or has_more
+            except asyncio.CancelledError:
+                raise
+            except CRUDException:
+                await _call(on_reset)
+                since = None
+            except Exception as e:
+                logger.log("error", "Following changes failed", shard=shard, error=str(e))
+            positions[shard] = since
+        if not more:
+            await asyncio.sleep(settings.CHANGE_FEED_POLL_SECONDS)
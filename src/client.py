@@ -0,0 +1,371 @@
+"""Async Python client for SnippetBox, over HTTP or embedded in the same process."""
+import asyncio
+import random
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import httpx
+from pydantic import ValidationError
+
+from src import crud
+from src.changes import change_notifier
+from src.config import settings
+from src.crud import CRUDException
+from src.schemas import (
+    SnippetCreate, SnippetUpdate, SnippetResponse, SnippetCreateResponse, SnippetSearchResponse, SearchSpec
+)
+from src.utils import epoch_ms, get_trace_id, make_etag, parse_tags
+
+# Statuses that mean the request was refused before doing any work
+RETRY_STATUSES = {429, 503}
+
+
+class SnippetBoxError(Exception):
+    """An error response, with the API's error_code/message/trace_id."""
+
+    def __init__(self, status_code: int, error_code: str, message: str, trace_id: str = ""):
+        self.status_code = status_code
+        self.error_code = error_code
+        self.message = message
+        self.trace_id = trace_id
+        super().__init__(f"{status_code} {error_code}: {message}")
+
+
+class _Client:
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+
+async def _single_flight(inflight: Dict[Hashable, asyncio.Future], key: Hashable,
+                         call: Callable[[], Awaitable[Any]]) -> Any:
+    """Run `call` once for all concurrent callers with the same key."""
+    future = inflight.get(key)
+    if future is not None:
+        return await asyncio.shield(future)
+    future = asyncio.get_running_loop().create_future()
+    inflight[key] = future
+    try:
+        result = await call()
+        future.set_result(result)
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Mark retrieved so an unawaited failure isn't logged
+        future.exception()
+        raise
+    finally:
+        del inflight[key]
+    return result
+
+
+def _search_params(query: Optional[str], tag: Optional[str], page: int, page_size: int,
+                   created_after: Optional[datetime], updated_before: Optional[datetime]) -> Dict:
+    params = {"page": page, "page_size": page_size}
+    if query is not None:
+        params["query"] = query
+    if tag is not None:
+        params["tag"] = tag
+    if created_after is not None:
+        params["created_after"] = created_after.isoformat()
+    if updated_before is not None:
+        params["updated_before"] = updated_before.isoformat()
+    return params
+
+
+class SnippetBoxClient(_Client):
+    """HTTP client that keeps connections alive and folds concurrent calls together.
+
+    - One keep-alive pool of up to `max_connections` connections
+    - `search` calls made in the same event loop iteration go out as one
+      `POST /snippets/search/batch` (split every `max_batch`), and `get`
+      calls as one `GET /snippets/batch` (split every `max_batch_gets`)
+    - Concurrent `create` calls for the same snippet share a single request
+      and its result; different snippets are separate requests, since each
+      create is one rate-limited write
+    - 429 and 503 responses are retried up to `retries` times with jittered
+      exponential backoff, never sooner than `Retry-After`
+
+    `transport` is passed to httpx, e.g. `httpx.ASGITransport(app=app)`.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", *, max_connections: int = 10,
+                 timeout: float = 10.0, retries: int = 3, backoff: float = 0.1, max_backoff: float = 5.0,
+                 max_batch: int = settings.MAX_BATCH_SEARCHES, max_batch_gets: int = settings.MAX_BATCH_GETS,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_batch = max_batch
+        self.max_batch_gets = max_batch_gets
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+            transport=transport,
+        )
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._searches: List[Tuple[Dict, asyncio.Future]] = []
+        self._gets: Dict[int, List[asyncio.Future]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._http.aclose()
+
+    def _delay(self, attempt: int, response: httpx.Response) -> float:
+        ceiling = min(self.backoff * 2 ** attempt, self.max_backoff)
+        delay = random.uniform(ceiling / 2, ceiling)
+        retry_after = response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return delay
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await self._http.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                return response
+            await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    @staticmethod
+    def _raise_for(response: httpx.Response) -> None:
+        if response.is_success:
+            return
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            body = {}
+        default_code = "VALIDATION_ERROR" if response.status_code == 422 else "HTTP_ERROR"
+        raise SnippetBoxError(
+            response.status_code,
+            body.get("error_code") or default_code,
+            body.get("message") or response.text,
+            body.get("trace_id") or response.headers.get("X-Trace-ID", ""),
+        )
+
+    async def get(self, snippet_id: int) -> Optional[Dict]:
+        """The snippet as returned by `GET /snippets/{id}`, or None if missing.
+
+        Batched with concurrent gets; callers asking for the same id share
+        one result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._gets:
+            loop.call_soon(self._flush_gets)
+        self._gets.setdefault(snippet_id, []).append(future)
+        return await future
+
+    def _flush_gets(self) -> None:
+        pending, self._gets = list(self._gets.items()), {}
+        for start in range(0, len(pending), self.max_batch_gets):
+            self._spawn(self._send_gets(dict(pending[start:start + self.max_batch_gets])))
+
+    async def _send_gets(self, batch: Dict[int, List[asyncio.Future]]) -> None:
+        try:
+            if len(batch) == 1:
+                snippet_id = next(iter(batch))
+                response = await self._request("GET", f"/snippets/{snippet_id}")
+                if response.status_code == 404:
+                    found = {}
+                else:
+                    self._raise_for(response)
+                    found = {snippet_id: response.json()}
+            else:
+                response = await self._request("GET", "/snippets/batch", params={"ids": list(batch)})
+                self._raise_for(response)
+                found = {item["id"]: item for item in response.json()["items"]}
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for snippet_id, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(found.get(snippet_id))
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def create(self, title: str, content: str, tags: Iterable[str] = (),
+                     check_similar: bool = False) -> Dict:
+        """Create (or find the identical) snippet; returns id and created_at."""
+        tags = list(tags)
+
+        async def post():
+            response = await self._request(
+                "POST", "/snippets",
+                json={"title": title, "content": content, "tags": tags},
+                params={"check_similar": "true"} if check_similar else None,
+            )
+            self._raise_for(response)
+            return response.json()
+        key = ("create", title, content, tuple(tags), check_similar)
+        return await _single_flight(self._inflight, key, post)
+
+    async def update(self, snippet_id: int, *, title: Optional[str] = None, content: Optional[str] = None,
+                     tags: Optional[Iterable[str]] = None, version: Optional[int] = None) -> Dict:
+        """Partially update a snippet; `version` makes it conditional (If-Match)."""
+        body = {"title": title, "content": content, "tags": None if tags is None else list(tags)}
+        headers = {"If-Match": make_etag(snippet_id, version)} if version is not None else None
+        response = await self._request(
+            "PATCH", f"/snippets/{snippet_id}",
+            json={k: v for k, v in body.items() if v is not None},
+            headers=headers,
+        )
+        self._raise_for(response)
+        return response.json()
+
+    async def delete(self, snippet_id: int, version: Optional[int] = None) -> bool:
+        """Soft delete; False if the snippet did not exist."""
+        headers = {"If-Match": make_etag(snippet_id, version)} if version is not None else None
+        response = await self._request("DELETE", f"/snippets/{snippet_id}", headers=headers)
+        if response.status_code == 404:
+            return False
+        self._raise_for(response)
+        return True
+
+    async def search(self, query: Optional[str] = None, tag: Optional[str] = None,
+                     page: int = 1, page_size: int = 20, *, created_after: Optional[datetime] = None,
+                     updated_before: Optional[datetime] = None) -> Dict:
+        """One page of `GET /snippets`, batched with concurrent searches."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._searches:
+            loop.call_soon(self._flush_searches)
+        params = _search_params(query, tag, page, page_size, created_after, updated_before)
+        self._searches.append((params, future))
+        return await future
+
+    def _flush_searches(self) -> None:
+        pending, self._searches = self._searches, []
+        for start in range(0, len(pending), self.max_batch):
+            self._spawn(self._send_searches(pending[start:start + self.max_batch]))
+
+    async def _send_searches(self, batch: List[Tuple[Dict, asyncio.Future]]) -> None:
+        try:
+            if len(batch) == 1:
+                response = await self._request("GET", "/snippets", params=batch[0][0])
+                self._raise_for(response)
+                results = [response.json()]
+            else:
+                response = await self._request(
+                    "POST", "/snippets/search/batch", json={"searches": [spec for spec, _ in batch]}
+                )
+                self._raise_for(response)
+                results = response.json()["results"]
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+@contextmanager
+def _api_errors():
+    """Raise CRUD and validation failures as the HTTP API would report them."""
+    try:
+        yield
+    except CRUDException as e:
+        raise SnippetBoxError(e.status_code, e.error_code, e.message, get_trace_id()) from e
+    except ValidationError as e:
+        raise SnippetBoxError(422, "VALIDATION_ERROR", str(e), get_trace_id()) from e
+
+
+def _not_found(snippet_id: int) -> SnippetBoxError:
+    return SnippetBoxError(404, "SNIPPET_NOT_FOUND", f"Snippet with ID {snippet_id} not found", get_trace_id())
+
+
+def _snippet_body(snippet) -> Dict:
+    return SnippetResponse(
+        id=snippet.id,
+        title=snippet.title,
+        content=snippet.content,
+        tags=parse_tags(snippet.tags),
+        created_at=snippet.created_at,
+        updated_at=snippet.updated_at
+    ).model_dump(mode="json")
+
+
+class EmbeddedClient(_Client):
+    """The same interface, calling the CRUD layer directly in this process.
+
+    For workers and tests running next to the database. Results and errors
+    match the HTTP API; middleware does not run, so there is no rate
+    limiting, admission control or tracing. The database must already be
+    initialised (`src.database.init_db`).
+    """
+
+    async def get(self, snippet_id: int) -> Optional[Dict]:
+        snippet = await crud.get_snippet(snippet_id)
+        return _snippet_body(snippet) if snippet else None
+
+    async def create(self, title: str, content: str, tags: Iterable[str] = (),
+                     check_similar: bool = False) -> Dict:
+        with _api_errors():
+            data = SnippetCreate(title=title, content=content, tags=list(tags))
+            created = await crud.create_snippet(None, data)
+        change_notifier.notify()
+        result = {"id": created.id, "created_at": created.created_at}
+        if check_similar:
+            similar = await crud.find_similar(created.id) or []
+            result["similar"] = [
+                {"id": s.id, "title": s.title, "similarity": score} for s, score in similar
+            ]
+        return SnippetCreateResponse(**result).model_dump(mode="json", exclude_none=True)
+
+    async def update(self, snippet_id: int, *, title: Optional[str] = None, content: Optional[str] = None,
+                     tags: Optional[Iterable[str]] = None, version: Optional[int] = None) -> Dict:
+        fields = {"title": title, "content": content, "tags": None if tags is None else list(tags)}
+        with _api_errors():
+            data = SnippetUpdate(**{k: v for k, v in fields.items() if v is not None})
+            updated = await crud.update_snippet(snippet_id, data, expected_version=version)
+        if not updated:
+            raise _not_found(snippet_id)
+        change_notifier.notify()
+        return _snippet_body(updated)
+
+    async def delete(self, snippet_id: int, version: Optional[int] = None) -> bool:
+        with _api_errors():
+            deleted = await crud.delete_snippet(snippet_id, expected_version=version)
+        if deleted:
+            change_notifier.notify()
+        return deleted
+
+    async def search(self, query: Optional[str] = None, tag: Optional[str] = None,
+                     page: int = 1, page_size: int = 20, *, created_after: Optional[datetime] = None,
+                     updated_before: Optional[datetime] = None) -> Dict:
+        with _api_errors():
+            spec = SearchSpec(query=query, tag=tag, page=page, page_size=page_size,
+                              created_after=created_after, updated_before=updated_before)
+        snippets, total = await crud.search_snippets(
+            spec.query, spec.tag, spec.page, spec.page_size,
+            created_after=epoch_ms(spec.created_after) if spec.created_after is not None else None,
+            updated_before=epoch_ms(spec.updated_before) if spec.updated_before is not None else None
+        )
+        return SnippetSearchResponse(
+            total=total,
+            page=spec.page,
+            page_size=spec.page_size,
+            items=[_snippet_body(s) for s in snippets]
+        ).model_dump(mode="json")
@@ -12,6 +12,70 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = "sqlite+aiosqlite:///./snippetbox.db"
+    SHARD_COUNT: int = 1
+    
+    # Migrations
+    MIGRATION_LOCK_TIMEOUT: float = 30.0
+    BACKFILL_BATCH_DELAY: float = 0.05
+    
+    # Idempotency
+    HASH_OFFLOAD_THRESHOLD: int = 16384
+    DEDUP_INDEX_ENABLED: bool = True
+    DEDUP_INDEX_MAX_ENTRIES: int = 1000000
+    
+    # Batched search
+    MAX_BATCH_SEARCHES: int = 20
+    BATCH_SEARCH_READERS: int = 4
+    MAX_BATCH_GETS: int = 100
+    
+    # Near-duplicate detection
+    SIMILARITY_THRESHOLD: float = 0.6
+    
+    # Rendered response cache
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_MAX_BYTES: int = 67108864
+    RESPONSE_CACHE_GZIP_MIN_BYTES: int = 1024
+    
+    # Syntax highlighting (needs Pygments)
+    RENDER_ENABLED: bool = True
+    RENDER_WORKERS: int = 2
+    RENDER_CACHE_MAX_BYTES: int = 33554432
+    RENDER_CACHE_DIR: str = "./render_cache"
+    RENDER_CACHE_DISK_MAX_BYTES: int = 268435456
+    
+    # Raw content
+    RAW_CHUNK_BYTES: int = 65536
+    
+    # Change feed
+    CHANGE_FEED_PAGE_SIZE: int = 500
+    CHANGE_FEED_POLL_SECONDS: float = 1.0
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    CHANGE_FEED_RETENTION_DAYS: float = 30.0
+    
+    # Suggestions
+    SUGGEST_ENABLED: bool = True
+    SUGGEST_MAX_SNIPPETS: int = 100000
+    SUGGEST_TOP_PREFIX_LEN: int = 3
+    
+    # Retention
+    RETENTION_ENABLED: bool = True
+    RETENTION_INTERVAL_SECONDS: float = 3600.0
+    RETENTION_DELETED_AGE_DAYS: float = 30.0
+    RETENTION_BATCH_SIZE: int = 500
+    RETENTION_BATCH_DELAY: float = 0.05
+    RETENTION_ARCHIVE: str = "table"
+    RETENTION_ARCHIVE_PATH: str = "./archive/snippets.jsonl"
+    RETENTION_VACUUM_PAGES: int = 256
+    
+    # Backups
+    BACKUP_ENABLED: bool = False
+    BACKUP_DIR: str = "./backups"
+    BACKUP_INTERVAL_SECONDS: float = 86400.0
+    BACKUP_STEP_PAGES: int = 1024
+    BACKUP_STEP_DELAY: float = 0.01
+    # Stepped copies restarted more often than this are redone in one step
+    BACKUP_MAX_RESTARTS: int = 3
+    BACKUP_KEEP: int = 7
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -21,6 +85,37 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Admission control
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 32
+    ADMISSION_READ_QUEUE: int = 128
+    ADMISSION_WRITE_CONCURRENCY: int = 4
+    ADMISSION_WRITE_QUEUE: int = 64
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+    
+    # Background pool for post-commit side effects
+    BACKGROUND_WORKERS: int = 4
+    BACKGROUND_THREADS: int = 4
+    BACKGROUND_QUEUE_SIZE: int = 1024
+    BACKGROUND_DRAIN_TIMEOUT: float = 10.0
+    
+    # Metrics
+    METRICS_ENABLED: bool = True
+    
+    # Server-Timing spans (collected only when one of these is on)
+    SERVER_TIMING_HEADER: bool = False
+    SERVER_TIMING_LOG: bool = False
+    
+    # Slow query log
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_EXPLAIN: bool = True
+    SLOW_QUERY_MAX_FINGERPRINTS: int = 200
+    
+    # Admin endpoints; when ADMIN_TOKEN is set, requests must send it as X-Admin-Token
+    ADMIN_ENABLED: bool = False
+    ADMIN_TOKEN: str = ""
+    
     # CORS
     CORS_ENABLED: bool = True
     CORS_ORIGINS: str = "*"
@@ -34,6 +129,8 @@ class Settings(BaseSettings):
     MAX_CONTENT_LENGTH: int = 100000
     MAX_TAG_LENGTH: int = 50
     MAX_TAGS_COUNT: int = 20
+    # 0 derives the request body limit from the field limits above
+    MAX_BODY_BYTES: int = 0
     
     class Config:
         env_file = ".env"
@@ -45,5 +142,13 @@ class Settings(BaseSettings):
             return ["*"]
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",")]
 
+    def get_max_body_bytes(self) -> int:
+        """Largest request body a valid snippet can need."""
+        if self.MAX_BODY_BYTES:
+            return self.MAX_BODY_BYTES
+        chars = self.MAX_TITLE_LENGTH + self.MAX_CONTENT_LENGTH + self.MAX_TAGS_COUNT * self.MAX_TAG_LENGTH
+        # JSON may escape each character as \uXXXX; plus room for keys and punctuation
+        return chars * 6 + 4096
+
 
 settings = Settings()
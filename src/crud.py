@@ -1,167 +1,501 @@
 """CRUD operations for snippets."""
+import asyncio
+import heapq
+import sqlite3
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
 import aiosqlite
-from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.models import Snippet
+from src.database import shard_paths, shard_path, shard_for_hash
 from src.schemas import SnippetCreate, SnippetUpdate
-from src.utils import compute_content_hash, parse_tags, serialize_tags
+from src.utils import (
+    compute_content_hash, parse_tags, serialize_tags, from_epoch_ms, prefix_upper_bound, NOW_MS_SQL
+)
 from src.config import settings
+from src.metrics import track_operation
+from src import querylog
+from src import timing
+from src.dedup import content_hash_index, hash_content, DEDUP_INDEX_HITS
+from src.suggest import suggest_index
+from src import similarity
+from src.response_cache import response_cache
+from src.background import background_pool
 
 
 class CRUDException(Exception):
     """Custom exception for CRUD operations."""
-    def __init__(self, error_code: str, message: str):
+    def __init__(self, error_code: str, message: str, status_code: int = 400):
         self.error_code = error_code
         self.message = message
+        self.status_code = status_code
         super().__init__(message)
 
 
+T = TypeVar("T")
+
+
+@asynccontextmanager
+async def _connect(db_path: str) -> AsyncIterator[aiosqlite.Connection]:
+    """Open a connection, timing its setup as the `conn` span."""
+    with timing.span("conn"):
+        conn = await aiosqlite.connect(db_path)
+    try:
+        yield conn
+    finally:
+        await conn.close()
+
+
+async def _each_shard(fn: Callable[[aiosqlite.Connection], Awaitable[T]]) -> List[T]:
+    """Run `fn` against every shard concurrently, in shard order."""
+    async def run(path: str) -> T:
+        async with _connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+            return await fn(conn)
+    
+    return list(await asyncio.gather(*(run(path) for path in shard_paths())))
+
+
+def _listing_key(row) -> Tuple:
+    return (row['created_at'], row['id'])
+
+
+def _to_snippet(row) -> Snippet:
+    """Build a Snippet model from a snippets row."""
+    return Snippet(
+        id=row['id'],
+        title=row['title'],
+        content=row['content'],
+        tags=row['tags'],
+        created_at=from_epoch_ms(row['created_at']),
+        updated_at=from_epoch_ms(row['updated_at']),
+        content_hash=row['content_hash'],
+        version=row['version']
+    )
+
+
+async def _live_with_hash(conn: aiosqlite.Connection, conn_path: str, snippet_id: int, content_hash: str):
+    """The live row `snippet_id` if it still has this hash, read from its own shard."""
+    sql = "SELECT * FROM snippets WHERE id = ? AND content_hash = ? AND deleted_at IS NULL"
+    path = shard_path(snippet_id)
+    if path == conn_path:
+        return await querylog.fetchone(conn, sql, (snippet_id, content_hash))
+    async with _connect(path) as other:
+        other.row_factory = aiosqlite.Row
+        return await querylog.fetchone(other, sql, (snippet_id, content_hash))
+
+
+async def _hash_in_other_shards(content_hash: str, own_path: str):
+    """A live row with this hash in any shard but `own_path`, else None.
+    
+    Rows stay in their id's shard when an update changes their content, so
+    UNIQUE(content_hash) only covers one file; sharded updates check the
+    others with this. Best effort: the check runs outside the write
+    transaction. Unsharded there is nothing to check.
+    """
+    async def find(path: str):
+        async with _connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+            return await querylog.fetchone(
+                conn,
+                "SELECT * FROM snippets WHERE content_hash = ? AND deleted_at IS NULL",
+                (content_hash,)
+            )
+    
+    found = await asyncio.gather(*(find(path) for path in shard_paths() if path != own_path))
+    return next((row for row in found if row), None)
+
+
+@track_operation("create_snippet")
 async def create_snippet(db: AsyncSession, snippet_data: SnippetCreate) -> Snippet:
     """Create a new snippet with idempotency check (race-condition safe)."""
-    content_hash = compute_content_hash(snippet_data.title, snippet_data.content)
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+    content_hash = await hash_content(snippet_data.title, snippet_data.content)
+    shard = shard_for_hash(content_hash)
+    db_path = shard_paths()[shard]
     
-    async with aiosqlite.connect(db_path) as conn:
+    async with _connect(db_path) as conn:
         conn.row_factory = aiosqlite.Row
         
-        # Atomic operation: try to insert, ignore if hash conflict (idempotency)
+        # Known duplicate: answer with a read, without taking the write lock
+        known_id = content_hash_index.get(content_hash)
+        if known_id is not None:
+            row = await _live_with_hash(conn, db_path, known_id, content_hash)
+            if row:
+                DEDUP_INDEX_HITS.inc()
+                return _to_snippet(row)
+            # Stale entry (deleted or changed by another worker)
+            content_hash_index.discard(content_hash)
+        
+        # Rows that an update moved out of their hash's shard are only found
+        # through the index above; no fan-out, which would cost a connection
+        # per shard on every create
+        
+        signature = await similarity.signature_for(snippet_data.content)
+        
+        # Atomic operation: insert and return the row, or nothing on hash conflict
         try:
             tags_json = serialize_tags(snippet_data.tags)
-            cursor = await conn.execute(
-                """INSERT OR IGNORE INTO snippets (title, content, tags, content_hash) 
-                   VALUES (?, ?, ?, ?)""",
-                (snippet_data.title, snippet_data.content, tags_json, content_hash)
+            # Next id above the shard's high-water mark with id % SHARD_COUNT == shard
+            # (plain AUTOINCREMENT when unsharded); evaluated under the write lock
+            row = await querylog.fetchone_returning(
+                conn,
+                """INSERT INTO snippets (id, title, content, tags, content_hash) 
+                   VALUES (
+                       (COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'snippets'), 0) / ? + 1) * ? + ?,
+                       ?, ?, ?, ?
+                   )
+                   ON CONFLICT(content_hash) DO NOTHING
+                   RETURNING *""",
+                (len(shard_paths()), len(shard_paths()), shard,
+                 snippet_data.title, snippet_data.content, tags_json, content_hash)
             )
+            if row:
+                await similarity.store_signature(conn, row['id'], signature)
             await conn.commit()
         except Exception as e:
             # Rollback on any database error
             await conn.rollback()
             raise CRUDException("CREATE_FAILED", f"Database error: {str(e)}")
         
-        # Always query to return the record (whether newly created or existing)
-        cursor = await conn.execute(
-            "SELECT * FROM snippets WHERE content_hash = ? AND deleted_at IS NULL",
-            (content_hash,)
-        )
-        row = await cursor.fetchone()
+        if row:
+            await background_pool.submit(
+                "suggest_index", suggest_index.add, row['id'], row['title'], snippet_data.tags, key=row['id']
+            )
+        else:
+            # Duplicate written concurrently or before the index knew about it
+            row = await querylog.fetchone(
+                conn,
+                "SELECT * FROM snippets WHERE content_hash = ? AND deleted_at IS NULL",
+                (content_hash,)
+            )
         
         if not row:
             raise CRUDException("CREATE_FAILED", "Failed to create or retrieve snippet")
         
-        return Snippet(
-            id=row['id'],
-            title=row['title'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at'],
-            content_hash=row['content_hash']
-        )
+        content_hash_index.add(content_hash, row['id'])
+        return _to_snippet(row)
 
 
+@track_operation("get_snippet")
 async def get_snippet(snippet_id: int) -> Optional[Snippet]:
     """Get a snippet by ID (excluding soft-deleted)."""
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
-    async with aiosqlite.connect(db_path) as conn:
+    db_path = shard_path(snippet_id)
+    async with _connect(db_path) as conn:
         conn.row_factory = aiosqlite.Row
-        cursor = await conn.execute(
+        row = await querylog.fetchone(
+            conn,
             "SELECT * FROM snippets WHERE id = ? AND deleted_at IS NULL",
             (snippet_id,)
         )
-        row = await cursor.fetchone()
         
         if not row:
             return None
         
-        return Snippet(
-            id=row['id'],
-            title=row['title'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at'],
-            content_hash=row['content_hash']
+        return _to_snippet(row)
+
+
+@track_operation("get_snippets")
+async def get_snippets(snippet_ids: List[int]) -> List[Snippet]:
+    """Live snippets among `snippet_ids`, in request order; missing ids are skipped.
+    
+    One `id IN (...)` lookup per shard holding any of the ids.
+    """
+    ids = list(dict.fromkeys(snippet_ids))
+    by_path: Dict[str, List[int]] = defaultdict(list)
+    for snippet_id in ids:
+        by_path[shard_path(snippet_id)].append(snippet_id)
+    
+    async def lookup(path: str, shard_ids: List[int]):
+        async with _connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+            placeholders = ", ".join("?" * len(shard_ids))
+            return await querylog.fetchall(
+                conn,
+                f"SELECT * FROM snippets WHERE id IN ({placeholders}) AND deleted_at IS NULL",
+                shard_ids
+            )
+    
+    results = await asyncio.gather(*(lookup(path, shard_ids) for path, shard_ids in by_path.items()))
+    found = {row['id']: _to_snippet(row) for rows in results for row in rows}
+    return [found[snippet_id] for snippet_id in ids if snippet_id in found]
+
+
+def search_queries(
+    query: Optional[str] = None,
+    tag: Optional[str] = None,
+    created_after: Optional[int] = None,
+    updated_before: Optional[int] = None
+) -> Tuple[str, str, list]:
+    """Build the count and page SQL for a search, plus the filter params.
+    
+    The page query takes `LIMIT ? OFFSET ?` after the filter params. Ids are
+    paged on the covering live-listing index first, so skipped rows never
+    touch the table. Time bounds are epoch milliseconds (exclusive), compared
+    as integers on the same index.
+    """
+    where_conditions = ["deleted_at IS NULL"]
+    params = []
+    
+    # Full-text search on title/content
+    if query:
+        where_conditions.append(
+            "id IN (SELECT rowid FROM snippets_fts WHERE snippets_fts MATCH ?)"
+        )
+        params.append(query)
+    
+    # Tag filter
+    if tag:
+        where_conditions.append("tags LIKE ?")
+        params.append(f'%"{tag}"%')
+    
+    if created_after is not None:
+        where_conditions.append("created_at > ?")
+        params.append(created_after)
+    
+    if updated_before is not None:
+        where_conditions.append("updated_at < ?")
+        params.append(updated_before)
+    
+    where_clause = " AND ".join(where_conditions)
+    count_sql = f"SELECT COUNT(*) as total FROM snippets WHERE {where_clause}"
+    select_sql = f"""
+        SELECT * FROM snippets
+        WHERE id IN (
+            SELECT id FROM snippets
+            WHERE {where_clause}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ? OFFSET ?
         )
+        ORDER BY created_at DESC, id DESC
+    """
+    return count_sql, select_sql, params
 
 
+@track_operation("search_snippets")
 async def search_snippets(
     query: Optional[str] = None,
     tag: Optional[str] = None,
     page: int = 1,
-    page_size: int = 20
+    page_size: int = 20,
+    created_after: Optional[int] = None,
+    updated_before: Optional[int] = None
 ) -> Tuple[List[Snippet], int]:
-    """Search snippets with filters and pagination."""
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+    """Search snippets with filters and pagination.
     
-    async with aiosqlite.connect(db_path) as conn:
-        conn.row_factory = aiosqlite.Row
-        
-        # Build query
-        where_conditions = ["deleted_at IS NULL"]
-        params = []
-        
-        # Full-text search on title/content
-        if query:
-            where_conditions.append(
-                "id IN (SELECT rowid FROM snippets_fts WHERE snippets_fts MATCH ?)"
+    When sharded, every shard is queried concurrently for its first
+    `offset + page_size` matches and the sorted lists are merged, so pages
+    follow the same global `created_at DESC, id DESC` order as one file.
+    """
+    paths = shard_paths()
+    count_sql, select_sql, params = search_queries(query, tag, created_after, updated_before)
+    offset = (page - 1) * page_size
+    
+    if len(paths) == 1:
+        async with _connect(paths[0]) as conn:
+            conn.row_factory = aiosqlite.Row
+            total, pages = await _search_on(
+                conn, query, tag, [(page, page_size)], created_after, updated_before
             )
-            params.append(query)
-        
-        # Tag filter
-        if tag:
-            where_conditions.append("tags LIKE ?")
-            params.append(f'%"{tag}"%')
-        
-        where_clause = " AND ".join(where_conditions)
-        
-        # Count total
-        count_sql = f"SELECT COUNT(*) as total FROM snippets WHERE {where_clause}"
-        cursor = await conn.execute(count_sql, params)
-        total = (await cursor.fetchone())['total']
-        
-        # Fetch paginated results
+            return pages[0], total
+    
+    async def shard_page(conn: aiosqlite.Connection):
+        total = (await querylog.fetchone(conn, count_sql, params))['total']
+        rows = await querylog.fetchall(conn, select_sql, params + [offset + page_size, 0])
+        return total, rows
+    
+    results = await _each_shard(shard_page)
+    merged = heapq.merge(*(rows for _, rows in results), key=_listing_key, reverse=True)
+    snippets = [_to_snippet(row) for row in islice(merged, offset, offset + page_size)]
+    return snippets, sum(total for total, _ in results)
+
+
+async def _search_on(
+    conn: aiosqlite.Connection,
+    query: Optional[str],
+    tag: Optional[str],
+    pages: List[Tuple[int, int]],
+    created_after: Optional[int] = None,
+    updated_before: Optional[int] = None
+) -> Tuple[int, List[List[Snippet]]]:
+    """Count one filter once and fetch each (page, page_size) of it."""
+    count_sql, select_sql, params = search_queries(query, tag, created_after, updated_before)
+    
+    # Count total
+    total = (await querylog.fetchone(conn, count_sql, params))['total']
+    
+    # Fetch paginated results
+    results = []
+    for page, page_size in pages:
         offset = (page - 1) * page_size
-        select_sql = f"""
-            SELECT * FROM snippets 
-            WHERE {where_clause}
-            ORDER BY created_at DESC
-            LIMIT ? OFFSET ?
-        """
-        cursor = await conn.execute(select_sql, params + [page_size, offset])
-        rows = await cursor.fetchall()
-        
-        snippets = [
-            Snippet(
-                id=row['id'],
-                title=row['title'],
-                content=row['content'],
-                tags=row['tags'],
-                created_at=row['created_at'],
-                updated_at=row['updated_at'],
-                content_hash=row['content_hash']
+        rows = await querylog.fetchall(conn, select_sql, params + [page_size, offset])
+        results.append([_to_snippet(row) for row in rows])
+    return total, results
+
+
+# (query, tag, page, page_size, created_after, updated_before)
+SearchSpec = Tuple[Optional[str], Optional[str], int, int, Optional[int], Optional[int]]
+
+
+@track_operation("search_snippets_batch")
+async def search_snippets_batch(specs: List[SearchSpec]) -> List[Tuple[List[Snippet], int]]:
+    """Run several `SearchSpec` searches, results in spec order.
+    
+    Identical specs run once, and specs with the same filters share one
+    COUNT. Unsharded, the filter groups are spread over up to
+    BATCH_SEARCH_READERS connections that read in parallel; sharded, each
+    distinct search fans out exactly like `search_snippets`.
+    """
+    distinct = list(dict.fromkeys(specs))
+    paths = shard_paths()
+    by_spec: Dict[SearchSpec, Tuple[List[Snippet], int]] = {}
+    
+    if len(paths) > 1:
+        results = await asyncio.gather(*(search_snippets(*spec) for spec in distinct))
+        by_spec.update(zip(distinct, results))
+        return [by_spec[spec] for spec in specs]
+    
+    groups: Dict[tuple, List[Tuple[int, int]]] = defaultdict(list)
+    for query, tag, page, page_size, created_after, updated_before in distinct:
+        groups[(query, tag, created_after, updated_before)].append((page, page_size))
+    grouped = list(groups.items())
+    readers = max(min(settings.BATCH_SEARCH_READERS, len(grouped)), 1)
+    
+    async def read(share) -> None:
+        async with _connect(paths[0]) as conn:
+            conn.row_factory = aiosqlite.Row
+            for (query, tag, created_after, updated_before), pages in share:
+                total, results = await _search_on(conn, query, tag, pages, created_after, updated_before)
+                for (page, page_size), snippets in zip(pages, results):
+                    by_spec[(query, tag, page, page_size, created_after, updated_before)] = (snippets, total)
+    
+    await asyncio.gather(*(read(grouped[n::readers]) for n in range(readers)))
+    return [by_spec[spec] for spec in specs]
+
+
+@track_operation("list_tags")
+async def list_tags(prefix: Optional[str] = None, limit: int = 50) -> List[Tuple[str, int]]:
+    """Most used tags with their live snippet counts, optionally by prefix.
+    
+    When sharded, per-shard counts are summed before ranking, so every
+    shard returns all matching tags rather than its own top `limit`.
+    """
+    sharded = len(shard_paths()) > 1
+    # -1 disables LIMIT in SQLite
+    shard_limit = -1 if sharded else limit
+    
+    async def shard_tags(conn: aiosqlite.Connection):
+        if prefix:
+            # Range on the primary key instead of LIKE, which can't use it
+            upper = prefix_upper_bound(prefix)
+            if upper is None:
+                return await querylog.fetchall(
+                    conn,
+                    """SELECT tag, count FROM tag_counts
+                       WHERE tag >= ?
+                       ORDER BY count DESC, tag LIMIT ?""",
+                    (prefix, shard_limit)
+                )
+            return await querylog.fetchall(
+                conn,
+                """SELECT tag, count FROM tag_counts
+                   WHERE tag >= ? AND tag < ?
+                   ORDER BY count DESC, tag LIMIT ?""",
+                (prefix, upper, shard_limit)
             )
-            for row in rows
-        ]
-        
-        return snippets, total
+        return await querylog.fetchall(
+            conn,
+            "SELECT tag, count FROM tag_counts ORDER BY count DESC, tag LIMIT ?",
+            (shard_limit,)
+        )
+    
+    results = await _each_shard(shard_tags)
+    if not sharded:
+        return [(row[0], row[1]) for row in results[0]]
+    
+    counts = Counter()
+    for rows in results:
+        for tag_name, count in rows:
+            counts[tag_name] += count
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
 
 
-async def update_snippet(snippet_id: int, update_data: SnippetUpdate) -> Optional[Snippet]:
-    """Update a snippet."""
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+@track_operation("list_changes")
+async def list_changes(
+    since: Optional[int] = 0,
+    limit: int = 100,
+    shard: int = 0
+) -> Tuple[List[dict], bool, int]:
+    """Change records after `since`, whether more remain, and the latest seq.
+    
+    With `since=None` only the latest seq is returned, as a starting point.
+    Raises CHANGES_EXPIRED when records after `since` were already pruned.
+    When sharded, each shard has its own feed and sequence numbers.
+    """
+    paths = shard_paths()
+    if not 0 <= shard < len(paths):
+        raise CRUDException(
+            "INVALID_SHARD",
+            f"Shard must be between 0 and {len(paths) - 1}"
+        )
+    db_path = paths[shard]
     
-    async with aiosqlite.connect(db_path) as conn:
+    async with _connect(db_path) as conn:
         conn.row_factory = aiosqlite.Row
-        
-        # Check if snippet exists and not deleted
-        cursor = await conn.execute(
-            "SELECT * FROM snippets WHERE id = ? AND deleted_at IS NULL",
-            (snippet_id,)
+        bounds = await querylog.fetchone(
+            conn,
+            """SELECT (SELECT MIN(seq) FROM snippet_changes) AS oldest,
+                      (SELECT seq FROM sqlite_sequence WHERE name = 'snippet_changes') AS latest"""
         )
-        existing = await cursor.fetchone()
+        latest = bounds['latest'] or 0
+        if since is None:
+            return [], False, latest
+        oldest = bounds['oldest'] if bounds['oldest'] is not None else latest + 1
+        if since < oldest - 1:
+            raise CRUDException(
+                "CHANGES_EXPIRED",
+                f"Changes after seq {since} were pruned; rescan and resume from seq {latest}",
+                status_code=410
+            )
         
-        if not existing:
-            return None
+        rows = await querylog.fetchall(
+            conn,
+            """SELECT seq, snippet_id, op, version, changed_at FROM snippet_changes
+               WHERE seq > ? ORDER BY seq LIMIT ?""",
+            (since, limit + 1)
+        )
+        changes = [
+            {
+                "seq": row['seq'],
+                "id": row['snippet_id'],
+                "op": row['op'],
+                "version": row['version'],
+                "changed_at": from_epoch_ms(row['changed_at'])
+            }
+            for row in rows[:limit]
+        ]
+        return changes, len(rows) > limit, latest
+
+
+@track_operation("update_snippet")
+async def update_snippet(
+    snippet_id: int,
+    update_data: SnippetUpdate,
+    expected_version: Optional[int] = None
+) -> Optional[Snippet]:
+    """Update a snippet in a single statement.
+    
+    When `expected_version` is given the update only applies if the row is
+    still at that version; otherwise PRECONDITION_FAILED is raised.
+    """
+    db_path = shard_path(snippet_id)
+    signature = None
+    if update_data.content is not None:
+        signature = await similarity.signature_for(update_data.content)
+    
+    async with _connect(db_path) as conn:
+        conn.row_factory = aiosqlite.Row
         
         # Build update fields
         update_fields = []
@@ -181,67 +515,186 @@ async def update_snippet(snippet_id: int, update_data: SnippetUpdate) -> Optiona
         
         if not update_fields:
             # No fields to update, return existing
-            return Snippet(
-                id=existing['id'],
-                title=existing['title'],
-                content=existing['content'],
-                tags=existing['tags'],
-                created_at=existing['created_at'],
-                updated_at=existing['updated_at'],
-                content_hash=existing['content_hash']
+            row = await querylog.fetchone(
+                conn,
+                "SELECT * FROM snippets WHERE id = ? AND deleted_at IS NULL",
+                (snippet_id,)
+            )
+            if row and expected_version is not None and row['version'] != expected_version:
+                raise _precondition_failed(snippet_id)
+            return _to_snippet(row) if row else None
+        
+        if (update_data.title is not None or update_data.content is not None) and len(shard_paths()) > 1:
+            # Other shards can't see this file's UNIQUE index; check the new hash first
+            current = await querylog.fetchone(
+                conn,
+                "SELECT title, content FROM snippets WHERE id = ? AND deleted_at IS NULL",
+                (snippet_id,)
             )
+            if current:
+                new_hash = await hash_content(
+                    update_data.title if update_data.title is not None else current['title'],
+                    update_data.content if update_data.content is not None else current['content']
+                )
+                if await _hash_in_other_shards(new_hash, db_path):
+                    raise _duplicate_content()
         
-        # Update content_hash if title or content changed
-        new_title = update_data.title if update_data.title is not None else existing['title']
-        new_content = update_data.content if update_data.content is not None else existing['content']
-        new_hash = compute_content_hash(new_title, new_content)
-        update_fields.append("content_hash = ?")
-        params.append(new_hash)
+        if update_data.title is not None or update_data.content is not None:
+            # Hash the merged title/content inside SQLite so no prior read is needed
+            await conn.create_function("snippet_hash", 2, compute_content_hash, deterministic=True)
+            update_fields.append("content_hash = snippet_hash(COALESCE(?, title), COALESCE(?, content))")
+            params.extend([update_data.title, update_data.content])
         
-        update_fields.append("updated_at = CURRENT_TIMESTAMP")
+        update_fields.append(f"updated_at = {NOW_MS_SQL}")
+        update_fields.append("version = version + 1")
         params.append(snippet_id)
         
-        update_sql = f"UPDATE snippets SET {', '.join(update_fields)} WHERE id = ?"
-        await conn.execute(update_sql, params)
+        where_clause = "id = ? AND deleted_at IS NULL"
+        if expected_version is not None:
+            where_clause += " AND version = ?"
+            params.append(expected_version)
+        
+        update_sql = f"UPDATE snippets SET {', '.join(update_fields)} WHERE {where_clause} RETURNING *"
+        try:
+            row = await querylog.fetchone_returning(conn, update_sql, params)
+        except sqlite3.IntegrityError:
+            await conn.rollback()
+            raise _duplicate_content()
+        if row and signature is not None:
+            await similarity.store_signature(conn, snippet_id, signature)
         await conn.commit()
         
-        # Fetch updated snippet
-        cursor = await conn.execute(
-            "SELECT * FROM snippets WHERE id = ?",
-            (snippet_id,)
-        )
-        row = await cursor.fetchone()
-        
-        return Snippet(
-            id=row['id'],
-            title=row['title'],
-            content=row['content'],
-            tags=row['tags'],
-            created_at=row['created_at'],
-            updated_at=row['updated_at'],
-            content_hash=row['content_hash']
+        if not row:
+            if expected_version is not None and await _is_live(conn, snippet_id):
+                raise _precondition_failed(snippet_id)
+            return None
+        
+        # The old hash may linger in the index; hits are re-validated anyway
+        response_cache.invalidate(snippet_id)
+        content_hash_index.add(row['content_hash'], snippet_id)
+        await background_pool.submit(
+            "suggest_index", suggest_index.add, snippet_id, row['title'], parse_tags(row['tags']), key=snippet_id
         )
+        return _to_snippet(row)
 
 
-async def delete_snippet(snippet_id: int) -> bool:
-    """Soft delete a snippet."""
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+@track_operation("delete_snippet")
+async def delete_snippet(snippet_id: int, expected_version: Optional[int] = None) -> bool:
+    """Soft delete a snippet in a single statement."""
+    db_path = shard_path(snippet_id)
     
-    async with aiosqlite.connect(db_path) as conn:
-        # Check if snippet exists and not already deleted
-        cursor = await conn.execute(
-            "SELECT id FROM snippets WHERE id = ? AND deleted_at IS NULL",
-            (snippet_id,)
+    async with _connect(db_path) as conn:
+        params = [snippet_id]
+        where_clause = "id = ? AND deleted_at IS NULL"
+        if expected_version is not None:
+            where_clause += " AND version = ?"
+            params.append(expected_version)
+        
+        row = await querylog.fetchone_returning(
+            conn,
+            f"""UPDATE snippets SET deleted_at = {NOW_MS_SQL}, version = version + 1
+                WHERE {where_clause} RETURNING content_hash""",
+            params
         )
-        existing = await cursor.fetchone()
+        await conn.commit()
         
-        if not existing:
+        if not row:
+            if expected_version is not None and await _is_live(conn, snippet_id):
+                raise _precondition_failed(snippet_id)
             return False
         
-        # Soft delete
-        await conn.execute(
-            "UPDATE snippets SET deleted_at = CURRENT_TIMESTAMP WHERE id = ?",
+        response_cache.invalidate(snippet_id)
+        content_hash_index.discard(row[0])
+        await background_pool.submit("suggest_index", suggest_index.discard, snippet_id, key=snippet_id)
+        return True
+
+
+@track_operation("find_similar")
+async def find_similar(
+    snippet_id: int,
+    threshold: Optional[float] = None,
+    limit: int = 10
+) -> Optional[List[Tuple[Snippet, float]]]:
+    """Live snippets whose content is near-identical, most similar first.
+    
+    Returns None when the snippet doesn't exist.
+    """
+    threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+    db_path = shard_path(snippet_id)
+    
+    async with _connect(db_path) as conn:
+        conn.row_factory = aiosqlite.Row
+        row = await querylog.fetchone(
+            conn,
+            """SELECT s.id, s.content, g.signature FROM snippets s
+               LEFT JOIN snippet_signatures g ON g.snippet_id = s.id
+               WHERE s.id = ? AND s.deleted_at IS NULL""",
             (snippet_id,)
         )
-        await conn.commit()
-        return True
+        if not row:
+            return None
+        
+        if row['signature'] is not None:
+            signature = similarity.unpack(row['signature'])
+        else:
+            # Not backfilled yet
+            signature = await similarity.signature_for(row['content'])
+    
+    # Near copies can live in any shard
+    found = {}
+    for shard_found in await _each_shard(
+        lambda conn: similarity.candidates(conn, signature, exclude_id=snippet_id)
+    ):
+        found.update(shard_found)
+    ranked = similarity.rank(signature, found, threshold, limit)
+    if not ranked:
+        return []
+    
+    by_id = await _live_by_ids(i for i, _ in ranked)
+    return [(by_id[i], score) for i, score in ranked if i in by_id]
+
+
+async def _live_by_ids(snippet_ids: Iterable[int]) -> Dict[int, Snippet]:
+    """Fetch live snippets by id, one query per shard involved."""
+    by_path: Dict[str, List[int]] = defaultdict(list)
+    for snippet_id in snippet_ids:
+        by_path[shard_path(snippet_id)].append(snippet_id)
+    
+    snippets = {}
+    for path, ids in by_path.items():
+        async with _connect(path) as conn:
+            conn.row_factory = aiosqlite.Row
+            placeholders = ", ".join("?" * len(ids))
+            rows = await querylog.fetchall(
+                conn,
+                f"SELECT * FROM snippets WHERE id IN ({placeholders}) AND deleted_at IS NULL",
+                ids
+            )
+            snippets.update((row['id'], _to_snippet(row)) for row in rows)
+    return snippets
+
+
+async def _is_live(conn: aiosqlite.Connection, snippet_id: int) -> bool:
+    """Whether a snippet exists and is not deleted (failure path only)."""
+    row = await querylog.fetchone(
+        conn,
+        "SELECT 1 FROM snippets WHERE id = ? AND deleted_at IS NULL",
+        (snippet_id,)
+    )
+    return row is not None
+
+
+def _duplicate_content() -> CRUDException:
+    return CRUDException(
+        "DUPLICATE_CONTENT",
+        "Another snippet already has this title and content",
+        status_code=409
+    )
+
+
+def _precondition_failed(snippet_id: int) -> CRUDException:
+    return CRUDException(
+        "PRECONDITION_FAILED",
+        f"Snippet with ID {snippet_id} was modified by another request",
+        status_code=412
+    )
@@ -1,4 +1,7 @@
 """Database connection and session management."""
+import asyncio
+import os
+from typing import List
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from src.config import settings
@@ -31,20 +34,40 @@ async def get_db():
             await session.close()
 
 
-async def init_db():
-    """Initialize database tables."""
-    import aiosqlite
-    from pathlib import Path
-    
-    # Extract database path from URL
-    db_path = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+def get_db_path() -> str:
+    """Filesystem path of the SQLite database from DATABASE_URL."""
+    return settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "")
+
+
+def shard_paths() -> List[str]:
+    """Database file of every shard; just the main file when SHARD_COUNT is 1.
     
-    # Read migration SQL
-    migration_file = Path(__file__).parent.parent / "migrations" / "init.sql"
-    with open(migration_file, 'r', encoding='utf-8') as f:
-        migration_sql = f.read()
+    Shard files sit next to the main file as `<name>.shard<N><ext>`.
+    """
+    path = get_db_path()
+    if settings.SHARD_COUNT <= 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.shard{n}{ext}" for n in range(settings.SHARD_COUNT)]
+
+
+def shard_of(snippet_id: int) -> int:
+    """Shard holding a snippet: ids are allocated so that id % SHARD_COUNT is the shard."""
+    return snippet_id % max(settings.SHARD_COUNT, 1)
+
+
+def shard_path(snippet_id: int) -> str:
+    """Database file holding a snippet."""
+    return shard_paths()[shard_of(snippet_id)]
+
+
+def shard_for_hash(content_hash: str) -> int:
+    """Shard a new snippet is written to; equal content always maps to the same shard."""
+    return int(content_hash[:8], 16) % max(settings.SHARD_COUNT, 1)
+
+
+async def init_db():
+    """Initialize database tables by applying pending migrations on every shard."""
+    from src.migrations import run_migrations
     
-    # Execute migration
-    async with aiosqlite.connect(db_path) as db:
-        await db.executescript(migration_sql)
-        await db.commit()
+    await asyncio.gather(*(run_migrations(path) for path in shard_paths()))
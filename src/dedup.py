@@ -0,0 +1,86 @@
+"""Fast duplicate detection for idempotent snippet creation."""
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+import aiosqlite
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src.utils import compute_content_hash
+
+DEDUP_INDEX_HITS = REGISTRY.counter(
+    "snippetbox_dedup_index_hits",
+    "Duplicate creates answered from the content hash index",
+)
+DEDUP_INDEX_ENTRIES = REGISTRY.gauge(
+    "snippetbox_dedup_index_entries",
+    "Entries in the in-memory content hash index",
+)
+
+
+async def hash_content(title: str, content: str) -> str:
+    """Compute the content hash, off the event loop for large snippets.
+
+    hashlib releases the GIL for large buffers, so worker threads hash in
+    parallel with request handling.
+    """
+    if len(title) + len(content) >= settings.HASH_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(compute_content_hash, title, content)
+    return compute_content_hash(title, content)
+
+
+class ContentHashIndex:
+    """In-memory content_hash → id map of live snippets.
+
+    The index is advisory: a hit is re-validated against the database before
+    it is trusted, and a miss falls through to the normal insert path, so
+    the UNIQUE constraint on content_hash stays the final authority. When
+    full, the oldest entries are evicted.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._ids: "OrderedDict[str, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, content_hash: str) -> Optional[int]:
+        return self._ids.get(content_hash)
+
+    def add(self, content_hash: str, snippet_id: int) -> None:
+        if not settings.DEDUP_INDEX_ENABLED:
+            return
+        self._ids[content_hash] = snippet_id
+        self._ids.move_to_end(content_hash)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def discard(self, content_hash: str) -> None:
+        self._ids.pop(content_hash, None)
+
+    def clear(self) -> None:
+        self._ids.clear()
+
+    async def warm(self, db_path: str, batch_size: int = 10000) -> int:
+        """Load live snippets, newest last so they survive eviction; returns rows read."""
+        if not settings.DEDUP_INDEX_ENABLED:
+            return 0
+        loaded = 0
+        async with aiosqlite.connect(db_path) as conn:
+            cursor = await conn.execute(
+                "SELECT content_hash, id FROM snippets WHERE deleted_at IS NULL ORDER BY id"
+            )
+            while True:
+                rows = await cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for content_hash, snippet_id in rows:
+                    self.add(content_hash, snippet_id)
+                loaded += len(rows)
+        return loaded
+
+
+content_hash_index = ContentHashIndex(settings.DEDUP_INDEX_MAX_ENTRIES)
+DEDUP_INDEX_ENTRIES.set_function(lambda: len(content_hash_index))
@@ -1,25 +1,48 @@
 """FastAPI application entry point."""
-from fastapi import FastAPI, Depends, HTTPException, status, Query, Response
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Response, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
-from typing import Optional
+import asyncio
+import hmac
+from typing import List, Optional
 import uvicorn
 
 from src.config import settings
-from src.database import get_db, init_db
+from src.database import get_db, init_db, shard_paths
+from src.migrations import run_backfills
 from src.schemas import (
     SnippetCreate, SnippetUpdate, SnippetResponse,
-    SnippetCreateResponse, SnippetSearchResponse,
-    HealthResponse, ErrorResponse
+    SnippetCreateResponse, SnippetSearchResponse, SnippetBatchResponse, BatchSearchRequest, BatchSearchResponse,
+    HealthResponse, ErrorResponse, SlowQueryListResponse, RetentionReport,
+    BackupRunResponse, BackupListResponse,
+    TagListResponse, SuggestResponse, SimilarSnippetsResponse, ChangeListResponse
 )
 from src.crud import (
-    create_snippet, get_snippet, search_snippets,
-    update_snippet, delete_snippet, CRUDException
+    create_snippet, get_snippet, get_snippets, search_snippets, search_snippets_batch,
+    update_snippet, delete_snippet, list_tags, find_similar, list_changes, CRUDException
 )
-from src.middleware import TracingMiddleware, RateLimitMiddleware, logger
-from src.utils import get_trace_id, parse_tags
+from src.middleware import (
+    TracingMiddleware, RateLimitMiddleware, BodySizeLimitMiddleware, ServerTimingMiddleware, logger
+)
+from src.admission import AdmissionControlMiddleware
+from src.metrics import REGISTRY, CONTENT_TYPE_LATEST
+from src.querylog import slow_query_log
+from src.dedup import content_hash_index
+from src.suggest import suggest_index, MAX_SUGGESTIONS
+from src.changes import change_notifier, change_events, follow_changes
+from src.background import background_pool
+from src.response_cache import (
+    response_cache, preferred_encoding, IDENTITY,
+    RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES
+)
+from src.retention import run_retention_all, retention_loop
+from src import render
+from src.raw_content import open_content, parse_range, RangeNotSatisfiable
+from src import backup
+from src import timing
+from src.utils import get_trace_id, parse_tags, make_etag, parse_if_match, etag_matches, epoch_ms
 
 # Create FastAPI app
 app = FastAPI(
@@ -27,10 +50,16 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="Online code snippet service"
 )
+app.router.route_class = timing.TimedRoute
 
-# Add middlewares
+# Add middlewares (first added is innermost). The body limit sits directly in front
+# of the routes so its 413 reaches the exception handlers; admission control is
+# inside tracing so shed requests are still traced. Server-Timing wraps all of them.
+app.add_middleware(BodySizeLimitMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(TracingMiddleware)
 app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ServerTimingMiddleware)
 
 # Add CORS
 if settings.CORS_ENABLED:
@@ -66,7 +95,7 @@ async def http_exception_handler(request, exc):
 async def crud_exception_handler(request, exc: CRUDException):
     """Handle CRUD exceptions."""
     return JSONResponse(
-        status_code=status.HTTP_400_BAD_REQUEST,
+        status_code=exc.status_code,
         content={
             "error_code": exc.error_code,
             "message": exc.message,
@@ -89,13 +118,71 @@ async def general_exception_handler(request, exc):
     )
 
 
+async def run_backfills_in_background():
+    """Run online data backfills without blocking startup."""
+    try:
+        for path in shard_paths():
+            await run_backfills(path)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.log("error", "Backfill failed", error=str(e))
+
+
+async def warm_indexes():
+    """Load in-memory lookup structures from the database."""
+    try:
+        entries = snippets = 0
+        for path in shard_paths():
+            entries += await content_hash_index.warm(path)
+            snippets += await suggest_index.warm(path)
+        logger.log("info", "Content hash index warmed", entries=entries, indexed=len(content_hash_index))
+        logger.log("info", "Suggestion index warmed", snippets=snippets, terms=len(suggest_index))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.log("error", "Index warm-up failed", error=str(e))
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup."""
     await init_db()
+    background_pool.start()
+    app.state.background_tasks = [
+        asyncio.create_task(run_backfills_in_background()),
+        asyncio.create_task(warm_indexes()),
+    ]
+    if settings.RESPONSE_CACHE_ENABLED:
+        # Drop cached responses for snippets changed by other workers
+        app.state.background_tasks.append(asyncio.create_task(
+            follow_changes(response_cache.invalidate, response_cache.clear)
+        ))
+    if settings.SUGGEST_ENABLED:
+        # Pick up titles and tags written by other workers
+        app.state.background_tasks.append(asyncio.create_task(
+            follow_changes(suggest_index.refresh, suggest_index.rewarm)
+        ))
+    if settings.RETENTION_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(retention_loop(shard_paths())))
+    if settings.BACKUP_ENABLED:
+        app.state.background_tasks.append(asyncio.create_task(backup.backup_loop(shard_paths())))
+    if settings.ADMIN_ENABLED and not settings.ADMIN_TOKEN:
+        logger.log("warning", "Admin endpoints are enabled without ADMIN_TOKEN")
     logger.log("info", "Application started", version=settings.APP_VERSION)
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Finish queued side effects, then stop background tasks."""
+    await background_pool.drain(settings.BACKGROUND_DRAIN_TIMEOUT)
+    tasks = getattr(app.state, "background_tasks", [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    render.shutdown_pool()
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
@@ -105,19 +192,107 @@ async def health_check():
     }
 
 
-@app.post("/snippets", response_model=SnippetCreateResponse, status_code=status.HTTP_201_CREATED)
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus metrics in text exposition format."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency hiding admin endpoints when disabled and checking ADMIN_TOKEN."""
+    if not settings.ADMIN_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.ADMIN_TOKEN and not hmac.compare_digest(
+        (x_admin_token or "").encode(), settings.ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "error_code": "UNAUTHORIZED",
+                "message": "Missing or invalid X-Admin-Token",
+                "trace_id": get_trace_id()
+            }
+        )
+
+
+@app.get("/admin/slow-queries", response_model=SlowQueryListResponse,
+         dependencies=[Depends(require_admin)])
+async def slow_queries_endpoint(
+    limit: int = Query(20, ge=1, le=200, description="Number of fingerprints")
+):
+    """List the slowest query fingerprints by total time."""
+    return {
+        "threshold_ms": settings.SLOW_QUERY_THRESHOLD_MS,
+        "items": slow_query_log.top(limit)
+    }
+
+
+@app.delete("/admin/slow-queries", status_code=status.HTTP_204_NO_CONTENT,
+            dependencies=[Depends(require_admin)])
+async def clear_slow_queries_endpoint():
+    """Reset the slow query log."""
+    slow_query_log.clear()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@app.post("/admin/retention/run", response_model=RetentionReport,
+          dependencies=[Depends(require_admin)])
+async def run_retention_endpoint():
+    """Run the soft-delete retention job now and report what it reclaimed."""
+    return await run_retention_all(shard_paths())
+
+
+@app.post("/admin/backups", response_model=BackupRunResponse,
+          response_model_exclude_none=True, dependencies=[Depends(require_admin)])
+async def run_backup_endpoint(
+    force: bool = Query(True, description="Snapshot even if nothing changed since the last one")
+):
+    """Take an online snapshot of every database file now."""
+    return {"items": [await backup.run_backup(path, force=force) for path in shard_paths()]}
+
+
+@app.get("/admin/backups", response_model=BackupListResponse,
+         response_model_exclude_none=True, dependencies=[Depends(require_admin)])
+async def list_backups_endpoint(
+    verify: bool = Query(False, description="Re-hash each snapshot and compare with its manifest")
+):
+    """List snapshots, newest first, and the progress of a running backup."""
+    items = backup.list_snapshots()
+    if verify:
+        for manifest in items:
+            manifest["verified"] = await asyncio.to_thread(backup.verify_snapshot, manifest)
+    return {"in_progress": backup.progress, "items": items}
+
+
+async def _after_write(message: str, snippet_id: int) -> None:
+    """Hand a committed write's log line and change-feed wake-up to the background pool."""
+    await background_pool.submit("log", logger.log, "info", message, snippet_id=snippet_id, thread=True)
+    await background_pool.submit("change_notify", change_notifier.notify)
+
+
+@app.post("/snippets", response_model=SnippetCreateResponse, status_code=status.HTTP_201_CREATED,
+          response_model_exclude_none=True)
 async def create_snippet_endpoint(
     snippet: SnippetCreate,
+    check_similar: bool = Query(False, description="Report near-duplicates of the new snippet"),
     db: AsyncSession = Depends(get_db)
 ):
     """Create a new code snippet (idempotent)."""
     try:
         created = await create_snippet(db, snippet)
-        logger.log("info", "Snippet created", snippet_id=created.id)
-        return {
+        await _after_write("Snippet created", created.id)
+        result = {
             "id": created.id,
             "created_at": created.created_at
         }
+        if check_similar:
+            similar = await find_similar(created.id) or []
+            result["similar"] = [
+                {"id": s.id, "title": s.title, "similarity": score} for s, score in similar
+            ]
+        return result
     except Exception as e:
         logger.log("error", "Failed to create snippet", error=str(e))
         raise HTTPException(
@@ -130,11 +305,133 @@ async def create_snippet_endpoint(
         )
 
 
+@app.get("/snippets/batch", response_model=SnippetBatchResponse)
+async def batch_get_endpoint(
+    ids: List[int] = Query([], max_length=settings.MAX_BATCH_GETS,
+                           description="Snippet ids, repeated (?ids=1&ids=2)")
+):
+    """Get several snippets in one request; missing or deleted ids are left out."""
+    return {"items": _snippet_items(await get_snippets(ids))}
+
+
 @app.get("/snippets/{snippet_id}", response_model=SnippetResponse)
-async def get_snippet_endpoint(snippet_id: int):
-    """Get a single code snippet by ID."""
-    snippet = await get_snippet(snippet_id)
+async def get_snippet_endpoint(
+    snippet_id: int,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
+    """Get a single code snippet by ID (served from rendered bytes when cached)."""
+    entry = response_cache.get(snippet_id)
+    if entry is not None:
+        RESPONSE_CACHE_HITS.inc()
+    else:
+        RESPONSE_CACHE_MISSES.inc()
+        generation = response_cache.generation
+        snippet = await get_snippet(snippet_id)
+        
+        if not snippet:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail={
+                    "error_code": "SNIPPET_NOT_FOUND",
+                    "message": f"Snippet with ID {snippet_id} not found",
+                    "trace_id": get_trace_id()
+                }
+            )
+        
+        tags = parse_tags(snippet.tags)
+        with timing.span("serialize"):
+            body = SnippetResponse(
+                id=snippet.id,
+                title=snippet.title,
+                content=snippet.content,
+                tags=tags,
+                created_at=snippet.created_at,
+                updated_at=snippet.updated_at
+            ).model_dump_json().encode()
+        entry = response_cache.put(
+            snippet_id, snippet.version, make_etag(snippet.id, snippet.version), body, generation
+        )
+    
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    encoding, body = response_cache.variant(snippet_id, entry, preferred_encoding(accept_encoding))
+    if encoding != IDENTITY:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/snippets/{snippet_id}/raw", response_class=PlainTextResponse)
+async def raw_snippet_endpoint(
+    snippet_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Snippet content as plain text, streamed from the database, with Range support."""
+    reader = await open_content(snippet_id)
+    if reader is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error_code": "SNIPPET_NOT_FOUND",
+                "message": f"Snippet with ID {snippet_id} not found",
+                "trace_id": get_trace_id()
+            }
+        )
+    
+    etag = make_etag(snippet_id, reader.version)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if etag_matches(if_none_match, etag):
+        reader.close()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # A stale If-Range means the client's partial copy is outdated: send everything
+    requested = range_header if if_range is None or if_range.strip() == etag else None
+    try:
+        byte_range = parse_range(requested, reader.size)
+    except RangeNotSatisfiable:
+        reader.close()
+        headers["Content-Range"] = f"bytes */{reader.size}"
+        return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+    
+    status_code = status.HTTP_200_OK
+    start, end = 0, reader.size - 1
+    if byte_range is not None:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{reader.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    async def body():
+        try:
+            async for chunk in reader.iter_range(start, end):
+                yield chunk
+        finally:
+            reader.close()
+    
+    return StreamingResponse(
+        body(), status_code=status_code, media_type="text/plain", headers=headers
+    )
+
+
+@app.get("/snippets/{snippet_id}/rendered", response_class=HTMLResponse)
+async def rendered_snippet_endpoint(
+    snippet_id: int,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Syntax-highlighted HTML of a snippet's content.
     
+    The language comes from the first tag naming a Pygments lexer, otherwise
+    it is guessed. Renders are cached per hash of the content alone and
+    language, so the ETag stays valid across title edits and the same code
+    under another title is not highlighted again.
+    """
+    if not render.available():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    snippet = await get_snippet(snippet_id)
     if not snippet:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -145,13 +442,37 @@ async def get_snippet_endpoint(snippet_id: int):
             }
         )
     
+    key, language = render.render_key(snippet.content, parse_tags(snippet.tags))
+    headers = {"ETag": f'"{key}"'}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    detected, html = await render.render_cache.get(key, snippet.content, language)
+    headers["X-Snippet-Language"] = detected
+    return HTMLResponse(content=html, headers=headers)
+
+
+@app.get("/snippets/{snippet_id}/similar", response_model=SimilarSnippetsResponse)
+async def similar_snippets_endpoint(
+    snippet_id: int,
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0, description="Minimum similarity"),
+    limit: int = Query(10, ge=1, le=50, description="Number of results")
+):
+    """List near-duplicates of a snippet."""
+    similar = await find_similar(snippet_id, threshold, limit)
+    if similar is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={
+                "error_code": "SNIPPET_NOT_FOUND",
+                "message": f"Snippet with ID {snippet_id} not found",
+                "trace_id": get_trace_id()
+            }
+        )
     return {
-        "id": snippet.id,
-        "title": snippet.title,
-        "content": snippet.content,
-        "tags": parse_tags(snippet.tags),
-        "created_at": snippet.created_at,
-        "updated_at": snippet.updated_at
+        "id": snippet_id,
+        "threshold": settings.SIMILARITY_THRESHOLD if threshold is None else threshold,
+        "items": [{"id": s.id, "title": s.title, "similarity": score} for s, score in similar]
     }
 
 
@@ -160,51 +481,160 @@ async def search_snippets_endpoint(
     query: Optional[str] = Query(None, description="Full-text search query"),
     tag: Optional[str] = Query(None, description="Filter by tag"),
     page: int = Query(1, ge=1, description="Page number"),
-    page_size: int = Query(20, ge=1, le=100, description="Page size")
+    page_size: int = Query(20, ge=1, le=100, description="Page size"),
+    created_after: Optional[datetime] = Query(None, description="Only snippets created after this time"),
+    updated_before: Optional[datetime] = Query(None, description="Only snippets last updated before this time")
 ):
     """Search code snippets with filters and pagination."""
     try:
-        snippets, total = await search_snippets(query, tag, page, page_size)
-        
-        items = [
-            {
-                "id": s.id,
-                "title": s.title,
-                "content": s.content,
-                "tags": parse_tags(s.tags),
-                "created_at": s.created_at,
-                "updated_at": s.updated_at
-            }
-            for s in snippets
-        ]
-        
-        return {
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "items": items
-        }
+        snippets, total = await search_snippets(
+            query, tag, page, page_size,
+            created_after=epoch_ms(created_after) if created_after is not None else None,
+            updated_before=epoch_ms(updated_before) if updated_before is not None else None
+        )
+        return _search_page(snippets, total, page, page_size)
     except Exception as e:
         logger.log("error", "Search failed", error=str(e))
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail={
-                "error_code": "SEARCH_FAILED",
-                "message": "Failed to search snippets",
-                "trace_id": get_trace_id()
-            }
-        )
+        raise _search_failed()
+
+
+@app.post("/snippets/search/batch", response_model=BatchSearchResponse)
+async def batch_search_endpoint(batch: BatchSearchRequest):
+    """Run several searches in one request; results keep the request order.
+    
+    Read-only despite the POST: it is not rate limited and is admitted
+    through the read queue.
+    """
+    specs = [
+        (s.query, s.tag, s.page, s.page_size,
+         epoch_ms(s.created_after) if s.created_after is not None else None,
+         epoch_ms(s.updated_before) if s.updated_before is not None else None)
+        for s in batch.searches
+    ]
+    try:
+        results = await search_snippets_batch(specs)
+    except Exception as e:
+        logger.log("error", "Batch search failed", error=str(e), searches=len(specs))
+        raise _search_failed()
+    return {
+        "results": [
+            _search_page(snippets, total, page, page_size)
+            for (_, _, page, page_size, _, _), (snippets, total) in zip(specs, results)
+        ]
+    }
+
+
+def _snippet_items(snippets) -> List[dict]:
+    return [
+        {
+            "id": s.id,
+            "title": s.title,
+            "content": s.content,
+            "tags": parse_tags(s.tags),
+            "created_at": s.created_at,
+            "updated_at": s.updated_at
+        }
+        for s in snippets
+    ]
+
+
+def _search_page(snippets, total: int, page: int, page_size: int) -> dict:
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "items": _snippet_items(snippets)
+    }
+
+
+def _search_failed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail={
+            "error_code": "SEARCH_FAILED",
+            "message": "Failed to search snippets",
+            "trace_id": get_trace_id()
+        }
+    )
+
+
+@app.get("/tags", response_model=TagListResponse)
+async def list_tags_endpoint(
+    prefix: Optional[str] = Query(None, max_length=settings.MAX_TAG_LENGTH, description="Tag prefix"),
+    limit: int = Query(50, ge=1, le=500, description="Number of tags")
+):
+    """List tags by live snippet count."""
+    tags = await list_tags(prefix, limit)
+    return {"items": [{"tag": tag, "count": count} for tag, count in tags]}
+
+
+@app.get("/suggest", response_model=SuggestResponse)
+async def suggest_endpoint(
+    prefix: str = Query(..., min_length=1, max_length=settings.MAX_TITLE_LENGTH, description="Typed prefix"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS, description="Number of suggestions")
+):
+    """Suggest titles and tags starting with a prefix."""
+    if not settings.SUGGEST_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return {"prefix": prefix, "items": suggest_index.suggest(prefix, limit)}
+
+
+@app.get("/changes", response_model=ChangeListResponse)
+async def list_changes_endpoint(
+    since: Optional[int] = Query(None, ge=0, description="Return changes after this sequence number"),
+    limit: int = Query(100, ge=1, le=1000, description="Page size"),
+    shard: int = Query(0, ge=0, description="Shard whose feed to read")
+):
+    """Page through snippet changes in commit order.
+    
+    Without `since`, returns no changes and the current sequence number to
+    start syncing from. When sharded, each shard has its own feed.
+    """
+    changes, has_more, latest = await list_changes(since, limit, shard)
+    return {
+        "changes": changes,
+        "next_since": changes[-1]["seq"] if changes else (latest if since is None else since),
+        "has_more": has_more,
+        "latest_seq": latest
+    }
+
+
+@app.get("/changes/stream")
+async def stream_changes_endpoint(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="Stream changes after this sequence number"),
+    shard: int = Query(0, ge=0, description="Shard whose feed to stream"),
+    last_event_id: Optional[int] = Header(None, ge=0)
+):
+    """Server-Sent Events stream of snippet changes."""
+    # Fails fast on an unknown shard, before the stream starts
+    _, _, latest = await list_changes(None, shard=shard)
+    # Reconnecting EventSource clients resume from Last-Event-ID; new ones
+    # without `since` start at the latest change, like GET /changes
+    if last_event_id is not None:
+        start = last_event_id
+    else:
+        start = latest if since is None else since
+    return StreamingResponse(
+        change_events(start, request.is_disconnected, shard),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.patch("/snippets/{snippet_id}", response_model=SnippetResponse)
 async def update_snippet_endpoint(
     snippet_id: int,
     update_data: SnippetUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
-    """Update a code snippet (partial update)."""
+    """Update a code snippet (partial update, optional If-Match precondition)."""
     try:
-        updated = await update_snippet(snippet_id, update_data)
+        updated = await update_snippet(
+            snippet_id, update_data, expected_version=parse_if_match(if_match, snippet_id)
+        )
         
         if not updated:
             raise HTTPException(
@@ -216,8 +646,9 @@ async def update_snippet_endpoint(
                 }
             )
         
-        logger.log("info", "Snippet updated", snippet_id=snippet_id)
+        await _after_write("Snippet updated", snippet_id)
         
+        response.headers["ETag"] = make_etag(updated.id, updated.version)
         return {
             "id": updated.id,
             "title": updated.title,
@@ -226,7 +657,7 @@ async def update_snippet_endpoint(
             "created_at": updated.created_at,
             "updated_at": updated.updated_at
         }
-    except HTTPException:
+    except (HTTPException, CRUDException):
         raise
     except Exception as e:
         logger.log("error", "Update failed", snippet_id=snippet_id, error=str(e))
@@ -241,10 +672,12 @@ async def update_snippet_endpoint(
 
 
 @app.delete("/snippets/{snippet_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_snippet_endpoint(snippet_id: int):
-    """Soft delete a code snippet."""
+async def delete_snippet_endpoint(snippet_id: int, if_match: Optional[str] = Header(None)):
+    """Soft delete a code snippet (optional If-Match precondition)."""
     try:
-        deleted = await delete_snippet(snippet_id)
+        deleted = await delete_snippet(
+            snippet_id, expected_version=parse_if_match(if_match, snippet_id)
+        )
         
         if not deleted:
             raise HTTPException(
@@ -256,9 +689,9 @@ async def delete_snippet_endpoint(snippet_id: int):
                 }
             )
         
-        logger.log("info", "Snippet deleted", snippet_id=snippet_id)
+        await _after_write("Snippet deleted", snippet_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
-    except HTTPException:
+    except (HTTPException, CRUDException):
         raise
     except Exception as e:
         logger.log("error", "Delete failed", snippet_id=snippet_id, error=str(e))
@@ -1,4 +1,5 @@
-"""Middleware for logging, tracing, and rate limiting."""
+"""Middleware for logging, tracing, timing, rate limiting, and request body limits."""
+import asyncio
 import time
 import json
 import logging
@@ -6,9 +7,18 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Callable
 from fastapi import Request, Response, HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from src.utils import generate_trace_id, set_trace_id, get_trace_id
 from src.config import settings
+from src import timing
+from src.metrics import (
+    HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_FLIGHT,
+    RATE_LIMIT_REJECTIONS, RATE_LIMIT_TRACKED_CLIENTS,
+    BODY_LIMIT_REJECTIONS, BODY_LIMIT_REJECTED_BYTES
+)
 
 
 # Configure structured logging
@@ -71,26 +81,48 @@ class TracingMiddleware(BaseHTTPMiddleware):
         set_trace_id(trace_id)
         
         # Log request
-        start_time = time.time()
+        start_time = time.perf_counter()
         logger.log("info", "Request started", 
                   method=request.method, 
                   path=request.url.path,
                   client_ip=request.client.host if request.client else None)
         
-        response = await call_next(request)
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = await call_next(request)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
         
         # Log response
-        duration = time.time() - start_time
+        duration = time.perf_counter() - start_time
+        extra = {}
+        timings = timing.current()
+        if settings.SERVER_TIMING_LOG and timings is not None:
+            extra["timings"] = timings.summary()
         logger.log("info", "Request completed",
                   method=request.method,
                   path=request.url.path,
                   status_code=response.status_code,
-                  duration_ms=round(duration * 1000, 2))
+                  duration_ms=round(duration * 1000, 2),
+                  **extra)
+        
+        if settings.METRICS_ENABLED:
+            # Label by route template so path parameters don't explode cardinality
+            route = request.scope.get("route")
+            HTTP_REQUEST_DURATION.labels(
+                request.method,
+                route.path if route is not None else "unmatched",
+                str(response.status_code)
+            ).observe(duration)
         
         response.headers["X-Trace-ID"] = trace_id
         return response
 
 
+# POST routes that only read, so they count as reads for rate limiting and admission
+READ_ONLY_POST_PATHS = {"/snippets/search/batch"}
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """Rate limiting middleware for write operations."""
     
@@ -98,15 +130,25 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.requests = defaultdict(list)
         self.write_methods = {"POST", "PATCH", "PUT", "DELETE"}
+        RATE_LIMIT_TRACKED_CLIENTS.set_function(lambda: len(self.requests))
     
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         if not settings.RATE_LIMIT_ENABLED:
             return await call_next(request)
         
         # Only rate limit write operations
-        if request.method not in self.write_methods:
+        if request.method not in self.write_methods or request.url.path in READ_ONLY_POST_PATHS:
             return await call_next(request)
         
+        with timing.span("ratelimit"):
+            limited = self._check(request)
+        if limited is not None:
+            raise limited
+        
+        return await call_next(request)
+    
+    def _check(self, request: Request):
+        """Record the request, or return the 429 to raise when over the limit."""
         client_ip = request.client.host if request.client else "unknown"
         current_time = datetime.utcnow()
         
@@ -119,11 +161,12 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         # Check rate limit
         if len(self.requests[client_ip]) >= settings.RATE_LIMIT_PER_MINUTE:
+            RATE_LIMIT_REJECTIONS.inc()
             logger.log("warning", "Rate limit exceeded",
                       client_ip=client_ip,
                       method=request.method,
                       path=request.url.path)
-            raise HTTPException(
+            return HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail={
                     "error_code": "RATE_LIMIT_EXCEEDED",
@@ -134,5 +177,107 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         
         # Record this request
         self.requests[client_ip].append(current_time)
+        return None
+
+
+class ServerTimingMiddleware:
+    """Collect per-request spans and report them in a Server-Timing header.
+    
+    Added outside rate limiting so every other layer is covered; pure ASGI
+    so the header can be added as the response starts. Does nothing unless
+    SERVER_TIMING_HEADER or SERVER_TIMING_LOG is on.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (settings.SERVER_TIMING_HEADER or settings.SERVER_TIMING_LOG):
+            await self.app(scope, receive, send)
+            return
         
-        return await call_next(request)
+        timings = timing.Timings()
+        token = timing.timings_var.set(timings)
+        
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and settings.SERVER_TIMING_HEADER:
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", timings.header(time.perf_counter() - timings.start))
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            timing.timings_var.reset(token)
+
+
+def _payload_too_large(limit: int) -> dict:
+    return {
+        "error_code": "PAYLOAD_TOO_LARGE",
+        "message": f"Request body exceeds {limit} bytes",
+        "trace_id": get_trace_id()
+    }
+
+
+class BodySizeLimitMiddleware:
+    """Reject oversized request bodies before they are buffered.
+    
+    A declared Content-Length over the limit is answered with 413 without
+    reading anything. Bodies without one (chunked) are counted as they
+    arrive and the read fails with 413 as soon as the limit is passed.
+    Pure ASGI, because the body has to be watched while it streams.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        limit = settings.get_max_body_bytes()
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            BODY_LIMIT_REJECTIONS.labels("content_length").inc()
+            BODY_LIMIT_REJECTED_BYTES.labels("content_length").inc(int(declared))
+            logger.log("warning", "Request body too large",
+                      declared_bytes=int(declared),
+                      limit=limit,
+                      path=scope["path"])
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content=_payload_too_large(limit),
+                headers={"Connection": "close"}
+            )
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        tripped = False
+        
+        async def limited_receive() -> Message:
+            nonlocal received, tripped
+            if tripped:
+                # Never read the rest of the body; response-side listeners waiting
+                # here are cancelled once the 413 has been sent
+                await asyncio.get_running_loop().create_future()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    tripped = True
+                    BODY_LIMIT_REJECTIONS.labels("stream").inc()
+                    BODY_LIMIT_REJECTED_BYTES.labels("stream").inc(received)
+                    logger.log("warning", "Request body too large",
+                              received_bytes=received,
+                              limit=limit,
+                              path=scope["path"])
+                    # Surfaces through the app's HTTPException handler; the rest is never read
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_payload_too_large(limit)
+                    )
+            return message
+        
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,220 @@
+"""Versioned, checksum-tracked schema migrations."""
+import asyncio
+import hashlib
+import importlib.util
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import aiosqlite
+
+from src.config import settings
+from src.middleware import logger
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+_FILENAME_RE = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+
+SCHEMA_MIGRATIONS_DDL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    checksum TEXT NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL
+)
+"""
+
+
+class MigrationError(Exception):
+    """Raised when applied migrations don't match the files on disk."""
+
+
+@dataclass
+class Migration:
+    """A migration file: plain SQL, or a Python module with a backfill."""
+    version: int
+    name: str
+    path: Path
+    checksum: str
+
+    @property
+    def is_backfill(self) -> bool:
+        return self.path.suffix == ".py"
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    """List migration files in version order."""
+    migrations = []
+    seen: Dict[int, Path] = {}
+    for path in sorted(directory.iterdir()):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise MigrationError(f"Duplicate migration version {version}: {seen[version].name}, {path.name}")
+        seen[version] = path
+        migrations.append(Migration(
+            version=version,
+            name=match.group(2),
+            path=path,
+            checksum=hashlib.sha256(path.read_bytes()).hexdigest()
+        ))
+    return migrations
+
+
+def split_statements(sql: str) -> List[str]:
+    """Split a script into statements (trigger bodies stay intact)."""
+    statements = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            if buffer.strip():
+                statements.append(buffer.strip())
+            buffer = ""
+    leftover = "\n".join(
+        line for line in buffer.splitlines() if not line.strip().startswith("--")
+    )
+    if leftover.strip():
+        raise MigrationError("Migration ends with an incomplete statement")
+    return statements
+
+
+def _load_module(migration: Migration):
+    spec = importlib.util.spec_from_file_location(f"migration_{migration.version:04d}", migration.path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def _applied(conn: aiosqlite.Connection) -> Optional[Dict[int, str]]:
+    """Applied version → checksum, or None if the table doesn't exist yet."""
+    try:
+        cursor = await conn.execute("SELECT version, checksum FROM schema_migrations")
+    except sqlite3.OperationalError:
+        return None
+    return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+def _verify(migrations: List[Migration], applied: Dict[int, str]) -> List[Migration]:
+    """Check checksums of applied migrations and return the pending ones."""
+    pending = []
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is None:
+            pending.append(migration)
+        elif checksum != migration.checksum:
+            raise MigrationError(
+                f"Checksum mismatch for applied migration {migration.path.name}; "
+                "add a new migration instead of editing an applied one"
+            )
+    return pending
+
+
+async def run_migrations(db_path: str, directory: Path = MIGRATIONS_DIR) -> List[str]:
+    """Apply pending migrations; returns the names of those applied.
+
+    Already-migrated databases are detected with a single read. Otherwise the
+    runner takes SQLite's write lock (BEGIN IMMEDIATE), which serializes
+    concurrent workers across processes, re-checks what is pending and
+    applies everything in one transaction.
+    """
+    migrations = discover(directory)
+
+    async with aiosqlite.connect(
+        db_path, isolation_level=None, timeout=settings.MIGRATION_LOCK_TIMEOUT
+    ) as conn:
+        # Fast path: nothing to do, no write lock taken
+        applied = await _applied(conn)
+        if applied is not None and not _verify(migrations, applied):
+            return []
+
+        if applied is None:
+            # Only takes effect on a new database, before the first table exists;
+            # lets the retention job shrink the file with incremental_vacuum
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            await conn.execute(SCHEMA_MIGRATIONS_DDL)
+            # Another worker may have migrated while we waited for the lock
+            pending = _verify(migrations, await _applied(conn) or {})
+            for migration in pending:
+                if migration.is_backfill:
+                    # Backfills only register here; they run online afterwards
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name, checksum) VALUES (?, ?, ?)",
+                        (migration.version, migration.name, migration.checksum)
+                    )
+                    continue
+                for statement in split_statements(migration.path.read_text(encoding="utf-8")):
+                    await conn.execute(statement)
+                await conn.execute(
+                    """INSERT INTO schema_migrations (version, name, checksum, completed_at)
+                       VALUES (?, ?, ?, CURRENT_TIMESTAMP)""",
+                    (migration.version, migration.name, migration.checksum)
+                )
+            await conn.execute("COMMIT")
+        except Exception:
+            await conn.execute("ROLLBACK")
+            raise
+
+    names = [m.path.name for m in pending]
+    if names:
+        logger.log("info", "Migrations applied", migrations=names)
+    return names
+
+
+async def run_backfills(db_path: str, directory: Path = MIGRATIONS_DIR) -> List[str]:
+    """Run registered, incomplete backfill migrations to completion.
+
+    A backfill migration is a `.py` file defining `async def backfill(conn)`
+    that processes one small batch and returns the number of rows it
+    touched (0 when done). Each batch runs in its own short write
+    transaction so serving traffic interleaves with the backfill. Batches
+    must be idempotent (e.g. `WHERE new_column IS NULL LIMIT ?`) because
+    several workers may run them concurrently.
+    """
+    by_version = {m.version: m for m in discover(directory) if m.is_backfill}
+    completed = []
+
+    async with aiosqlite.connect(
+        db_path, isolation_level=None, timeout=settings.MIGRATION_LOCK_TIMEOUT
+    ) as conn:
+        conn.row_factory = aiosqlite.Row
+        cursor = await conn.execute(
+            "SELECT version FROM schema_migrations WHERE completed_at IS NULL ORDER BY version"
+        )
+        versions = [row["version"] for row in await cursor.fetchall()]
+
+        for version in versions:
+            migration = by_version.get(version)
+            if migration is None:
+                continue
+            module = _load_module(migration)
+            delay = getattr(module, "BATCH_DELAY", settings.BACKFILL_BATCH_DELAY)
+            total = 0
+            while True:
+                await conn.execute("BEGIN IMMEDIATE")
+                try:
+                    touched = await module.backfill(conn)
+                    await conn.execute("COMMIT")
+                except Exception:
+                    await conn.execute("ROLLBACK")
+                    raise
+                total += touched
+                if not touched:
+                    break
+                await asyncio.sleep(delay)
+
+            await conn.execute(
+                "UPDATE schema_migrations SET completed_at = CURRENT_TIMESTAMP WHERE version = ?",
+                (version,)
+            )
+            completed.append(migration.path.name)
+            logger.log("info", "Backfill completed", migration=migration.path.name, rows=total)
+
+    return completed
@@ -1,7 +1,7 @@
 """SQLAlchemy models."""
-from sqlalchemy import Column, Integer, String, Text, DateTime, Index
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Text, Index, text
 from src.database import Base
+from src.utils import NOW_MS_SQL
 
 
 class Snippet(Base):
@@ -12,13 +12,15 @@ class Snippet(Base):
     title = Column(String(200), nullable=False)
     content = Column(Text, nullable=False)
     tags = Column(Text, nullable=False, default='[]')
-    created_at = Column(DateTime, server_default=func.current_timestamp())
-    updated_at = Column(DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
-    deleted_at = Column(DateTime, nullable=True)
+    # Stored as epoch milliseconds (UTC); crud hands them out as datetimes
+    created_at = Column(Integer, server_default=text(f"({NOW_MS_SQL})"))
+    updated_at = Column(Integer, server_default=text(f"({NOW_MS_SQL})"), onupdate=text(NOW_MS_SQL))
+    deleted_at = Column(Integer, nullable=True)
     content_hash = Column(String(64), nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=1)
     
     __table_args__ = (
-        Index('idx_snippets_deleted_at', 'deleted_at'),
-        Index('idx_snippets_content_hash', 'content_hash'),
-        Index('idx_snippets_created_at', 'created_at'),
+        Index('idx_snippets_live_listing', created_at.desc(), id.desc(), tags, updated_at, deleted_at,
+              sqlite_where=deleted_at.is_(None)),
+        Index('idx_snippets_deleted_at', deleted_at, sqlite_where=deleted_at.isnot(None)),
     )
@@ -0,0 +1,162 @@
+"""Statement timing and slow query capture for CRUD SQL."""
+import hashlib
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiosqlite
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src.middleware import logger
+from src.utils import get_trace_id
+from src import timing
+
+SLOW_QUERIES = REGISTRY.counter(
+    "snippetbox_slow_queries",
+    "Statements slower than SLOW_QUERY_THRESHOLD_MS",
+)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals so equivalent SQL groups together."""
+    normalized = _STRING_LITERAL_RE.sub("?", sql)
+    normalized = _NUMBER_LITERAL_RE.sub("?", normalized)
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def fingerprint(normalized_sql: str) -> str:
+    """Short stable identifier for a normalized statement."""
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:12]
+
+
+def param_shapes(params: Sequence[Any]) -> List[str]:
+    """Describe parameters by type and size without logging their values."""
+    shapes = []
+    for value in params:
+        if isinstance(value, (str, bytes)):
+            shapes.append(f"{type(value).__name__}({len(value)})")
+        else:
+            shapes.append(type(value).__name__)
+    return shapes
+
+
+class SlowQueryLog:
+    """Aggregates slow statements by fingerprint, bounded in size."""
+
+    def __init__(self, max_fingerprints: int):
+        self.max_fingerprints = max_fingerprints
+        self.entries: Dict[str, Dict] = {}
+
+    def record(self, sql: str, shapes: List[str], rows: int, duration_ms: float,
+               plan: Optional[List[str]]) -> Dict:
+        key = fingerprint(sql)
+        entry = self.entries.get(key)
+        if entry is None:
+            if len(self.entries) >= self.max_fingerprints:
+                # Evict the fingerprint that has cost the least overall
+                cheapest = min(self.entries, key=lambda k: self.entries[k]["total_ms"])
+                del self.entries[cheapest]
+            entry = self.entries[key] = {
+                "fingerprint": key,
+                "sql": sql,
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            }
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        entry.update({
+            "last_ms": duration_ms,
+            "last_rows": rows,
+            "last_param_shapes": shapes,
+            "last_plan": plan,
+            "last_trace_id": get_trace_id(),
+            "last_seen": datetime.utcnow().isoformat() + "Z",
+        })
+        return entry
+
+    def top(self, limit: int) -> List[Dict]:
+        ranked = sorted(self.entries.values(), key=lambda e: e["total_ms"], reverse=True)
+        return [
+            {**entry, "total_ms": round(entry["total_ms"], 3),
+             "avg_ms": round(entry["total_ms"] / entry["count"], 3)}
+            for entry in ranked[:limit]
+        ]
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+slow_query_log = SlowQueryLog(settings.SLOW_QUERY_MAX_FINGERPRINTS)
+
+
+async def _explain(conn: aiosqlite.Connection, sql: str, params: Sequence[Any]) -> Optional[List[str]]:
+    try:
+        cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[3] for row in await cursor.fetchall()]
+    except Exception as e:
+        return [f"EXPLAIN failed: {e}"]
+
+
+async def _observe(conn: aiosqlite.Connection, sql: str, params: Sequence[Any],
+                   rows: int, start: float) -> None:
+    duration_ms = (time.perf_counter() - start) * 1000
+    timing.record("sql", duration_ms / 1000)
+    if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+        return
+
+    SLOW_QUERIES.inc()
+    normalized = normalize_sql(sql)
+    shapes = param_shapes(params)
+    plan = await _explain(conn, sql, params) if settings.SLOW_QUERY_EXPLAIN else None
+    entry = slow_query_log.record(normalized, shapes, rows, duration_ms, plan)
+    logger.log("warning", "Slow query",
+               fingerprint=entry["fingerprint"],
+               sql=normalized,
+               param_shapes=shapes,
+               rows=rows,
+               duration_ms=round(duration_ms, 2),
+               plan=plan)
+
+
+async def execute(conn: aiosqlite.Connection, sql: str, params: Sequence[Any] = ()) -> aiosqlite.Cursor:
+    """Execute a write statement; rows are reported as cursor.rowcount."""
+    start = time.perf_counter()
+    cursor = await conn.execute(sql, params)
+    await _observe(conn, sql, params, max(cursor.rowcount, 0), start)
+    return cursor
+
+
+async def fetchone(conn: aiosqlite.Connection, sql: str, params: Sequence[Any] = ()):
+    """Execute a query and return its first row."""
+    start = time.perf_counter()
+    cursor = await conn.execute(sql, params)
+    row = await cursor.fetchone()
+    await _observe(conn, sql, params, 1 if row is not None else 0, start)
+    return row
+
+
+async def fetchall(conn: aiosqlite.Connection, sql: str, params: Sequence[Any] = ()) -> list:
+    """Execute a query and return all rows."""
+    start = time.perf_counter()
+    cursor = await conn.execute(sql, params)
+    rows = await cursor.fetchall()
+    await _observe(conn, sql, params, len(rows), start)
+    return rows
+
+
+async def fetchone_returning(conn: aiosqlite.Connection, sql: str, params: Sequence[Any] = ()):
+    """Execute a write with RETURNING and return its first row.
+
+    The statement is stepped to completion, otherwise SQLite refuses to
+    commit while it is still in progress.
+    """
+    rows = await fetchall(conn, sql, params)
+    return rows[0] if rows else None
@@ -0,0 +1,258 @@
+"""Syntax-highlighted HTML, rendered once per content hash in a process pool.
+
+Pygments is an optional dependency: without it `available()` is False and
+the rendered endpoint answers 404.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src.middleware import logger
+from src import timing
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name, guess_lexer
+    from pygments.util import ClassNotFound
+except ImportError:  # pragma: no cover - depends on the environment
+    highlight = None
+
+RENDER_CACHE_HITS = REGISTRY.counter(
+    "snippetbox_render_cache_hits",
+    "Highlighted renders served from cache",
+    ("tier",),
+)
+RENDER_CACHE_MISSES = REGISTRY.counter(
+    "snippetbox_render_cache_misses",
+    "Highlighted renders computed in the worker pool",
+)
+RENDER_CACHE_BYTES = REGISTRY.gauge(
+    "snippetbox_render_cache_bytes",
+    "Bytes held by the highlight cache",
+    ("tier",),
+)
+RENDER_DURATION = REGISTRY.histogram(
+    "snippetbox_render_duration_seconds",
+    "Time to highlight one snippet, pool queueing included",
+)
+
+AUTO = "auto"
+_SUFFIX = ".html"
+
+
+def available() -> bool:
+    return settings.RENDER_ENABLED and highlight is not None
+
+
+@lru_cache(maxsize=1024)
+def _lexer_alias(name: str) -> Optional[str]:
+    try:
+        return get_lexer_by_name(name).aliases[0]
+    except ClassNotFound:
+        return None
+
+
+def language_hint(tags: Iterable[str]) -> str:
+    """Canonical Pygments alias of the first tag naming a language, else AUTO."""
+    for tag in tags:
+        alias = _lexer_alias(tag.lower())
+        if alias is not None:
+            return alias
+    return AUTO
+
+
+def _highlight(content: str, language: str) -> Tuple[str, bytes]:
+    """Runs in a pool worker; returns (language, HTML fragment)."""
+    if language == AUTO:
+        try:
+            lexer = guess_lexer(content)
+        except ClassNotFound:
+            lexer = get_lexer_by_name("text")
+    else:
+        lexer = get_lexer_by_name(language)
+    html = highlight(content, lexer, HtmlFormatter(cssclass="highlight"))
+    return (lexer.aliases[0] if lexer.aliases else "text"), html.encode()
+
+
+class RenderCache:
+    """Two-tier LRU of rendered HTML keyed by `{sha256(content)}.{language}`.
+
+    The memory tier holds the hottest renders up to `max_bytes`; every render
+    is also written to `directory` (bounded by `disk_max_bytes`, oldest access
+    evicted first) so restarts and other workers skip the pool. Concurrent
+    misses for one key share a single render.
+    """
+
+    def __init__(self, max_bytes: int, directory: str, disk_max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.directory = Path(directory)
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_size = 0
+        self._entries: "OrderedDict[str, Tuple[str, bytes]]" = OrderedDict()
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_loaded = False
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{_SUFFIX}"
+
+    def _load_disk_index(self) -> None:
+        """Index files left by earlier runs, least recently used first."""
+        files = []
+        if self.directory.is_dir():
+            for path in self.directory.glob(f"*/*{_SUFFIX}"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path.name[:-len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self.disk_size += size
+        self._disk_loaded = True
+
+    def _read_disk(self, key: str) -> Optional[Tuple[str, bytes]]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        language, _, html = data.partition(b"\n")
+        return language.decode(), html
+
+    def _write_disk(self, key: str, language: str, html: bytes) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+        partial.write_bytes(language.encode() + b"\n" + html)
+        os.replace(partial, path)
+        return path.stat().st_size
+
+    def _remember(self, key: str, rendered: Tuple[str, bytes]) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old[1])
+        self._entries[key] = rendered
+        self.size += len(rendered[1])
+        while self.size > self.max_bytes and self._entries:
+            _, (_, html) = self._entries.popitem(last=False)
+            self.size -= len(html)
+
+    async def _evict_disk(self) -> None:
+        while self.disk_size > self.disk_max_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self.disk_size -= size
+            await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def get(self, key: str, content: str, language: str) -> Tuple[str, bytes]:
+        """(language, HTML) for `key`, rendering `content` on a miss."""
+        rendered = self._entries.get(key)
+        if rendered is not None:
+            self._entries.move_to_end(key)
+            RENDER_CACHE_HITS.labels("memory").inc()
+            return rendered
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            rendered = await self._load(key, content, language)
+            future.set_result(rendered)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure isn't logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        return rendered
+
+    async def _load(self, key: str, content: str, language: str) -> Tuple[str, bytes]:
+        if not self._disk_loaded:
+            await asyncio.to_thread(self._load_disk_index)
+        # Files written by other workers are picked up here too
+        rendered = await asyncio.to_thread(self._read_disk, key)
+        if rendered is not None:
+            size = len(rendered[0]) + 1 + len(rendered[1])
+            self.disk_size += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            RENDER_CACHE_HITS.labels("disk").inc()
+            self._remember(key, rendered)
+            return rendered
+        self.disk_size -= self._disk.pop(key, 0)
+
+        RENDER_CACHE_MISSES.inc()
+        start = time.perf_counter()
+        rendered = await run_in_pool(content, language)
+        elapsed = time.perf_counter() - start
+        RENDER_DURATION.observe(elapsed)
+        timing.record("render", elapsed)
+        self._remember(key, rendered)
+        try:
+            size = await asyncio.to_thread(self._write_disk, key, *rendered)
+        except OSError as e:
+            logger.log("warning", "Render cache write failed", key=key, error=str(e))
+        else:
+            self.disk_size += size - self._disk.pop(key, 0)
+            self._disk[key] = size
+            await self._evict_disk()
+        return rendered
+
+    def clear(self) -> None:
+        """Drop the memory tier; files on disk stay valid."""
+        self._entries.clear()
+        self.size = 0
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def run_in_pool(content: str, language: str) -> Tuple[str, bytes]:
+    """Highlight in the process pool, or a thread when RENDER_WORKERS is 0."""
+    global _pool
+    if settings.RENDER_WORKERS <= 0:
+        return await asyncio.to_thread(_highlight, content, language)
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.RENDER_WORKERS)
+    return await asyncio.get_running_loop().run_in_executor(_pool, _highlight, content, language)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def render_key(content: str, tags: Iterable[str]) -> Tuple[str, str]:
+    """(cache key, language hint) for a snippet's content and tags.
+    
+    The key hashes the content alone (the stored content_hash covers the
+    title too), so renames and copies under other titles reuse the render.
+    """
+    language = language_hint(tags)
+    digest = hashlib.sha256(content.encode()).hexdigest()
+    return f"{digest}.{language}", language
+
+
+render_cache = RenderCache(
+    settings.RENDER_CACHE_MAX_BYTES, settings.RENDER_CACHE_DIR, settings.RENDER_CACHE_DISK_MAX_BYTES
+)
+RENDER_CACHE_BYTES.labels("memory").set_function(lambda: render_cache.size)
+RENDER_CACHE_BYTES.labels("disk").set_function(lambda: render_cache.disk_size)
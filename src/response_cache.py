@@ -0,0 +1,132 @@
+"""Cache of fully rendered snippet response bodies."""
+import gzip
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from src.config import settings
+from src.metrics import REGISTRY
+
+RESPONSE_CACHE_HITS = REGISTRY.counter(
+    "snippetbox_response_cache_hits",
+    "GET /snippets/{id} responses served from rendered bytes",
+)
+RESPONSE_CACHE_MISSES = REGISTRY.counter(
+    "snippetbox_response_cache_misses",
+    "GET /snippets/{id} responses rendered from the database",
+)
+RESPONSE_CACHE_BYTES = REGISTRY.gauge(
+    "snippetbox_response_cache_bytes",
+    "Bytes held by the rendered response cache, all encodings",
+)
+
+IDENTITY = "identity"
+GZIP = "gzip"
+
+
+def preferred_encoding(accept_encoding: Optional[str]) -> str:
+    """gzip if the client accepts it (q > 0), otherwise identity."""
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() not in (GZIP, "*"):
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        return GZIP
+    return IDENTITY
+
+
+class RenderedResponse:
+    """One snippet version's body, with encodings rendered on demand."""
+
+    __slots__ = ("version", "etag", "variants")
+
+    def __init__(self, version: int, etag: str, body: bytes):
+        self.version = version
+        self.etag = etag
+        self.variants: Dict[str, bytes] = {IDENTITY: body}
+
+    @property
+    def size(self) -> int:
+        return sum(len(v) for v in self.variants.values())
+
+
+class ResponseCache:
+    """LRU of rendered bodies per snippet id, bounded by total bytes.
+
+    Only the current version of a snippet is cached, so writes invalidate by
+    id. A render that raced with a write is discarded: `put` is rejected if
+    any invalidation happened after the caller took `generation`.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.generation = 0
+        self._entries: "OrderedDict[int, RenderedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, snippet_id: int) -> Optional[RenderedResponse]:
+        entry = self._entries.get(snippet_id)
+        if entry is not None:
+            self._entries.move_to_end(snippet_id)
+        return entry
+
+    def put(self, snippet_id: int, version: int, etag: str, body: bytes,
+            generation: int) -> RenderedResponse:
+        entry = RenderedResponse(version, etag, body)
+        if not settings.RESPONSE_CACHE_ENABLED or generation != self.generation:
+            return entry
+        self.discard(snippet_id)
+        self._entries[snippet_id] = entry
+        self.size += entry.size
+        self._evict()
+        return entry
+
+    def variant(self, snippet_id: int, entry: RenderedResponse, encoding: str) -> Tuple[str, bytes]:
+        """(encoding, body) to send; gzip is rendered once and kept.
+
+        Small bodies are always sent as identity, compressing them costs
+        more than it saves.
+        """
+        body = entry.variants.get(encoding)
+        if body is not None:
+            return encoding, body
+        identity = entry.variants[IDENTITY]
+        if encoding != GZIP or len(identity) < settings.RESPONSE_CACHE_GZIP_MIN_BYTES:
+            return IDENTITY, identity
+        body = gzip.compress(identity, compresslevel=6)
+        entry.variants[GZIP] = body
+        if self._entries.get(snippet_id) is entry:
+            self.size += len(body)
+            self._evict()
+        return GZIP, body
+
+    def discard(self, snippet_id: int) -> None:
+        entry = self._entries.pop(snippet_id, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def invalidate(self, snippet_id: int) -> None:
+        self.generation += 1
+        self.discard(snippet_id)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self.size = 0
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_BYTES)
+RESPONSE_CACHE_BYTES.set_function(lambda: response_cache.size)
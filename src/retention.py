@@ -0,0 +1,212 @@
+"""Retention job: archive and purge old soft-deleted snippets, then shrink the file."""
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import aiosqlite
+
+from src.config import settings
+from src.metrics import REGISTRY
+from src.middleware import logger
+from src.utils import from_epoch_ms
+
+RETENTION_PURGED_ROWS = REGISTRY.counter(
+    "snippetbox_retention_purged_rows",
+    "Soft-deleted snippets removed by the retention job",
+)
+RETENTION_RECLAIMED_BYTES = REGISTRY.counter(
+    "snippetbox_retention_reclaimed_bytes",
+    "Bytes returned to the filesystem by incremental vacuum",
+)
+
+ARCHIVE_MODES = ("table", "file", "none")
+ARCHIVE_COLUMNS = (
+    "id", "title", "content", "tags", "created_at", "updated_at",
+    "deleted_at", "content_hash", "version",
+)
+_AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+_run_lock = asyncio.Lock()
+
+
+def _cutoff(days: float) -> int:
+    """Time `days` ago, in epoch milliseconds like the stored timestamps."""
+    return int((time.time() - days * 86400) * 1000)
+
+
+async def _pragma(conn: aiosqlite.Connection, name: str) -> int:
+    cursor = await conn.execute(f"PRAGMA {name}")
+    return (await cursor.fetchone())[0]
+
+
+def _append_archive_file(path: Path, rows: List[Dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+async def _purge_batch(conn: aiosqlite.Connection, cutoff: int, mode: str) -> int:
+    """Archive and delete one batch inside a short write transaction."""
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await conn.execute(
+            """SELECT id FROM snippets
+               WHERE deleted_at IS NOT NULL AND deleted_at <= ?
+               ORDER BY deleted_at LIMIT ?""",
+            (cutoff, settings.RETENTION_BATCH_SIZE)
+        )
+        ids = [row[0] for row in await cursor.fetchall()]
+        if ids:
+            placeholders = ", ".join("?" * len(ids))
+            columns = ", ".join(ARCHIVE_COLUMNS)
+            if mode == "table":
+                await conn.execute(
+                    f"""INSERT OR REPLACE INTO snippets_archive ({columns})
+                        SELECT {columns} FROM snippets WHERE id IN ({placeholders})""",
+                    ids
+                )
+            elif mode == "file":
+                cursor = await conn.execute(
+                    f"SELECT {columns} FROM snippets WHERE id IN ({placeholders})", ids
+                )
+                rows = [dict(zip(ARCHIVE_COLUMNS, row)) for row in await cursor.fetchall()]
+                # Written before the delete commits: a crash can duplicate, never lose
+                await asyncio.to_thread(_append_archive_file, Path(settings.RETENTION_ARCHIVE_PATH), rows)
+            await conn.execute(f"DELETE FROM snippets WHERE id IN ({placeholders})", ids)
+        await conn.execute("COMMIT")
+    except Exception:
+        await conn.execute("ROLLBACK")
+        raise
+    return len(ids)
+
+
+async def _prune_changes(conn: aiosqlite.Connection) -> int:
+    """Drop change feed records older than CHANGE_FEED_RETENTION_DAYS."""
+    # changed_at grows with seq, so the first recent record bounds the prefix
+    cursor = await conn.execute(
+        "SELECT seq FROM snippet_changes WHERE changed_at > ? ORDER BY seq LIMIT 1",
+        (_cutoff(settings.CHANGE_FEED_RETENTION_DAYS),)
+    )
+    row = await cursor.fetchone()
+    if row is None:
+        cursor = await conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM snippet_changes")
+        row = await cursor.fetchone()
+    boundary = row[0]
+
+    pruned = 0
+    while True:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = await conn.execute(
+                """DELETE FROM snippet_changes WHERE seq IN (
+                       SELECT seq FROM snippet_changes WHERE seq < ? ORDER BY seq LIMIT ?
+                   )""",
+                (boundary, settings.RETENTION_BATCH_SIZE)
+            )
+            await conn.execute("COMMIT")
+        except Exception:
+            await conn.execute("ROLLBACK")
+            raise
+        pruned += cursor.rowcount
+        if cursor.rowcount < settings.RETENTION_BATCH_SIZE:
+            return pruned
+        await asyncio.sleep(settings.RETENTION_BATCH_DELAY)
+
+
+async def _incremental_vacuum(conn: aiosqlite.Connection) -> int:
+    """Release free pages in small steps; returns the number of pages released."""
+    released = 0
+    while True:
+        free = await _pragma(conn, "freelist_count")
+        if not free:
+            return released
+        step = min(free, settings.RETENTION_VACUUM_PAGES)
+        # Each step is its own short write transaction
+        cursor = await conn.execute(f"PRAGMA incremental_vacuum({step})")
+        await cursor.fetchall()
+        released += step
+        await asyncio.sleep(settings.RETENTION_BATCH_DELAY)
+
+
+async def run_retention(db_path: str) -> Dict:
+    """Purge snippets deleted more than RETENTION_DELETED_AGE_DAYS ago.
+
+    Rows are copied to the archive (table, JSON lines file, or nowhere) and
+    deleted in batches of RETENTION_BATCH_SIZE, each in its own transaction,
+    so the write lock is only held briefly. Change feed records older than
+    CHANGE_FEED_RETENTION_DAYS are pruned the same way. On databases created
+    with auto_vacuum=INCREMENTAL the freed pages are then returned to the
+    filesystem; otherwise they stay on the freelist for reuse.
+    """
+    mode = settings.RETENTION_ARCHIVE
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"RETENTION_ARCHIVE must be one of {ARCHIVE_MODES}, got {mode!r}")
+
+    async with _run_lock:
+        start = time.perf_counter()
+        cutoff = _cutoff(settings.RETENTION_DELETED_AGE_DAYS)
+        purged = 0
+
+        async with aiosqlite.connect(
+            db_path, isolation_level=None, timeout=settings.MIGRATION_LOCK_TIMEOUT
+        ) as conn:
+            page_size = await _pragma(conn, "page_size")
+            pages_before = await _pragma(conn, "page_count")
+
+            while True:
+                batch = await _purge_batch(conn, cutoff, mode)
+                purged += batch
+                if batch < settings.RETENTION_BATCH_SIZE:
+                    break
+                await asyncio.sleep(settings.RETENTION_BATCH_DELAY)
+
+            changes_pruned = await _prune_changes(conn)
+
+            auto_vacuum = _AUTO_VACUUM_MODES.get(await _pragma(conn, "auto_vacuum"), "none")
+            if auto_vacuum == "incremental":
+                await _incremental_vacuum(conn)
+
+            pages_after = await _pragma(conn, "page_count")
+            free_pages = await _pragma(conn, "freelist_count")
+
+    reclaimed = max(pages_before - pages_after, 0) * page_size
+    RETENTION_PURGED_ROWS.inc(purged)
+    RETENTION_RECLAIMED_BYTES.inc(reclaimed)
+    report = {
+        "cutoff": from_epoch_ms(cutoff).strftime("%Y-%m-%d %H:%M:%S"),
+        "archive": mode,
+        "purged": purged,
+        "changes_pruned": changes_pruned,
+        "reclaimed_bytes": reclaimed,
+        "free_bytes": free_pages * page_size,
+        "auto_vacuum": auto_vacuum,
+        "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+    logger.log("info", "Retention run completed", **report)
+    return report
+
+
+async def run_retention_all(db_paths: List[str]) -> Dict:
+    """Run the retention job on each shard in turn and combine the reports."""
+    reports = [await run_retention(db_path) for db_path in db_paths]
+    combined = dict(reports[0])
+    for report in reports[1:]:
+        for key in ("purged", "changes_pruned", "reclaimed_bytes", "free_bytes", "duration_ms"):
+            combined[key] += report[key]
+    combined["duration_ms"] = round(combined["duration_ms"], 2)
+    return combined
+
+
+async def retention_loop(db_paths: List[str]) -> None:
+    """Run the retention job every RETENTION_INTERVAL_SECONDS."""
+    while True:
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+        try:
+            await run_retention_all(db_paths)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.log("error", "Retention run failed", error=str(e))
@@ -59,16 +59,53 @@ class SnippetResponse(BaseModel):
     }
 
 
+class SimilarSnippet(BaseModel):
+    """Schema for a near-duplicate snippet."""
+    id: int
+    title: str
+    similarity: float
+
+
 class SnippetCreateResponse(BaseModel):
     """Schema for create response."""
     id: int
     created_at: datetime
+    similar: Optional[List[SimilarSnippet]] = None
     
     model_config = {
         "from_attributes": True
     }
 
 
+class SimilarSnippetsResponse(BaseModel):
+    """Schema for near-duplicate lookup response."""
+    id: int
+    threshold: float
+    items: List[SimilarSnippet]
+
+
+class ChangeRecord(BaseModel):
+    """Schema for a change feed record."""
+    seq: int
+    id: int
+    op: str
+    version: int
+    changed_at: datetime
+
+
+class ChangeListResponse(BaseModel):
+    """Schema for a change feed page."""
+    changes: List[ChangeRecord]
+    next_since: int
+    has_more: bool
+    latest_seq: int
+
+
+class SnippetBatchResponse(BaseModel):
+    """Schema for a batched get: the live snippets among the requested ids."""
+    items: List[SnippetResponse]
+
+
 class SnippetSearchResponse(BaseModel):
     """Schema for search response."""
     total: int
@@ -77,12 +114,131 @@ class SnippetSearchResponse(BaseModel):
     items: List[SnippetResponse]
 
 
+class SearchSpec(BaseModel):
+    """One search of a batch; same filters as GET /snippets."""
+    query: Optional[str] = None
+    tag: Optional[str] = None
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+    created_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+
+
+class BatchSearchRequest(BaseModel):
+    """Schema for a batched search request."""
+    searches: List[SearchSpec] = Field(..., min_length=1, max_length=settings.MAX_BATCH_SEARCHES)
+
+
+class BatchSearchResponse(BaseModel):
+    """Schema for batched search results, in request order."""
+    results: List[SnippetSearchResponse]
+
+
 class HealthResponse(BaseModel):
     """Schema for health check response."""
     status: str
     time: str
 
 
+class TagCount(BaseModel):
+    """Schema for a tag and its live snippet count."""
+    tag: str
+    count: int
+
+
+class TagListResponse(BaseModel):
+    """Schema for tag catalog response."""
+    items: List[TagCount]
+
+
+class Suggestion(BaseModel):
+    """Schema for a type-ahead suggestion."""
+    text: str
+    type: str
+    count: int
+
+
+class SuggestResponse(BaseModel):
+    """Schema for suggestion response."""
+    prefix: str
+    items: List[Suggestion]
+
+
+class SlowQueryEntry(BaseModel):
+    """Schema for an aggregated slow query fingerprint."""
+    fingerprint: str
+    sql: str
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    last_ms: float
+    last_rows: int
+    last_param_shapes: List[str]
+    last_plan: Optional[List[str]] = None
+    last_trace_id: str
+    last_seen: str
+
+
+class SlowQueryListResponse(BaseModel):
+    """Schema for slow query listing."""
+    threshold_ms: float
+    items: List[SlowQueryEntry]
+
+
+class RetentionReport(BaseModel):
+    """Schema for a retention job run."""
+    cutoff: str
+    archive: str
+    purged: int
+    changes_pruned: int
+    reclaimed_bytes: int
+    free_bytes: int
+    auto_vacuum: str
+    duration_ms: float
+
+
+class BackupSnapshot(BaseModel):
+    """Schema for a snapshot manifest."""
+    source: str
+    path: str
+    created_at: str
+    size_bytes: int
+    pages: int
+    sha256: str
+    change_seq: int
+    journal_mode: str
+    wal_checkpoint: Optional[List[int]] = None
+    restarts: int
+    single_step: bool = False
+    verified: Optional[bool] = None
+
+
+class BackupReport(BackupSnapshot):
+    """Schema for a backup run."""
+    skipped: bool
+    duration_ms: float
+
+
+class BackupRunResponse(BaseModel):
+    """Schema for an admin-triggered backup, one report per database file."""
+    items: List[BackupReport]
+
+
+class BackupProgress(BaseModel):
+    """Schema for the snapshot being copied."""
+    source: str
+    started_at: str
+    pages_total: Optional[int] = None
+    pages_remaining: Optional[int] = None
+
+
+class BackupListResponse(BaseModel):
+    """Schema for the snapshot listing."""
+    in_progress: Optional[BackupProgress] = None
+    items: List[BackupSnapshot]
+
+
 class ErrorResponse(BaseModel):
     """Schema for error responses."""
     error_code: str
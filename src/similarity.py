@@ -0,0 +1,149 @@
+"""Near-duplicate detection with MinHash signatures and an LSH bucket index.
+
+Signatures use one-permutation MinHash: every token shingle is hashed once
+and binned, and each bin keeps its minimum, so the cost is linear in the
+content size rather than in size × number of hash functions. The signature
+is cut into bands; snippets sharing any band bucket become candidates and
+are then scored by the fraction of equal bins, which estimates the Jaccard
+similarity of their shingle sets.
+"""
+import asyncio
+import hashlib
+import re
+import struct
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import aiosqlite
+
+from src import querylog
+from src.config import settings
+
+# Changing these invalidates stored signatures (add a migration to rebuild)
+NUM_BINS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_BINS // BANDS
+SHINGLE_SIZE = 2
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_MAX_HASH = 2 ** 64
+_BIN_RANGE = _MAX_HASH // NUM_BINS
+_SIGNATURE_FORMAT = f"<{NUM_BINS}Q"
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+def shingles(content: str) -> set:
+    """Token k-shingles; whitespace and layout don't affect them."""
+    tokens = _TOKEN_RE.findall(content.lower())
+    if len(tokens) <= SHINGLE_SIZE:
+        return {" ".join(tokens).encode()}
+    return {
+        " ".join(tokens[i:i + SHINGLE_SIZE]).encode()
+        for i in range(len(tokens) - SHINGLE_SIZE + 1)
+    }
+
+
+def compute_signature(content: str) -> List[int]:
+    """One-permutation MinHash signature with rotation densification."""
+    bins = [None] * NUM_BINS
+    for shingle in shingles(content):
+        h = _hash64(shingle)
+        index, value = divmod(h, _BIN_RANGE)
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    # Empty bins borrow the next non-empty bin to the right, offset by the
+    # distance so borrowed values don't collide with genuine ones
+    signature = []
+    for i in range(NUM_BINS):
+        distance = 0
+        while bins[(i + distance) % NUM_BINS] is None:
+            distance += 1
+        signature.append(bins[(i + distance) % NUM_BINS] + distance * _BIN_RANGE)
+    return signature
+
+
+async def signature_for(content: str) -> List[int]:
+    """Compute a signature, off the event loop for large content."""
+    if len(content) >= settings.HASH_OFFLOAD_THRESHOLD:
+        return await asyncio.to_thread(compute_signature, content)
+    return compute_signature(content)
+
+
+def pack(signature: Sequence[int]) -> bytes:
+    return struct.pack(_SIGNATURE_FORMAT, *signature)
+
+
+def unpack(blob: bytes) -> Tuple[int, ...]:
+    return struct.unpack(_SIGNATURE_FORMAT, blob)
+
+
+def pack_rows(rows: Sequence[int]) -> bytes:
+    return struct.pack(f"<{len(rows)}Q", *rows)
+
+
+def band_buckets(signature: Sequence[int]) -> List[Tuple[int, int]]:
+    """(band, bucket) pairs; bucket is a signed 64-bit hash of the band."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(pack_rows(rows), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+def estimate(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_BINS
+
+
+async def store_signature(conn: aiosqlite.Connection, snippet_id: int, signature: Sequence[int]) -> None:
+    """Replace a snippet's signature and bucket rows (caller commits)."""
+    await querylog.execute(conn, "DELETE FROM snippet_lsh WHERE snippet_id = ?", (snippet_id,))
+    await querylog.execute(
+        conn,
+        "INSERT OR REPLACE INTO snippet_signatures (snippet_id, signature) VALUES (?, ?)",
+        (snippet_id, pack(signature))
+    )
+    params = []
+    for band, bucket in band_buckets(signature):
+        params.extend([band, bucket, snippet_id])
+    await querylog.execute(
+        conn,
+        "INSERT INTO snippet_lsh (band, bucket, snippet_id) VALUES "
+        + ", ".join(["(?, ?, ?)"] * BANDS),
+        params
+    )
+
+
+async def candidates(conn: aiosqlite.Connection, signature: Sequence[int],
+                     exclude_id: int = 0) -> Dict[int, Tuple[int, ...]]:
+    """Snippets sharing at least one band bucket → their signatures."""
+    lookups = " UNION ".join(
+        ["SELECT snippet_id FROM snippet_lsh WHERE band = ? AND bucket = ?"] * BANDS
+    )
+    params: List = []
+    for band, bucket in band_buckets(signature):
+        params.extend([band, bucket])
+    rows = await querylog.fetchall(
+        conn,
+        f"""SELECT g.snippet_id, g.signature FROM snippet_signatures g
+            WHERE g.snippet_id IN ({lookups}) AND g.snippet_id != ?""",
+        params + [exclude_id]
+    )
+    return {row[0]: unpack(row[1]) for row in rows}
+
+
+def rank(signature: Sequence[int], found: Dict[int, Tuple[int, ...]],
+         threshold: float, limit: int) -> List[Tuple[int, float]]:
+    """Candidates at or above the threshold, most similar first."""
+    scored = [(snippet_id, estimate(signature, other)) for snippet_id, other in found.items()]
+    scored = [item for item in scored if item[1] >= threshold]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:limit]
+
+
+def signatures_for_batch(contents: Iterable[str]) -> List[List[int]]:
+    return [compute_signature(content) for content in contents]
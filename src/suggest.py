@@ -0,0 +1,198 @@
+"""In-memory prefix index over titles and tags for type-ahead suggestions."""
+import asyncio
+import heapq
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from src.config import settings
+from src.database import shard_path, shard_paths
+from src.metrics import REGISTRY
+from src.utils import parse_tags, prefix_upper_bound
+
+SUGGEST_INDEX_TERMS = REGISTRY.gauge(
+    "snippetbox_suggest_index_terms",
+    "Distinct titles and tags in the suggestion index",
+)
+
+# Most suggestions one request may ask for; cached top lists keep this many
+MAX_SUGGESTIONS = 50
+
+Key = Tuple[str, str]
+
+
+class _Term:
+    __slots__ = ("text", "count", "last_id")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.count = 0
+        self.last_id = 0
+
+
+class SuggestIndex:
+    """Sorted array of (casefolded term, kind) keys searched with bisect.
+
+    Each term tracks how many indexed snippets carry it and the newest of
+    them; suggestions rank by that count, then by recency, over every term
+    with the prefix. Prefixes up to SUGGEST_TOP_PREFIX_LEN characters, which
+    match the most terms, keep their best MAX_SUGGESTIONS terms cached and
+    updated as counts change; longer prefixes rank their (short) key range
+    on each query. Only the newest `max_snippets` snippets are indexed,
+    which bounds memory.
+    """
+
+    def __init__(self, max_snippets: int):
+        self.max_snippets = max_snippets
+        self._keys: List[Key] = []
+        self._terms: Dict[Key, _Term] = {}
+        self._snippets: "OrderedDict[int, List[Key]]" = OrderedDict()
+        # prefix → best keys, best first; missing entries are rebuilt on demand
+        self._top: Dict[str, List[Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def _snippet_terms(title: str, tags: List[str]) -> Dict[Key, str]:
+        terms = {(title.casefold(), "title"): title}
+        for tag in tags:
+            terms[(tag.casefold(), "tag")] = tag
+        return terms
+
+    def _rank(self, key: Key) -> Tuple[int, int, str, str]:
+        """Sort key: higher count, then newer, then alphabetical."""
+        term = self._terms[key]
+        return (-term.count, -term.last_id, key[0], key[1])
+
+    def add(self, snippet_id: int, title: str, tags: List[str]) -> None:
+        if not settings.SUGGEST_ENABLED:
+            return
+        self.discard(snippet_id)
+        terms = self._snippet_terms(title, tags)
+        for key, text in terms.items():
+            term = self._terms.get(key)
+            if term is None:
+                term = self._terms[key] = _Term(text)
+                insort(self._keys, key)
+            term.text = text
+            term.count += 1
+            term.last_id = max(term.last_id, snippet_id)
+            self._rerank(key, worse=False)
+        self._snippets[snippet_id] = list(terms)
+        while len(self._snippets) > self.max_snippets:
+            self.discard(next(iter(self._snippets)))
+
+    def discard(self, snippet_id: int) -> None:
+        keys = self._snippets.pop(snippet_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            term = self._terms[key]
+            term.count -= 1
+            if term.count <= 0:
+                del self._terms[key]
+                del self._keys[bisect_left(self._keys, key)]
+            self._rerank(key, worse=True)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._terms.clear()
+        self._snippets.clear()
+        self._top.clear()
+
+    def _rerank(self, key: Key, worse: bool) -> None:
+        """Keep the cached top lists of `key`'s prefixes in order after it changed.
+
+        A full list stays correct when a term improves: it either enters or
+        not. When a listed term gets worse, an unlisted one may now beat it,
+        so that list is dropped and rebuilt on the next query.
+        """
+        live = key in self._terms
+        for n in range(1, min(len(key[0]), settings.SUGGEST_TOP_PREFIX_LEN) + 1):
+            top = self._top.get(key[0][:n])
+            if top is None:
+                continue
+            if key in top:
+                if worse and len(top) >= MAX_SUGGESTIONS:
+                    del self._top[key[0][:n]]
+                    continue
+                top.remove(key)
+            elif worse:
+                continue
+            if live:
+                top.insert(bisect_left(top, self._rank(key), key=self._rank), key)
+                del top[MAX_SUGGESTIONS:]
+
+    def _best(self, prefix: str, limit: int) -> List[Key]:
+        """Rank every key starting with `prefix`."""
+        start = bisect_left(self._keys, (prefix, ""))
+        upper = prefix_upper_bound(prefix)
+        end = len(self._keys) if upper is None else bisect_left(self._keys, (upper, ""), start)
+        return heapq.nsmallest(limit, self._keys[start:end], key=self._rank)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Best `limit` terms starting with `prefix` (case-insensitive)."""
+        prefix = prefix.casefold()
+        limit = min(limit, MAX_SUGGESTIONS)
+        if len(prefix) <= settings.SUGGEST_TOP_PREFIX_LEN:
+            top = self._top.get(prefix)
+            if top is None:
+                top = self._top[prefix] = self._best(prefix, MAX_SUGGESTIONS)
+            best = top[:limit]
+        else:
+            best = self._best(prefix, limit)
+        return [
+            {"text": self._terms[key].text, "type": key[1], "count": self._terms[key].count}
+            for key in best
+        ]
+
+    async def refresh(self, snippet_id: int) -> None:
+        """Re-read one snippet after a change, possibly made by another worker."""
+        if not settings.SUGGEST_ENABLED:
+            return
+        async with aiosqlite.connect(shard_path(snippet_id)) as conn:
+            cursor = await conn.execute(
+                "SELECT title, tags FROM snippets WHERE id = ? AND deleted_at IS NULL",
+                (snippet_id,)
+            )
+            row: Optional[tuple] = await cursor.fetchone()
+        if row is None:
+            self.discard(snippet_id)
+        elif snippet_id in self._snippets or self._is_recent(snippet_id):
+            self.add(snippet_id, row[0], parse_tags(row[1]))
+
+    def _is_recent(self, snippet_id: int) -> bool:
+        """Whether a snippet not indexed yet belongs among the newest ones."""
+        return len(self._snippets) < self.max_snippets or snippet_id > next(iter(self._snippets))
+
+    async def rewarm(self) -> None:
+        """Rebuild from every shard, after the change feed could not be followed."""
+        self.clear()
+        for path in shard_paths():
+            await self.warm(path)
+
+    async def warm(self, db_path: str) -> int:
+        """Index the newest live snippets, oldest first; returns snippets read."""
+        if not settings.SUGGEST_ENABLED:
+            return 0
+        async with aiosqlite.connect(db_path) as conn:
+            cursor = await conn.execute(
+                """SELECT id, title, tags FROM snippets
+                   WHERE deleted_at IS NULL ORDER BY id DESC LIMIT ?""",
+                (self.max_snippets,)
+            )
+            rows = await cursor.fetchall()
+        for n, (snippet_id, title, tags) in enumerate(reversed(rows)):
+            # Writes that landed after the snapshot already hold newer data
+            if snippet_id not in self._snippets:
+                self.add(snippet_id, title, parse_tags(tags))
+            if n % 1000 == 999:
+                await asyncio.sleep(0)
+        return len(rows)
+
+
+suggest_index = SuggestIndex(settings.SUGGEST_MAX_SNIPPETS)
+SUGGEST_INDEX_TERMS.set_function(lambda: len(suggest_index))
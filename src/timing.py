@@ -0,0 +1,160 @@
+"""Per-request span timers reported in the Server-Timing header.
+
+Like `trace_id_var`, the current request's `Timings` lives in a context
+variable, so spans recorded anywhere below the middleware (handlers, CRUD,
+the query log) land on the right request without passing it around. With
+no `Timings` in context every span is a shared no-op.
+"""
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+# Server-Timing descriptions of the spans recorded across the app
+DESCRIPTIONS = {
+    "total": "Total",
+    "mw": "Middleware",
+    "ratelimit": "Rate limiting",
+    "queue": "Admission queue",
+    "app": "Route",
+    "fastapi": "Validation and serialization",
+    "handler": "Handler",
+    "db": "Database",
+    "conn": "Connection setup",
+    "sql": "SQL",
+    "tags": "Tag parsing",
+    "serialize": "Serialization",
+    "render": "Highlighting",
+}
+
+
+class Timings:
+    """Accumulated seconds and call counts per span name for one request."""
+
+    __slots__ = ("start", "spans")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: Dict[str, List] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        span = self.spans.get(name)
+        if span is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            span[0] += seconds
+            span[1] += 1
+
+    def seconds(self, name: str) -> float:
+        span = self.spans.get(name)
+        return span[0] if span else 0.0
+
+    def entries(self, total: float) -> List[Tuple[str, float, int]]:
+        """(name, seconds, count) with the total and derived spans first."""
+        entries = [("total", total, 1)]
+        if "app" in self.spans:
+            entries.append(("mw", max(total - self.seconds("app"), 0.0), 1))
+        if "handler" in self.spans:
+            entries.append(("fastapi", max(self.seconds("app") - self.seconds("handler"), 0.0), 1))
+        entries.extend((name, seconds, count) for name, (seconds, count) in self.spans.items())
+        return entries
+
+    def header(self, total: float) -> str:
+        parts = []
+        for name, seconds, count in self.entries(total):
+            desc = DESCRIPTIONS.get(name, name)
+            if count > 1:
+                desc = f"{desc} x{count}"
+            parts.append(f'{name};desc="{desc}";dur={seconds * 1000:.2f}')
+        return ", ".join(parts)
+
+    def summary(self) -> Dict[str, float]:
+        """Milliseconds per span, for the access log."""
+        return {
+            name: round(seconds * 1000, 2)
+            for name, seconds, _ in self.entries(time.perf_counter() - self.start)
+        }
+
+
+timings_var: ContextVar[Optional[Timings]] = ContextVar("timings", default=None)
+# Names of the spans open in this context; a nested span of the same name is not counted twice
+_open_var: ContextVar[frozenset] = ContextVar("timing_open", default=frozenset())
+
+
+def current() -> Optional[Timings]:
+    return timings_var.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already measured duration to the current request, if any."""
+    timings = timings_var.get()
+    if timings is not None:
+        timings.record(name, seconds)
+
+
+class _Span:
+    __slots__ = ("timings", "name", "start", "token")
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.token = _open_var.set(_open_var.get() | {self.name})
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.start)
+        _open_var.reset(self.token)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """Context manager timing a block into the current request's `name` span."""
+    timings = timings_var.get()
+    if timings is None or name in _open_var.get():
+        return _NO_SPAN
+    return _Span(timings, name)
+
+
+class TimedRoute(APIRoute):
+    """Route recording `app` (the whole route) and `handler` (the endpoint) spans.
+
+    The difference is request validation, dependencies and response
+    serialization, reported as the derived `fastapi` span.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(*args, **kwargs):
+                with span("handler"):
+                    return await call(*args, **kwargs)
+            self.dependant.call = timed_call
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            with span("app"):
+                return await handler(request)
+        return timed_handler
@@ -3,11 +3,20 @@ import hashlib
 import json
 import uuid
 from contextvars import ContextVar
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from src import timing
 
 # Context variable for trace_id
 trace_id_var: ContextVar[str] = ContextVar("trace_id", default="")
 
+# Current time in epoch milliseconds, for SQL writing timestamp columns
+# (unixepoch('subsec') needs SQLite 3.42)
+NOW_MS_SQL = "CAST(ROUND((julianday('now') - 2440587.5) * 86400000) AS INTEGER)"
+
+_EPOCH = datetime(1970, 1, 1)
+
 
 def generate_trace_id() -> str:
     """Generate a unique trace ID."""
@@ -30,6 +39,63 @@ def compute_content_hash(title: str, content: str) -> str:
     return hashlib.sha256(combined.encode()).hexdigest()
 
 
+def make_etag(snippet_id: int, version: int) -> str:
+    """Build the strong ETag for a snippet version."""
+    return f'"{snippet_id}.{version}"'
+
+
+def parse_if_match(header: Optional[str], snippet_id: int) -> Optional[int]:
+    """Extract the expected version from an If-Match header.
+    
+    Returns None when there is no precondition (absent or `*`), and 0 (never
+    a real version) when no listed ETag belongs to this snippet.
+    """
+    if header is None or header.strip() == "*":
+        return None
+    for tag in header.split(","):
+        tag = tag.strip()
+        # If-Match uses strong comparison, so weak validators never match
+        if tag.startswith("W/"):
+            continue
+        value = tag.strip('"')
+        tag_id, _, version = value.partition(".")
+        if tag_id == str(snippet_id) and version.isdigit():
+            return int(version)
+    return 0
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against the current ETag.
+    
+    If-None-Match uses weak comparison, so a W/ prefix is ignored.
+    """
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def epoch_ms(dt: datetime) -> int:
+    """Milliseconds since the Unix epoch; naive datetimes are taken as UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(ms: Optional[int]) -> Optional[datetime]:
+    """Naive UTC datetime for a stored epoch-millisecond timestamp."""
+    if ms is None:
+        return None
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
 def format_timestamp(dt: datetime) -> str:
     """Format datetime to ISO 8601 string."""
     if dt is None:
@@ -39,12 +105,32 @@ def format_timestamp(dt: datetime) -> str:
 
 def parse_tags(tags_json: str) -> list:
     """Parse tags from JSON string."""
-    try:
-        return json.loads(tags_json) if tags_json else []
-    except:
-        return []
+    with timing.span("tags"):
+        try:
+            return json.loads(tags_json) if tags_json else []
+        except:
+            return []
 
 
 def serialize_tags(tags: list) -> str:
     """Serialize tags to JSON string."""
     return json.dumps(tags if tags else [])
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string above every string starting with `prefix`, or None.
+    
+    Python strings and SQLite TEXT (as UTF-8 bytes) both compare in code
+    point order. The last character is bumped to the next valid one
+    (skipping surrogates, which can't be encoded); a trailing U+10FFFF has
+    no successor, so it is dropped and the one before it bumped instead.
+    None means no upper bound.
+    """
+    while prefix:
+        code = ord(prefix[-1]) + 1
+        if code == 0xD800:
+            code = 0xE000
+        if code <= 0x10FFFF:
+            return prefix[:-1] + chr(code)
+        prefix = prefix[:-1]
+    return None
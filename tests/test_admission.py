@@ -0,0 +1,133 @@
+"""Admission control tests."""
+import asyncio
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.admission import AdmissionControlMiddleware, AdmissionQueue, Overloaded, admission, READ, WRITE
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def replace_queue(monkeypatch):
+    """Swap in a small queue; the original gets its gauges back afterwards."""
+    replaced = []
+
+    def replace(name, concurrency, max_waiting, timeout):
+        replaced.append(admission.queues[name])
+        queue = AdmissionQueue(name, concurrency, max_waiting, timeout)
+        monkeypatch.setitem(admission.queues, name, queue)
+        return queue
+
+    yield replace
+    for queue in replaced:
+        queue.export()
+
+
+class TestAdmissionQueue:
+    """AdmissionQueue unit tests."""
+
+    async def test_full_queue_rejects_immediately(self):
+        """Test that arrivals beyond the queue bound are refused at once."""
+        queue = AdmissionQueue("test", 1, 1, 5.0)
+        await queue.acquire()
+        waiter = asyncio.ensure_future(queue.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as exc:
+            await queue.acquire()
+        assert exc.value.reason == "queue_full"
+
+        queue.release()
+        assert await asyncio.wait_for(waiter, 1) >= 0
+        assert queue.active == 1 and queue.waiting == 0
+
+    async def test_queue_deadline(self):
+        """Test that a waiter gives up after the queue timeout."""
+        queue = AdmissionQueue("test", 1, 4, 0.05)
+        await queue.acquire()
+        with pytest.raises(Overloaded) as exc:
+            await queue.acquire()
+        assert exc.value.reason == "queue_timeout"
+        assert queue.waiting == 0
+
+        queue.release()
+        assert queue.active == 0
+
+    async def test_slots_are_handed_over_in_order(self):
+        """Test that waiters are admitted first in, first out."""
+        queue = AdmissionQueue("test", 1, 4, 5.0)
+        await queue.acquire()
+        order = []
+
+        async def wait(n):
+            await queue.acquire()
+            order.append(n)
+
+        tasks = [asyncio.ensure_future(wait(n)) for n in range(3)]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            queue.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2]
+
+
+class TestLoadShedding:
+    """Middleware tests."""
+
+    async def test_write_shed_with_retry_after(self, client, replace_queue):
+        """Test that a saturated write queue answers 503 with Retry-After."""
+        queue = replace_queue(WRITE, 1, 0, 0.05)
+        await queue.acquire()
+
+        response = await client.post("/snippets", json={"title": "Shed", "content": "x = 1"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+        assert response.json()["error_code"] == "SERVICE_OVERLOADED"
+        assert "x-trace-id" in response.headers
+
+        # Reads use their own queue and are unaffected
+        assert (await client.get("/snippets")).status_code != 503
+        assert (await client.get("/health")).status_code == 200
+
+    async def test_rejections_are_reported(self, client, replace_queue):
+        """Test that shed requests show up in the metrics."""
+        queue = replace_queue(WRITE, 1, 0, 0.05)
+        await queue.acquire()
+        await client.delete("/snippets/1")
+
+        body = (await client.get("/metrics")).text
+        assert 'snippetbox_admission_rejections_total{queue="write",reason="queue_full"}' in body
+        assert 'snippetbox_admission_queue_depth{queue="read"} 0' in body
+
+    async def test_slot_held_until_body_is_sent(self, replace_queue):
+        """Test that a streaming response keeps its read slot until the last chunk."""
+        queue = replace_queue(READ, 1, 4, 0.05)
+        active_during_body = []
+
+        async def streaming_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            for more in (True, False):
+                active_during_body.append(queue.active)
+                await send({"type": "http.response.body", "body": b"x", "more_body": more})
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/snippets/1/raw", "headers": [], "query_string": b""}
+        await AdmissionControlMiddleware(streaming_app)(scope, receive, send)
+        assert active_during_body == [1, 1]
+        assert queue.active == 0
+        assert sent[-1]["more_body"] is False
@@ -0,0 +1,90 @@
+"""Background pool tests."""
+import asyncio
+import logging
+import threading
+import pytest
+from src.background import BackgroundPool, BACKGROUND_BACKPRESSURE, BACKGROUND_TASKS
+from src.utils import get_trace_id, set_trace_id
+
+
+@pytest.fixture
+async def pool():
+    """A started pool with two workers and a small queue."""
+    pool = BackgroundPool(workers=2, threads=2, max_queued=4)
+    pool.start()
+    yield pool
+    await pool.drain(1.0)
+
+
+class TestBackgroundPool:
+    """Background pool tests."""
+
+    async def test_same_key_runs_in_order(self, pool):
+        """Test that jobs for one key run sequentially in submission order."""
+        ran = []
+
+        async def job(n, delay):
+            await asyncio.sleep(delay)
+            ran.append(n)
+
+        await pool.submit("ordered", job, 1, 0.02, key=7)
+        await pool.submit("ordered", job, 2, 0.0, key=7)
+        await pool.submit("ordered", job, 3, 0.0, key=7)
+        assert ran == []
+        assert await pool.drain(1.0)
+        assert ran == [1, 2, 3]
+
+    async def test_thread_jobs_keep_trace_id(self, pool):
+        """Test that blocking jobs run off the event loop with the submitter's trace id."""
+        seen = []
+        set_trace_id("trace-bg")
+        await pool.submit("blocking", lambda: seen.append((threading.current_thread().name, get_trace_id())),
+                          thread=True)
+        await pool.drain(1.0)
+        assert seen[0][0].startswith("snippetbox-bg")
+        assert seen[0][1] == "trace-bg"
+
+    async def test_full_queue_applies_backpressure(self):
+        """Test that submit waits for room once the queue is full."""
+        pool = BackgroundPool(workers=1, threads=1, max_queued=1)
+        pool.start()
+        release = asyncio.Event()
+        before = BACKGROUND_BACKPRESSURE.labels().value
+        await pool.submit("block", release.wait)
+        await asyncio.sleep(0)
+        await pool.submit("fill", lambda: None)
+        waiting = asyncio.ensure_future(pool.submit("wait", lambda: None))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert BACKGROUND_BACKPRESSURE.labels().value == before + 1
+        release.set()
+        await asyncio.wait_for(waiting, 1.0)
+        assert await pool.drain(1.0)
+
+    async def test_failures_are_reported(self, pool, caplog):
+        """Test that a failing job is logged and counted without stopping the pool."""
+        failed = BACKGROUND_TASKS.labels("explode", "failed")
+        before = failed.value
+        ran = []
+
+        def explode():
+            raise RuntimeError("boom")
+
+        with caplog.at_level(logging.ERROR, logger="snippetbox"):
+            await pool.submit("explode", explode, key=1)
+            await pool.submit("after", ran.append, 1, key=1)
+            await pool.drain(1.0)
+        assert failed.value == before + 1
+        assert ran == [1]
+        record = next(r for r in caplog.records if r.getMessage() == "Background task failed")
+        assert (record.task, record.error) == ("explode", "boom")
+
+    async def test_drain_timeout_and_inline_fallback(self):
+        """Test that drain gives up after the timeout and later jobs run inline."""
+        pool = BackgroundPool(workers=1, threads=1, max_queued=4)
+        pool.start()
+        await pool.submit("slow", asyncio.sleep, 1.0)
+        assert await pool.drain(0.01) is False
+        ran = []
+        await pool.submit("inline", ran.append, 1)
+        assert ran == [1]
@@ -0,0 +1,110 @@
+"""Online backup tests."""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.database import get_db_path
+
+
+@pytest.fixture
+async def client(monkeypatch, tmp_path):
+    """Create test client writing snapshots to a temporary directory."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMIN_ENABLED", True)
+    monkeypatch.setattr(settings, "BACKUP_DIR", str(tmp_path / "backups"))
+    monkeypatch.setattr(settings, "BACKUP_STEP_PAGES", 2)
+    monkeypatch.setattr(settings, "BACKUP_STEP_DELAY", 0)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+class TestBackup:
+    """Snapshot API tests."""
+
+    async def test_snapshot_is_complete_and_verified(self, client):
+        """Test that a snapshot holds the data and matches its checksum."""
+        title = f"Backup {uuid.uuid4()}"
+        snippet_id = (await client.post("/snippets", json={"title": title, "content": "x = 1"})).json()["id"]
+
+        response = await client.post("/admin/backups")
+        assert response.status_code == 200
+        report = response.json()["items"][0]
+        assert report["skipped"] is False
+        assert report["journal_mode"] and report["pages"] > 2
+
+        with open(report["path"], "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == report["sha256"]
+        conn = sqlite3.connect(report["path"])
+        assert conn.execute("SELECT title FROM snippets WHERE id = ?", (snippet_id,)).fetchone() == (title,)
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        assert conn.execute(
+            "SELECT MAX(seq) FROM snippet_changes"
+        ).fetchone()[0] == report["change_seq"]
+        conn.close()
+
+    async def test_unchanged_database_is_skipped(self, client):
+        """Test that an unforced run writes nothing when no snippet changed."""
+        first = (await client.post("/admin/backups")).json()["items"][0]
+        again = (await client.post("/admin/backups", params={"force": "false"})).json()["items"][0]
+        assert again["skipped"] is True and again["path"] == first["path"]
+
+        await client.post("/snippets", json={"title": f"Changed {uuid.uuid4()}", "content": "y = 2"})
+        changed = (await client.post("/admin/backups", params={"force": "false"})).json()["items"][0]
+        assert changed["skipped"] is False
+        assert changed["change_seq"] > first["change_seq"]
+
+    async def test_listing_verifies_checksums(self, client):
+        """Test that a damaged snapshot fails verification."""
+        report = (await client.post("/admin/backups")).json()["items"][0]
+        with open(report["path"], "r+b") as f:
+            f.seek(200)
+            f.write(b"\xff" * 16)
+
+        data = (await client.get("/admin/backups", params={"verify": "true"})).json()
+        assert "in_progress" not in data
+        assert [item["verified"] for item in data["items"]] == [False]
+
+    async def test_old_snapshots_are_pruned(self, client, monkeypatch):
+        """Test that only the newest BACKUP_KEEP snapshots are kept."""
+        monkeypatch.setattr(settings, "BACKUP_KEEP", 2)
+        paths = [(await client.post("/admin/backups")).json()["items"][0]["path"] for _ in range(3)]
+        listed = [item["path"] for item in (await client.get("/admin/backups")).json()["items"]]
+        assert listed == paths[:0:-1]
+
+    async def test_busy_writer_falls_back_to_single_step(self, client, monkeypatch):
+        """Test that a copy restarted by constant writes still finishes with consistent data."""
+        monkeypatch.setattr(settings, "BACKUP_STEP_DELAY", 0.005)
+        monkeypatch.setattr(settings, "BACKUP_MAX_RESTARTS", 2)
+        snippet_id = (await client.post("/snippets", json={"title": f"Busy {uuid.uuid4()}", "content": "n"})).json()["id"]
+        stop = threading.Event()
+
+        def writer():
+            conn = sqlite3.connect(get_db_path(), timeout=5)
+            n = 0
+            while not stop.is_set():
+                n += 1
+                conn.execute("UPDATE snippets SET content = ? WHERE id = ?", (f"n = {n}", snippet_id))
+                conn.commit()
+                time.sleep(0.002)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            response = await asyncio.wait_for(client.post("/admin/backups"), timeout=30)
+        finally:
+            stop.set()
+            thread.join()
+        assert response.status_code == 200
+        report = response.json()["items"][0]
+        assert report["single_step"] is True
+        assert report["restarts"] == 3
+        conn = sqlite3.connect(report["path"])
+        assert conn.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+        conn.close()
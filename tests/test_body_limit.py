@@ -0,0 +1,68 @@
+"""Request body limit tests."""
+import json
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.metrics import BODY_LIMIT_REJECTED_BYTES
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+class TestBodyLimit:
+    """Body size guard tests."""
+
+    async def test_declared_length_rejected_up_front(self, client):
+        """Test that an oversized Content-Length gets 413 without validation."""
+        body = b"x" * (settings.get_max_body_bytes() + 1)
+        response = await client.post(
+            "/snippets", content=body, headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 413
+        assert response.json()["error_code"] == "PAYLOAD_TOO_LARGE"
+        assert "x-trace-id" in response.headers
+
+    async def test_chunked_upload_aborted_early(self, client, monkeypatch):
+        """Test that a body without Content-Length is refused once it passes the limit."""
+        monkeypatch.setattr(settings, "MAX_BODY_BYTES", 4096)
+        rejected = BODY_LIMIT_REJECTED_BYTES.labels("stream")
+        before = rejected.value
+
+        async def chunks():
+            for _ in range(100):
+                yield b" " * 1024
+
+        response = await client.post(
+            "/snippets", content=chunks(), headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code == 413
+        assert response.json()["error_code"] == "PAYLOAD_TOO_LARGE"
+        # Parsing stopped within one chunk of the limit
+        assert rejected.value - before == 5 * 1024
+
+    async def test_largest_valid_snippet_fits(self, client):
+        """Test that the derived limit admits a snippet at every field limit."""
+        body = json.dumps({
+            "title": "é" * (settings.MAX_TITLE_LENGTH - 36) + str(uuid.uuid4()),
+            "content": "é" * settings.MAX_CONTENT_LENGTH,
+            "tags": ["é" * settings.MAX_TAG_LENGTH] * settings.MAX_TAGS_COUNT,
+        }).encode()
+        response = await client.post(
+            "/snippets", content=body, headers={"Content-Type": "application/json"}
+        )
+        assert response.status_code != 413
+
+    async def test_rejections_are_reported(self, client, monkeypatch):
+        """Test that rejected requests and bytes show up in the metrics."""
+        monkeypatch.setattr(settings, "MAX_BODY_BYTES", 10)
+        await client.post("/snippets", json={"title": "too", "content": "large"})
+        body = (await client.get("/metrics")).text
+        assert 'snippetbox_body_limit_rejections_total{reason="content_length"}' in body
+        assert 'snippetbox_body_limit_rejected_bytes_total{reason="content_length"}' in body
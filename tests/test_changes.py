@@ -0,0 +1,127 @@
+"""Change feed tests."""
+import asyncio
+import sqlite3
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app, stream_changes_endpoint
+from src.config import settings
+from src.changes import change_events
+from src.database import get_db_path
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+async def latest_seq(client) -> int:
+    response = await client.get("/changes")
+    assert response.json()["changes"] == []
+    return response.json()["next_since"]
+
+
+async def create(client) -> int:
+    response = await client.post("/snippets", json={
+        "title": f"Feed {uuid.uuid4()}", "content": "feed = True", "tags": ["feed"]
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+class TestChangeFeed:
+    """Change listing tests."""
+
+    async def test_writes_appear_in_order(self, client):
+        """Test that create, update and delete each record one change."""
+        since = await latest_seq(client)
+        snippet_id = await create(client)
+        await client.patch(f"/snippets/{snippet_id}", json={"title": f"Feed renamed {uuid.uuid4()}"})
+        await client.delete(f"/snippets/{snippet_id}")
+
+        response = await client.get("/changes", params={"since": since})
+        assert response.status_code == 200
+        data = response.json()
+        ours = [(c["op"], c["version"]) for c in data["changes"] if c["id"] == snippet_id]
+        assert ours == [("create", 1), ("update", 2), ("delete", 3)]
+        seqs = [c["seq"] for c in data["changes"]]
+        assert seqs == sorted(seqs) and seqs[0] > since
+        assert data["next_since"] == seqs[-1] == data["latest_seq"]
+
+    async def test_pagination(self, client):
+        """Test that pages chain through next_since without gaps."""
+        since = await latest_seq(client)
+        for _ in range(3):
+            await create(client)
+
+        seen = []
+        while True:
+            data = (await client.get("/changes", params={"since": since, "limit": 2})).json()
+            seen.extend(c["seq"] for c in data["changes"])
+            since = data["next_since"]
+            if not data["has_more"]:
+                break
+        assert len(seen) == 3
+        assert seen == list(range(seen[0], seen[0] + 3))
+
+    async def test_pruned_history_is_gone(self, client):
+        """Test that resuming before pruned records asks for a rescan."""
+        await create(client)
+        conn = sqlite3.connect(get_db_path())
+        oldest = conn.execute("SELECT MIN(seq) FROM snippet_changes").fetchone()[0]
+        conn.execute("DELETE FROM snippet_changes WHERE seq = ?", (oldest,))
+        conn.commit()
+        conn.close()
+
+        response = await client.get("/changes", params={"since": oldest - 1})
+        assert response.status_code == 410
+        assert response.json()["error_code"] == "CHANGES_EXPIRED"
+
+
+class TestChangeStream:
+    """Server-Sent Events tests."""
+
+    async def test_stream_pushes_new_changes(self, client, monkeypatch):
+        """Test that a waiting stream is woken by a local write."""
+        monkeypatch.setattr(settings, "CHANGE_FEED_POLL_SECONDS", 30.0)
+        since = await latest_seq(client)
+        disconnected = False
+
+        async def is_disconnected():
+            return disconnected
+
+        events = change_events(since, is_disconnected)
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+
+        snippet_id = await create(client)
+        frame = await asyncio.wait_for(pending, timeout=5)
+        assert frame.startswith(f"id: {since + 1}\nevent: change\n")
+        assert f'"id": {snippet_id}' in frame
+
+        disconnected = True
+        await events.aclose()
+
+    async def test_stream_without_since_starts_at_latest(self, client):
+        """Test that a new stream without since or Last-Event-ID skips existing history."""
+        await create(client)
+        latest = await latest_seq(client)
+
+        class Request:
+            async def is_disconnected(self):
+                return False
+
+        response = await stream_changes_endpoint(Request(), since=None, shard=0, last_event_id=None)
+        events = response.body_iterator
+        pending = asyncio.ensure_future(events.__anext__())
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+
+        await create(client)
+        frame = await asyncio.wait_for(pending, timeout=5)
+        assert frame.startswith(f"id: {latest + 1}\nevent: change\n")
+        await events.aclose()
@@ -1,7 +1,12 @@
 """Idempotency tests."""
+import threading
 import pytest
 from httpx import AsyncClient
 from src.main import app
+from src.config import settings
+from src import dedup
+from src.dedup import content_hash_index, DEDUP_INDEX_HITS
+from src.utils import compute_content_hash
 
 
 @pytest.fixture
@@ -52,3 +57,62 @@ class TestIdempotency:
         response2 = await client.post("/snippets", json=snippet2)
         
         assert response1.json()["id"] != response2.json()["id"]
+    
+    async def test_duplicate_answered_from_hash_index(self, client):
+        """Test that a known duplicate is served by the content hash index."""
+        snippet_data = {
+            "title": "Indexed Duplicate",
+            "content": "x = 1",
+            "tags": []
+        }
+        response1 = await client.post("/snippets", json=snippet_data)
+        hits_before = DEDUP_INDEX_HITS.labels().value
+        
+        response2 = await client.post("/snippets", json=snippet_data)
+        
+        assert response2.json()["id"] == response1.json()["id"]
+        assert DEDUP_INDEX_HITS.labels().value == hits_before + 1
+    
+    async def test_large_content_hashed_off_loop(self, client, monkeypatch):
+        """Test that only content above the offload threshold is hashed in a worker thread."""
+        threads = []
+        
+        def recording(title, content):
+            threads.append(threading.get_ident())
+            return compute_content_hash(title, content)
+        
+        monkeypatch.setattr(dedup, "compute_content_hash", recording)
+        loop_thread = threading.get_ident()
+        small = await dedup.hash_content("Small", "a" * (settings.HASH_OFFLOAD_THRESHOLD // 2))
+        assert threads == [loop_thread]
+        assert small == compute_content_hash("Small", "a" * (settings.HASH_OFFLOAD_THRESHOLD // 2))
+        
+        snippet_data = {
+            "title": "Large Snippet",
+            "content": "a" * (settings.HASH_OFFLOAD_THRESHOLD + 1),
+            "tags": []
+        }
+        threads.clear()
+        response1 = await client.post("/snippets", json=snippet_data)
+        response2 = await client.post("/snippets", json=snippet_data)
+        
+        assert response1.status_code == 201
+        assert response1.json()["id"] == response2.json()["id"]
+        assert threads and loop_thread not in threads
+    
+    async def test_stale_index_entry_falls_through(self, client):
+        """Test that a stale index entry is ignored and corrected."""
+        snippet_data = {
+            "title": "Stale Entry",
+            "content": "y = 2",
+            "tags": []
+        }
+        response = await client.post("/snippets", json=snippet_data)
+        snippet_id = response.json()["id"]
+        content_hash = compute_content_hash(snippet_data["title"], snippet_data["content"])
+        content_hash_index.add(content_hash, 99999999)
+        
+        response = await client.post("/snippets", json=snippet_data)
+        
+        assert response.json()["id"] == snippet_id
+        assert content_hash_index.get(content_hash) == snippet_id
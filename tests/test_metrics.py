@@ -0,0 +1,54 @@
+"""Metrics endpoint tests."""
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.metrics import Histogram, Registry
+
+
+@pytest.fixture
+async def client():
+    """Create test client."""
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+class TestHistogram:
+    """Histogram rendering tests."""
+
+    def test_buckets_are_cumulative(self):
+        """Test bucket counts, sum and count in text format."""
+        registry = Registry()
+        histogram = registry.histogram("test_latency_seconds", "Test", ("op",), buckets=(0.1, 1.0))
+        histogram.labels("read").observe(0.05)
+        histogram.labels("read").observe(0.5)
+        histogram.labels("read").observe(5)
+
+        text = registry.render()
+        assert '# TYPE test_latency_seconds histogram' in text
+        assert 'test_latency_seconds_bucket{op="read",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{op="read",le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{op="read",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{op="read"} 3' in text
+
+    def test_label_count_mismatch(self):
+        """Test that wrong label arity is rejected."""
+        histogram = Histogram("test_other_seconds", "Test", ("op",))
+        with pytest.raises(ValueError):
+            histogram.labels("a", "b")
+
+
+class TestMetricsEndpoint:
+    """Metrics endpoint tests."""
+
+    async def test_metrics_by_route_template(self, client):
+        """Test request latency is labelled by route template, not raw path."""
+        await client.get("/snippets/99999")
+
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        text = response.text
+        assert 'route="/snippets/{snippet_id}",status="404"' in text
+        assert "/snippets/99999" not in text
+        assert 'snippetbox_db_operation_duration_seconds_count{operation="get_snippet"}' in text
+        assert "snippetbox_http_requests_in_flight" in text
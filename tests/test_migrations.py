@@ -0,0 +1,90 @@
+"""Migration runner tests."""
+import asyncio
+import sqlite3
+import pytest
+from src.migrations import (
+    MIGRATIONS_DIR, MigrationError, run_migrations, run_backfills, split_statements
+)
+
+
+BACKFILL_SOURCE = '''
+BATCH_DELAY = 0
+
+
+async def backfill(conn):
+    cursor = await conn.execute(
+        "UPDATE items SET doubled = value * 2 WHERE id IN "
+        "(SELECT id FROM items WHERE doubled IS NULL LIMIT 2)"
+    )
+    return cursor.rowcount
+'''
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    """A private migrations directory with one schema migration."""
+    directory = tmp_path / "migrations"
+    directory.mkdir()
+    (directory / "0001_items.sql").write_text(
+        "CREATE TABLE items (id INTEGER PRIMARY KEY, value INTEGER, doubled INTEGER);\n"
+        "INSERT INTO items (value) VALUES (1), (2), (3), (4), (5);\n"
+    )
+    return directory
+
+
+class TestMigrations:
+    """Migration runner tests."""
+
+    def test_split_keeps_trigger_bodies(self):
+        """Test that statements inside trigger bodies are not split."""
+        sql = (MIGRATIONS_DIR / "0001_init.sql").read_text()
+        statements = split_statements(sql)
+        triggers = [s for s in statements if "CREATE TRIGGER" in s]
+        assert len(triggers) == 3
+        assert all(s.rstrip().endswith("END;") for s in triggers)
+
+    async def test_fast_path_skips_applied(self, tmp_path):
+        """Test that a migrated database is not migrated again."""
+        db_path = str(tmp_path / "app.db")
+        applied = await run_migrations(db_path)
+        assert "0001_init.sql" in applied
+        assert await run_migrations(db_path) == []
+
+    async def test_concurrent_workers_apply_once(self, tmp_path, migrations_dir):
+        """Test that concurrent runners serialize on the write lock."""
+        db_path = str(tmp_path / "app.db")
+        results = await asyncio.gather(
+            *(run_migrations(db_path, migrations_dir) for _ in range(4))
+        )
+        assert sorted(len(r) for r in results) == [0, 0, 0, 1]
+
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 5
+        conn.close()
+
+    async def test_checksum_mismatch(self, tmp_path, migrations_dir):
+        """Test that editing an applied migration is rejected."""
+        db_path = str(tmp_path / "app.db")
+        await run_migrations(db_path, migrations_dir)
+        (migrations_dir / "0001_items.sql").write_text("CREATE TABLE items (id INTEGER);\n")
+        with pytest.raises(MigrationError):
+            await run_migrations(db_path, migrations_dir)
+
+    async def test_backfill_runs_in_batches(self, tmp_path, migrations_dir):
+        """Test that backfills register on migrate and complete online."""
+        db_path = str(tmp_path / "app.db")
+        (migrations_dir / "0002_double_values.py").write_text(BACKFILL_SOURCE)
+        await run_migrations(db_path, migrations_dir)
+
+        conn = sqlite3.connect(db_path)
+        pending = conn.execute(
+            "SELECT completed_at FROM schema_migrations WHERE version = 2"
+        ).fetchone()
+        assert pending == (None,)
+
+        assert await run_backfills(db_path, migrations_dir) == ["0002_double_values.py"]
+        assert conn.execute("SELECT COUNT(*) FROM items WHERE doubled IS NULL").fetchone()[0] == 0
+        assert conn.execute(
+            "SELECT completed_at FROM schema_migrations WHERE version = 2"
+        ).fetchone()[0] is not None
+        conn.close()
@@ -0,0 +1,110 @@
+"""ETag / If-Match optimistic concurrency tests."""
+import asyncio
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.utils import parse_if_match
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+async def create(client) -> dict:
+    response = await client.post("/snippets", json={
+        "title": f"Versioned {uuid.uuid4()}",
+        "content": "x = 1",
+        "tags": ["occ"]
+    })
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestIfMatchParsing:
+    """If-Match header parsing tests."""
+
+    def test_wildcard_and_absent_are_unconditional(self):
+        """Test that no precondition is derived from * or a missing header."""
+        assert parse_if_match(None, 1) is None
+        assert parse_if_match("*", 1) is None
+
+    def test_picks_tag_for_snippet(self):
+        """Test that the ETag for this snippet is chosen from a list."""
+        assert parse_if_match('"2.7", "1.3"', 1) == 3
+
+    def test_weak_and_foreign_tags_never_match(self):
+        """Test that weak or other-snippet ETags cannot satisfy the check."""
+        assert parse_if_match('W/"1.3"', 1) == 0
+        assert parse_if_match('"2.3"', 1) == 0
+
+
+class TestOptimisticConcurrency:
+    """Conditional update and delete tests."""
+
+    async def test_etag_advances_on_update(self, client):
+        """Test that GET and PATCH expose the current version."""
+        snippet = await create(client)
+        response = await client.get(f"/snippets/{snippet['id']}")
+        etag = response.headers["ETag"]
+        assert etag == f'"{snippet["id"]}.1"'
+
+        response = await client.patch(
+            f"/snippets/{snippet['id']}", json={"title": f"Renamed {uuid.uuid4()}"}, headers={"If-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["ETag"] == f'"{snippet["id"]}.2"'
+
+    async def test_stale_if_match_rejected(self, client):
+        """Test that an outdated ETag returns 412 and leaves the row alone."""
+        snippet = await create(client)
+        etag = f'"{snippet["id"]}.1"'
+        await client.patch(f"/snippets/{snippet['id']}", json={"tags": ["first"]})
+
+        response = await client.patch(
+            f"/snippets/{snippet['id']}", json={"tags": ["second"]}, headers={"If-Match": etag}
+        )
+        assert response.status_code == 412
+        assert response.json()["error_code"] == "PRECONDITION_FAILED"
+
+        response = await client.get(f"/snippets/{snippet['id']}")
+        assert response.json()["tags"] == ["first"]
+
+    async def test_concurrent_updates_single_winner(self, client):
+        """Test that racing updates with the same ETag cannot both apply."""
+        snippet = await create(client)
+        etag = f'"{snippet["id"]}.1"'
+        responses = await asyncio.gather(*(
+            client.patch(
+                f"/snippets/{snippet['id']}", json={"content": f"x = {i}"}, headers={"If-Match": etag}
+            )
+            for i in range(2, 4)
+        ))
+        assert sorted(r.status_code for r in responses) == [200, 412]
+
+    async def test_stale_delete_rejected(self, client):
+        """Test that DELETE honours If-Match."""
+        snippet = await create(client)
+        await client.patch(f"/snippets/{snippet['id']}", json={"title": f"Moved on {uuid.uuid4()}"})
+
+        response = await client.delete(
+            f"/snippets/{snippet['id']}", headers={"If-Match": f'"{snippet["id"]}.1"'}
+        )
+        assert response.status_code == 412
+
+        response = await client.delete(
+            f"/snippets/{snippet['id']}", headers={"If-Match": f'"{snippet["id"]}.2"'}
+        )
+        assert response.status_code == 204
+
+    async def test_missing_snippet_is_not_found(self, client):
+        """Test that a conditional update of a missing snippet stays 404."""
+        response = await client.patch(
+            "/snippets/99999999", json={"title": "Nope"}, headers={"If-Match": '"99999999.1"'}
+        )
+        assert response.status_code == 404
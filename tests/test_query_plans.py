@@ -0,0 +1,128 @@
+"""Query plan tests for the search and retention queries."""
+import sqlite3
+import pytest
+from src.crud import search_queries
+from src.migrations import run_migrations
+
+LISTING_SCAN = "SCAN snippets USING COVERING INDEX idx_snippets_live_listing"
+PK_SEARCH = "SEARCH snippets USING INTEGER PRIMARY KEY (rowid=?)"
+FTS_SCAN = "SCAN snippets_fts VIRTUAL TABLE INDEX 0:M2"
+# (created_after, updated_before) and the listing index step they produce
+RANGES = [
+    ((1704067200000, None), "SEARCH snippets USING COVERING INDEX idx_snippets_live_listing (created_at>?)"),
+    ((None, 1735689600000), LISTING_SCAN),
+    ((1704067200000, 1735689600000),
+     "SEARCH snippets USING COVERING INDEX idx_snippets_live_listing (created_at>?)"),
+]
+
+
+@pytest.fixture
+async def conn(tmp_path):
+    """A connection to a freshly migrated database."""
+    db_path = str(tmp_path / "plans.db")
+    await run_migrations(db_path)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+class TestSearchPlans:
+    """Every search_snippets query shape uses the intended index."""
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    def test_listing_count_is_covering(self, conn, tag):
+        """Test that counting live rows never reads the table."""
+        count_sql, _, params = search_queries(None, tag)
+        assert plan(conn, count_sql, params) == [LISTING_SCAN]
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    def test_listing_page_skips_on_index(self, conn, tag):
+        """Test that paging walks the covering index and fetches by id."""
+        _, select_sql, params = search_queries(None, tag)
+        assert plan(conn, select_sql, params + [20, 40]) == [
+            PK_SEARCH,
+            "LIST SUBQUERY 1",
+            LISTING_SCAN,
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    @pytest.mark.parametrize("bounds, listing", RANGES)
+    def test_time_range_count_is_covering(self, conn, tag, bounds, listing):
+        """Test that created/updated bounds are checked on the covering index."""
+        count_sql, _, params = search_queries(None, tag, *bounds)
+        assert plan(conn, count_sql, params) == [listing]
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    @pytest.mark.parametrize("bounds, listing", RANGES)
+    def test_time_range_page_skips_on_index(self, conn, tag, bounds, listing):
+        """Test that paging with time bounds still walks the covering index."""
+        _, select_sql, params = search_queries(None, tag, *bounds)
+        assert plan(conn, select_sql, params + [20, 40]) == [
+            PK_SEARCH,
+            "LIST SUBQUERY 1",
+            listing,
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    def test_fulltext_count_probes_primary_key(self, conn, tag):
+        """Test that FTS matches drive the lookup, not a table scan."""
+        count_sql, _, params = search_queries("hello", tag)
+        assert plan(conn, count_sql, params) == [PK_SEARCH, "LIST SUBQUERY 1", FTS_SCAN]
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    def test_fulltext_page_probes_primary_key(self, conn, tag):
+        """Test that FTS paging only sorts matched rows."""
+        _, select_sql, params = search_queries("hello", tag)
+        steps = plan(conn, select_sql, params + [20, 0])
+        assert steps.count(PK_SEARCH) == 2
+        assert FTS_SCAN in steps
+        assert "SCAN snippets" not in steps
+
+    @pytest.mark.parametrize("tag", [None, "python"])
+    @pytest.mark.parametrize("bounds, _", RANGES)
+    def test_fulltext_time_range_probes_primary_key(self, conn, tag, bounds, _):
+        """Test that time bounds on an FTS search are checked on matched rows only."""
+        count_sql, select_sql, params = search_queries("hello", tag, *bounds)
+        assert plan(conn, count_sql, params) == [PK_SEARCH, "LIST SUBQUERY 1", FTS_SCAN]
+        steps = plan(conn, select_sql, params + [20, 0])
+        assert steps.count(PK_SEARCH) == 2
+        assert FTS_SCAN in steps
+        assert "SCAN snippets" not in steps
+
+
+class TestIndexes:
+    """Index set and non-search lookups."""
+
+    def test_redundant_indexes_removed(self, conn):
+        """Test that only the intended secondary indexes exist."""
+        names = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'snippets'"
+                " AND name NOT LIKE 'sqlite_autoindex%'"
+            )
+        }
+        assert names == {"idx_snippets_live_listing", "idx_snippets_deleted_at"}
+
+    def test_content_hash_uses_unique_index(self, conn):
+        """Test that duplicate lookups use the UNIQUE constraint's index."""
+        steps = plan(conn, "SELECT * FROM snippets WHERE content_hash = ? AND deleted_at IS NULL", ["x"])
+        assert steps == ["SEARCH snippets USING INDEX sqlite_autoindex_snippets_1 (content_hash=?)"]
+
+    def test_retention_uses_deleted_index(self, conn):
+        """Test that the retention job only touches deleted rows."""
+        steps = plan(
+            conn,
+            """SELECT id FROM snippets
+               WHERE deleted_at IS NOT NULL AND deleted_at <= ?
+               ORDER BY deleted_at LIMIT ?""",
+            [1735689600000, 10]
+        )
+        assert steps == [
+            "SEARCH snippets USING COVERING INDEX idx_snippets_deleted_at (deleted_at>? AND deleted_at<?)"
+        ]
@@ -0,0 +1,127 @@
+"""Raw content endpoint tests."""
+import sqlite3
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.database import get_db_path
+from src.raw_content import open_content, parse_range, ContentChanged, RangeNotSatisfiable
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "RAW_CHUNK_BYTES", 1000)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+async def create(client, content: str) -> int:
+    response = await client.post("/snippets", json={"title": f"Raw {uuid.uuid4()}", "content": content})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+CONTENT = "".join(f"line {n} → ü\n" for n in range(2000))
+
+
+class TestRawContent:
+    """GET /snippets/{id}/raw tests."""
+
+    async def test_full_body(self, client):
+        """Test that the whole content is returned as UTF-8 text with its ETag."""
+        snippet_id = await create(client, CONTENT)
+        response = await client.get(f"/snippets/{snippet_id}/raw")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/plain; charset=utf-8"
+        assert response.headers["content-length"] == str(len(CONTENT.encode()))
+        assert response.headers["etag"] == f'"{snippet_id}.1"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.text == CONTENT
+
+    async def test_byte_ranges(self, client):
+        """Test explicit, open-ended and suffix ranges."""
+        snippet_id = await create(client, CONTENT)
+        raw = CONTENT.encode()
+        size = len(raw)
+        for header, expected in (
+            ("bytes=10-1509", raw[10:1510]),
+            (f"bytes={size - 5}-", raw[-5:]),
+            ("bytes=-7", raw[-7:]),
+            (f"bytes=0-{size * 2}", raw),
+        ):
+            response = await client.get(f"/snippets/{snippet_id}/raw", headers={"Range": header})
+            assert response.status_code == 206
+            assert response.content == expected
+            assert response.headers["content-length"] == str(len(expected))
+            assert response.headers["content-range"].endswith(f"/{size}")
+
+        response = await client.get(f"/snippets/{snippet_id}/raw", headers={"Range": f"bytes={size}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{size}"
+
+    async def test_conditional_requests(self, client):
+        """Test If-None-Match and a stale If-Range."""
+        snippet_id = await create(client, "print('raw')\n")
+        etag = (await client.get(f"/snippets/{snippet_id}/raw")).headers["etag"]
+        response = await client.get(f"/snippets/{snippet_id}/raw", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+        await client.patch(f"/snippets/{snippet_id}", json={"content": "print('changed')\n"})
+        response = await client.get(
+            f"/snippets/{snippet_id}/raw", headers={"Range": "bytes=0-4", "If-Range": etag}
+        )
+        assert response.status_code == 200
+        assert response.text == "print('changed')\n"
+
+    async def test_missing_snippet(self, client):
+        """Test 404 for unknown and deleted snippets."""
+        snippet_id = await create(client, "x = 1")
+        await client.delete(f"/snippets/{snippet_id}")
+        assert (await client.get(f"/snippets/{snippet_id}/raw")).status_code == 404
+        assert (await client.get("/snippets/99999999/raw")).status_code == 404
+
+
+class TestParseRange:
+    """Range header parsing tests."""
+
+    def test_ignored_headers(self):
+        """Test that other units and multiple ranges fall back to the full body."""
+        assert parse_range(None, 10) is None
+        assert parse_range("items=0-1", 10) is None
+        assert parse_range("bytes=0-1,4-5", 10) is None
+        assert parse_range("bytes=5-2", 10) is None
+
+    def test_unsatisfiable(self):
+        """Test that a start past the end is rejected."""
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=10-", 10)
+
+
+class TestStreamingLocks:
+    """Locking behaviour of an open stream."""
+
+    async def test_writes_proceed_while_stream_is_open(self, client):
+        """Test that an unfinished download does not block writes, and sees a concurrent change."""
+        snippet_id = await create(client, CONTENT)
+        other_id = await create(client, "x = 1")
+        reader = await open_content(snippet_id)
+        try:
+            chunks = reader.iter_range(0, reader.size - 1)
+            first = await chunks.__anext__()
+            assert first == CONTENT.encode()[:1000]
+
+            conn = sqlite3.connect(get_db_path(), timeout=0.1)
+            conn.execute("UPDATE snippets SET tags = '[\"w\"]' WHERE id = ?", (other_id,))
+            conn.commit()
+            conn.close()
+            assert (await chunks.__anext__()) == CONTENT.encode()[1000:2000]
+
+            response = await client.patch(f"/snippets/{snippet_id}", json={"content": "changed"})
+            assert response.status_code == 200
+            with pytest.raises(ContentChanged):
+                await chunks.__anext__()
+        finally:
+            reader.close()
@@ -0,0 +1,129 @@
+"""Syntax-highlighted rendering tests."""
+import asyncio
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src import render
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    """Fresh render cache in a temporary directory, counting pool renders."""
+    fresh = render.RenderCache(1024 * 1024, str(tmp_path), 1024 * 1024)
+    monkeypatch.setattr(render, "render_cache", fresh)
+    fresh.renders = 0
+    original = render.run_in_pool
+
+    async def counting(content, language):
+        fresh.renders += 1
+        return await original(content, language)
+
+    monkeypatch.setattr(render, "run_in_pool", counting)
+    return fresh
+
+
+async def create(client, tags) -> int:
+    content = f"def f():\n    return '{uuid.uuid4()}'\n"
+    response = await client.post("/snippets", json={"title": "Render", "content": content, "tags": tags})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+class TestRendered:
+    """GET /snippets/{id}/rendered tests."""
+
+    async def test_highlights_with_tag_language(self, client, cache):
+        """Test that a language tag picks the lexer and the HTML is cached per content hash."""
+        snippet_id = await create(client, ["Python", "demo"])
+        response = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert response.headers["x-snippet-language"] == "python"
+        assert response.headers["etag"].endswith('.python"')
+        assert 'class="highlight"' in response.text
+        assert '<span class="k">def</span>' in response.text
+
+        again = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert again.content == response.content
+        assert cache.renders == 1
+
+        not_modified = await client.get(
+            f"/snippets/{snippet_id}/rendered", headers={"If-None-Match": response.headers["etag"]}
+        )
+        assert not_modified.status_code == 304
+
+    async def test_disk_tier_survives_restart(self, client, cache, monkeypatch):
+        """Test that a new cache over the same directory serves renders from disk."""
+        snippet_id = await create(client, ["python"])
+        first = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert cache.renders == 1
+
+        restarted = render.RenderCache(1024 * 1024, str(cache.directory), 1024 * 1024)
+        restarted.renders = 0
+        monkeypatch.setattr(render, "render_cache", restarted)
+        second = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert second.content == first.content
+        assert second.headers["x-snippet-language"] == "python"
+        assert cache.renders == 1
+        assert restarted.size > 0
+
+    async def test_concurrent_misses_share_one_render(self, client, cache):
+        """Test that simultaneous requests for a cold key render it once."""
+        snippet_id = await create(client, [])
+        responses = await asyncio.gather(*(
+            client.get(f"/snippets/{snippet_id}/rendered") for _ in range(5)
+        ))
+        assert {r.status_code for r in responses} == {200}
+        assert len({r.content for r in responses}) == 1
+        assert cache.renders == 1
+
+    async def test_caches_are_bounded(self, client, cache):
+        """Test that both tiers evict least recently used renders."""
+        cache.max_bytes = 1
+        cache.disk_max_bytes = 1
+        for _ in range(3):
+            snippet_id = await create(client, ["python"])
+            assert (await client.get(f"/snippets/{snippet_id}/rendered")).status_code == 200
+        assert cache.size <= 1
+        assert cache.disk_size <= 1
+        assert list(cache.directory.glob("*/*.html")) == []
+
+    async def test_disabled(self, client, cache, monkeypatch):
+        """Test that the endpoint is 404 when rendering is disabled, and for missing snippets."""
+        assert (await client.get("/snippets/999999999/rendered")).status_code == 404
+        snippet_id = await create(client, [])
+        monkeypatch.setattr(settings, "RENDER_ENABLED", False)
+        response = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert response.status_code == 404
+        assert cache.renders == 0
+
+    async def test_title_changes_keep_the_render(self, client, cache):
+        """Test that renaming a snippet or reposting its code under another title reuses the render."""
+        snippet_id = await create(client, ["python"])
+        first = await client.get(f"/snippets/{snippet_id}/rendered")
+        content = (await client.get(f"/snippets/{snippet_id}")).json()["content"]
+
+        await client.patch(f"/snippets/{snippet_id}", json={"title": f"Renamed {uuid.uuid4()}"})
+        renamed = await client.get(f"/snippets/{snippet_id}/rendered")
+        assert renamed.headers["etag"] == first.headers["etag"]
+
+        copy = await client.post("/snippets", json={"title": "Copy", "content": content, "tags": ["python"]})
+        copied = await client.get(f"/snippets/{copy.json()['id']}/rendered")
+        assert copied.headers["etag"] == first.headers["etag"]
+        assert cache.renders == 1
+
+
+def test_language_hint():
+    """Test that tags resolve to canonical lexer aliases and unknown tags fall back to auto."""
+    assert render.language_hint(["tutorial", "JS"]) == "javascript"
+    assert render.language_hint(["tutorial"]) == render.AUTO
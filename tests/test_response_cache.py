@@ -0,0 +1,109 @@
+"""Rendered response cache tests."""
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.response_cache import ResponseCache, response_cache, preferred_encoding, GZIP, IDENTITY
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+async def create(client, content: str = "cached = True") -> int:
+    response = await client.post("/snippets", json={
+        "title": f"Cache {uuid.uuid4()}", "content": content, "tags": ["cache"]
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+class TestCachedGet:
+    """GET /snippets/{id} caching tests."""
+
+    async def test_hit_serves_same_bytes(self, client):
+        """Test that a second read is served from the cache unchanged."""
+        snippet_id = await create(client)
+        first = await client.get(f"/snippets/{snippet_id}")
+        assert response_cache.get(snippet_id) is not None
+        second = await client.get(f"/snippets/{snippet_id}")
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert first.headers["etag"] == second.headers["etag"] == f'"{snippet_id}.1"'
+        assert second.json()["tags"] == ["cache"]
+
+    async def test_gzip_for_large_bodies(self, client):
+        """Test that large bodies are sent gzipped when the client accepts it."""
+        snippet_id = await create(client, "x = 1\n" * 1000)
+        plain = await client.get(f"/snippets/{snippet_id}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+
+        response = await client.get(f"/snippets/{snippet_id}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        # httpx decodes the body; the wire size is in Content-Length
+        assert int(response.headers["content-length"]) < len(plain.content)
+        assert response.json() == plain.json()
+
+    async def test_small_bodies_stay_uncompressed(self, client):
+        """Test that small bodies are not compressed."""
+        snippet_id = await create(client)
+        response = await client.get(f"/snippets/{snippet_id}", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+    async def test_if_none_match(self, client):
+        """Test that a matching ETag gets 304 without a body."""
+        snippet_id = await create(client)
+        etag = (await client.get(f"/snippets/{snippet_id}")).headers["etag"]
+        response = await client.get(f"/snippets/{snippet_id}", headers={"If-None-Match": f"W/{etag}"})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    async def test_update_invalidates(self, client):
+        """Test that a write replaces the cached body and ETag."""
+        snippet_id = await create(client)
+        etag = (await client.get(f"/snippets/{snippet_id}")).headers["etag"]
+        await client.patch(f"/snippets/{snippet_id}", json={"tags": ["changed"]})
+
+        response = await client.get(f"/snippets/{snippet_id}", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["tags"] == ["changed"]
+        assert response.headers["etag"] == f'"{snippet_id}.2"'
+
+        await client.delete(f"/snippets/{snippet_id}")
+        assert (await client.get(f"/snippets/{snippet_id}")).status_code == 404
+
+
+class TestResponseCache:
+    """ResponseCache unit tests."""
+
+    def test_stale_render_is_rejected(self):
+        """Test that a render racing with a write is not cached."""
+        cache = ResponseCache(1024)
+        generation = cache.generation
+        cache.invalidate(1)
+        cache.put(1, 1, '"1.1"', b"{}", generation)
+        assert cache.get(1) is None
+        cache.put(1, 2, '"1.2"', b"{}", cache.generation)
+        assert cache.get(1).version == 2
+
+    def test_evicts_least_recently_used(self):
+        """Test that the byte budget evicts the oldest entries."""
+        cache = ResponseCache(100)
+        for snippet_id in range(1, 4):
+            cache.put(snippet_id, 1, "", b"x" * 40, cache.generation)
+        assert cache.get(1) is None
+        assert cache.get(2) is not None and cache.get(3) is not None
+        assert cache.size == 80
+
+    def test_preferred_encoding(self):
+        """Test Accept-Encoding negotiation."""
+        assert preferred_encoding("gzip, deflate, br") == GZIP
+        assert preferred_encoding("gzip;q=0, br") == IDENTITY
+        assert preferred_encoding(None) == IDENTITY
@@ -0,0 +1,95 @@
+"""Retention job tests."""
+import json
+import sqlite3
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.migrations import run_migrations
+from src.retention import run_retention
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMIN_ENABLED", True)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def db_path(tmp_path, monkeypatch):
+    """A migrated database with live, recently deleted and old deleted rows."""
+    path = str(tmp_path / "retention.db")
+    await run_migrations(path)
+    monkeypatch.setattr(settings, "RETENTION_BATCH_SIZE", 7)
+    monkeypatch.setattr(settings, "RETENTION_BATCH_DELAY", 0)
+
+    conn = sqlite3.connect(path)
+    padding = "x" * 4000
+    for i in range(60):
+        deleted_at = None
+        if i % 3 == 1:
+            deleted_at = 946684800000
+        elif i % 3 == 2:
+            deleted_at = 32472144000000
+        conn.execute(
+            """INSERT INTO snippets (title, content, tags, content_hash, deleted_at)
+               VALUES (?, ?, '[]', ?, ?)""",
+            (f"title {i}", f"needle {i} {padding}", f"hash-{i}", deleted_at)
+        )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count(path: str, sql: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestRetention:
+    """Retention job tests."""
+
+    async def test_purges_old_deleted_rows_into_archive(self, db_path):
+        """Test that only rows deleted before the cutoff are moved."""
+        report = await run_retention(db_path)
+        assert report["purged"] == 20
+        assert count(db_path, "SELECT COUNT(*) FROM snippets") == 40
+        assert count(db_path, "SELECT COUNT(*) FROM snippets_archive") == 20
+        assert count(db_path, "SELECT COUNT(*) FROM snippets_archive WHERE deleted_at > 978307200000") == 0
+        # FTS no longer returns purged rows
+        assert count(
+            db_path, "SELECT COUNT(*) FROM snippets_fts WHERE snippets_fts MATCH 'needle'"
+        ) == 40
+
+    async def test_incremental_vacuum_reclaims_space(self, db_path):
+        """Test that a new database shrinks after a purge."""
+        assert count(db_path, "PRAGMA auto_vacuum") == 2
+        report = await run_retention(db_path)
+        assert report["auto_vacuum"] == "incremental"
+        assert report["reclaimed_bytes"] > 0
+        assert report["free_bytes"] == 0
+
+    async def test_file_archive(self, db_path, tmp_path, monkeypatch):
+        """Test that rows can be archived to a JSON lines file instead."""
+        archive = tmp_path / "archive" / "snippets.jsonl"
+        monkeypatch.setattr(settings, "RETENTION_ARCHIVE", "file")
+        monkeypatch.setattr(settings, "RETENTION_ARCHIVE_PATH", str(archive))
+        await run_retention(db_path)
+        rows = [json.loads(line) for line in archive.read_text().splitlines()]
+        assert len(rows) == 20
+        assert rows[0]["deleted_at"] == 946684800000
+        assert count(db_path, "SELECT COUNT(*) FROM snippets_archive") == 0
+
+    async def test_admin_endpoint_reports(self, client):
+        """Test that the job can be triggered through the admin API."""
+        response = await client.post("/admin/retention/run")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["archive"] == "table"
+        assert "reclaimed_bytes" in data
@@ -0,0 +1,113 @@
+"""Batched search endpoint tests."""
+import uuid
+from datetime import datetime
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src import querylog
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def tagged(client):
+    """Three snippets sharing a fresh tag."""
+    tag = f"batch{uuid.uuid4().hex[:8]}"
+    for n in range(3):
+        response = await client.post("/snippets", json={
+            "title": f"Batch {n} {uuid.uuid4()}",
+            "content": f"print({n})",
+            "tags": [tag]
+        })
+        assert response.status_code == 201
+    return tag
+
+
+class TestBatchSearch:
+    """POST /snippets/search/batch tests."""
+
+    async def test_results_match_individual_searches(self, client, tagged):
+        """Test that each result equals the matching GET /snippets, in request order."""
+        searches = [
+            {"tag": tagged, "page": 2, "page_size": 2},
+            {"tag": tagged},
+            {"tag": "no-such-tag-for-batch"},
+            {"query": "print", "tag": tagged, "page_size": 1},
+        ]
+        response = await client.post("/snippets/search/batch", json={"searches": searches})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert len(results) == len(searches)
+        for spec, result in zip(searches, results):
+            single = await client.get("/snippets", params=spec)
+            assert result == single.json()
+        assert results[1]["total"] == 3
+        assert len(results[0]["items"]) == 1
+        assert results[2]["items"] == []
+
+    async def test_time_range_filters_match_listing(self, client, tagged):
+        """Test that created_after/updated_before filter batch searches like GET /snippets."""
+        listing = (await client.get("/snippets", params={"tag": tagged})).json()["items"]
+        middle = listing[1]["created_at"]
+        searches = [
+            {"tag": tagged, "created_after": middle},
+            {"tag": tagged, "updated_before": middle},
+            {"tag": tagged, "created_after": "2000-01-01T00:00:00Z", "updated_before": "2999-01-01T00:00:00Z"},
+        ]
+        response = await client.post("/snippets/search/batch", json={"searches": searches})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        for spec, result in zip(searches, results):
+            single = await client.get("/snippets", params=spec)
+            assert result == single.json()
+        at = datetime.fromisoformat
+        assert results[0]["total"] == sum(at(s["created_at"]) > at(middle) for s in listing)
+        assert results[1]["total"] == sum(at(s["updated_at"]) < at(middle) for s in listing)
+        assert results[2]["total"] == 3
+
+    async def test_duplicates_and_pages_share_queries(self, client, tagged, monkeypatch):
+        """Test that identical searches run once and pages of one filter share a count."""
+        statements = []
+        original = querylog.fetchall
+
+        async def recording(conn, sql, params=()):
+            statements.append(sql)
+            return await original(conn, sql, params)
+
+        monkeypatch.setattr(querylog, "fetchall", recording)
+        searches = [
+            {"tag": tagged, "page_size": 1},
+            {"tag": tagged, "page_size": 1},
+            {"tag": tagged, "page": 2, "page_size": 1},
+        ]
+        response = await client.post("/snippets/search/batch", json={"searches": searches})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0] == results[1]
+        assert results[0]["items"] != results[2]["items"]
+        assert len(statements) == 2
+
+    async def test_search_count_limit(self, client):
+        """Test that empty and oversized batches are rejected."""
+        response = await client.post("/snippets/search/batch", json={"searches": []})
+        assert response.status_code == 422
+        searches = [{"query": "x"}] * (settings.MAX_BATCH_SEARCHES + 1)
+        response = await client.post("/snippets/search/batch", json={"searches": searches})
+        assert response.status_code == 422
+        response = await client.post("/snippets/search/batch", json={"searches": [{"page_size": 101}]})
+        assert response.status_code == 422
+
+    async def test_not_rate_limited(self, client, monkeypatch):
+        """Test that batch searches do not use up the write rate limit."""
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+        monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 1)
+        for _ in range(3):
+            response = await client.post("/snippets/search/batch", json={"searches": [{"query": "x"}]})
+            assert response.status_code == 200
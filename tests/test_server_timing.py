@@ -0,0 +1,98 @@
+"""Server-Timing span tests."""
+import logging
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src import timing
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+def parse(header: str) -> dict:
+    """Server-Timing header as {name: (desc, milliseconds)}."""
+    entries = {}
+    for entry in header.split(", "):
+        name, desc, dur = entry.split(";")
+        entries[name] = (desc[len('desc="'):-1], float(dur[len("dur="):]))
+    return entries
+
+
+async def create(client) -> int:
+    response = await client.post("/snippets", json={
+        "title": f"Timing {uuid.uuid4()}", "content": "print(1)", "tags": ["a", "b"]
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+class TestServerTiming:
+    """Server-Timing header and access log tests."""
+
+    async def test_disabled_by_default(self, client):
+        """Test that no header is sent and no spans are collected when disabled."""
+        response = await client.get("/health")
+        assert "server-timing" not in response.headers
+        assert timing.current() is None
+
+    async def test_read_breakdown(self, client, monkeypatch):
+        """Test that a database read reports middleware, route, database and SQL spans."""
+        monkeypatch.setattr(settings, "SERVER_TIMING_HEADER", True)
+        monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", False)
+        snippet_id = await create(client)
+        response = await client.get(f"/snippets/{snippet_id}")
+        assert response.status_code == 200
+        spans = parse(response.headers["server-timing"])
+        for name in ("total", "mw", "queue", "app", "fastapi", "handler", "db", "conn", "sql", "tags", "serialize"):
+            assert name in spans, name
+        assert spans["total"][0] == "Total"
+        assert spans["total"][1] >= spans["app"][1] >= spans["handler"][1] >= spans["db"][1]
+        assert spans["db"][1] >= spans["conn"][1]
+
+    async def test_write_spans(self, client, monkeypatch):
+        """Test that writes include rate limiting and count repeated SQL statements."""
+        monkeypatch.setattr(settings, "SERVER_TIMING_HEADER", True)
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+        monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 100000)
+        response = await client.post("/snippets", json={"title": f"Timing {uuid.uuid4()}", "content": "x"})
+        assert response.status_code == 201
+        spans = parse(response.headers["server-timing"])
+        assert "ratelimit" in spans
+        assert spans["sql"][0].startswith("SQL x")
+
+    async def test_access_log(self, client, monkeypatch, caplog):
+        """Test that the completion log carries the spans without the header."""
+        monkeypatch.setattr(settings, "SERVER_TIMING_LOG", True)
+        with caplog.at_level(logging.INFO, logger="snippetbox"):
+            response = await client.get("/snippets", params={"page_size": 1})
+        assert "server-timing" not in response.headers
+        completed = [r for r in caplog.records if r.getMessage() == "Request completed"]
+        assert completed
+        timings = completed[-1].timings
+        assert {"total", "app", "handler", "db", "sql"} <= set(timings)
+
+
+def test_nested_spans_count_once():
+    """Test that a span nested in one of the same name is not added twice."""
+    timings = timing.Timings()
+    token = timing.timings_var.set(timings)
+    try:
+        with timing.span("db"):
+            with timing.span("db"):
+                pass
+            with timing.span("sql"):
+                pass
+        timing.record("sql", 0.5)
+    finally:
+        timing.timings_var.reset(token)
+    assert timings.spans["db"][1] == 1
+    assert timings.spans["sql"][1] == 2
+    assert timings.seconds("sql") >= 0.5
+    assert timing.span("db") is timing.span("sql")
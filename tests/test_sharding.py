@@ -0,0 +1,166 @@
+"""Sharded storage tests."""
+import logging
+import sqlite3
+import uuid
+import pytest
+from httpx import AsyncClient
+from src import crud
+from src.main import app, warm_indexes
+from src.config import settings
+from src.database import init_db, shard_paths, shard_of, shard_for_hash
+from src.dedup import content_hash_index
+from src.response_cache import response_cache
+from src.utils import compute_content_hash
+
+SHARDS = 3
+
+
+@pytest.fixture
+async def client(monkeypatch, tmp_path):
+    """Create test client over a fresh three-shard database."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{tmp_path / 'sharded.db'}")
+    monkeypatch.setattr(settings, "SHARD_COUNT", SHARDS)
+    await init_db()
+    # Ids restart in the new files, so drop entries cached from other databases
+    response_cache.clear()
+    content_hash_index.clear()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+    response_cache.clear()
+    content_hash_index.clear()
+
+
+async def create_many(client, count: int, tag: str):
+    ids = []
+    for n in range(count):
+        response = await client.post("/snippets", json={
+            "title": f"Shard {n} {uuid.uuid4()}", "content": f"value = {n}", "tags": [tag]
+        })
+        assert response.status_code == 201
+        ids.append(response.json()["id"])
+    return ids
+
+
+class TestSharding:
+    """Sharded mode tests."""
+
+    async def test_ids_resolve_to_their_shard(self, client):
+        """Test that ids are unique and each row lives only in the shard its id names."""
+        ids = await create_many(client, 12, "route")
+        assert len(set(ids)) == len(ids)
+
+        paths = shard_paths()
+        assert len(paths) == SHARDS
+        for snippet_id in ids:
+            for n, path in enumerate(paths):
+                conn = sqlite3.connect(path)
+                found = conn.execute("SELECT 1 FROM snippets WHERE id = ?", (snippet_id,)).fetchone()
+                conn.close()
+                assert (found is not None) == (n == shard_of(snippet_id))
+        # Content hashing spreads writes over more than one file
+        assert len({shard_of(snippet_id) for snippet_id in ids}) > 1
+
+    async def test_point_operations(self, client):
+        """Test that get, update, delete and idempotent create route by id."""
+        body = {"title": f"Point {uuid.uuid4()}", "content": "print(1)"}
+        snippet_id = (await client.post("/snippets", json=body)).json()["id"]
+        assert (await client.post("/snippets", json=body)).json()["id"] == snippet_id
+
+        response = await client.patch(f"/snippets/{snippet_id}", json={"tags": ["moved"]})
+        assert response.status_code == 200
+        assert (await client.get(f"/snippets/{snippet_id}")).json()["tags"] == ["moved"]
+        assert (await client.delete(f"/snippets/{snippet_id}")).status_code == 204
+        assert (await client.get(f"/snippets/{snippet_id}")).status_code == 404
+
+    async def test_batch_get_reads_every_shard(self, client):
+        """Test that a batched get collects ids from several shards in request order."""
+        ids = await create_many(client, 9, "batch-get")
+        assert len({shard_of(i) for i in ids}) > 1
+        wanted = list(reversed(ids))
+        response = await client.get("/snippets/batch", params={"ids": wanted})
+        assert response.status_code == 200
+        assert [s["id"] for s in response.json()["items"]] == wanted
+
+    async def test_search_pages_merge_in_global_order(self, client):
+        """Test that fanned-out pages are ordered, complete and non-overlapping."""
+        tag = f"merge{uuid.uuid4().hex[:8]}"
+        ids = await create_many(client, 8, tag)
+
+        seen = []
+        for page in (1, 2, 3):
+            data = (await client.get("/snippets", params={"tag": tag, "page": page, "page_size": 3})).json()
+            assert data["total"] == 8
+            seen.extend(data["items"])
+        assert sorted(item["id"] for item in seen) == sorted(ids)
+        keys = [(item["created_at"], item["id"]) for item in seen]
+        assert keys == sorted(keys, reverse=True)
+
+    async def test_tag_counts_are_summed(self, client):
+        """Test that the tag catalog adds up counts from every shard."""
+        tag = f"sum{uuid.uuid4().hex[:8]}"
+        await create_many(client, 6, tag)
+
+        items = (await client.get("/tags", params={"prefix": tag})).json()["items"]
+        assert items == [{"tag": tag, "count": 6}]
+
+    async def test_change_feed_per_shard(self, client):
+        """Test that each shard's feed only carries its own snippets."""
+        ids = await create_many(client, 6, "feed")
+        for shard in range(SHARDS):
+            data = (await client.get("/changes", params={"since": 0, "shard": shard})).json()
+            assert {c["id"] for c in data["changes"]} == {i for i in ids if shard_of(i) == shard}
+
+        response = await client.get("/changes", params={"shard": SHARDS})
+        assert response.status_code == 400
+        assert response.json()["error_code"] == "INVALID_SHARD"
+
+    async def test_dedup_across_shards_after_update(self, client):
+        """Test that content moved into another hash's shard by an update dedups via the index."""
+        title = f"Moved {uuid.uuid4()}"
+        snippet_id = (await client.post("/snippets", json={"title": title, "content": "before"})).json()["id"]
+        # Content whose hash names a different shard than the row's id
+        content = next(
+            f"after {n}" for n in range(100)
+            if shard_for_hash(compute_content_hash(title, f"after {n}")) != shard_of(snippet_id)
+        )
+        response = await client.patch(f"/snippets/{snippet_id}", json={"content": content})
+        assert response.status_code == 200
+
+        for warmed in (False, True):
+            if warmed:
+                # As another worker would see it after its start-up warm-up
+                content_hash_index.clear()
+                await warm_indexes()
+            response = await client.post("/snippets", json={"title": title, "content": content})
+            assert response.json()["id"] == snippet_id
+
+        other = next(
+            n for n in range(100)
+            if shard_for_hash(compute_content_hash(f"Other {n} {title}", "x")) != shard_of(snippet_id)
+        )
+        other_id = (await client.post("/snippets", json={"title": f"Other {other} {title}", "content": "x"})).json()["id"]
+        response = await client.patch(f"/snippets/{other_id}", json={"title": title, "content": content})
+        assert response.status_code == 409
+        assert response.json()["error_code"] == "DUPLICATE_CONTENT"
+
+    async def test_create_opens_one_shard(self, client, monkeypatch):
+        """Test that a create missing the hash index only touches its hash's shard."""
+        opened = []
+        connect = crud._connect
+        monkeypatch.setattr(crud, "_connect", lambda path: opened.append(path) or connect(path))
+
+        title, content = f"Single {uuid.uuid4()}", "x = 1"
+        response = await client.post("/snippets", json={"title": title, "content": content})
+        assert response.status_code == 201
+        assert opened == [shard_paths()[shard_for_hash(compute_content_hash(title, content))]]
+
+    async def test_warm_up_counts_every_shard(self, client, caplog):
+        """Test that the warm-up log sums the rows loaded from all shards."""
+        ids = await create_many(client, 6, "warm")
+        assert len({shard_of(i) for i in ids}) > 1
+        content_hash_index.clear()
+        with caplog.at_level(logging.INFO, logger="snippetbox"):
+            await warm_indexes()
+        record = next(r for r in caplog.records if r.getMessage() == "Content hash index warmed")
+        assert record.entries == len(ids)
@@ -0,0 +1,106 @@
+"""Near-duplicate detection tests."""
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.similarity import band_buckets, compute_signature, estimate
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+def function_source(marker: str, variable: str = "result", indent: str = "    ") -> str:
+    return (
+        f"def total_{marker}(items_{marker}):\n"
+        f"{indent}{variable} = 0\n"
+        f"{indent}for item_{marker} in items_{marker}:\n"
+        f"{indent}{indent}{variable} += item_{marker}.price * item_{marker}.quantity\n"
+        f"{indent}return {variable}\n"
+    )
+
+
+class TestSignatures:
+    """MinHash signature tests."""
+
+    def test_whitespace_does_not_matter(self):
+        """Test that re-indented code has an identical signature."""
+        assert compute_signature(function_source("a")) == compute_signature(function_source("a", indent="  "))
+
+    def test_renamed_variable_stays_similar(self):
+        """Test that a renamed variable keeps the pair above the threshold."""
+        original = compute_signature(function_source("a"))
+        renamed = compute_signature(function_source("a", variable="acc", indent="  "))
+        assert estimate(original, renamed) >= settings.SIMILARITY_THRESHOLD
+        assert set(band_buckets(original)) & set(band_buckets(renamed))
+
+    def test_unrelated_code_is_dissimilar(self):
+        """Test that unrelated snippets score low."""
+        a = compute_signature(function_source("a"))
+        b = compute_signature("import os\nfor name in os.listdir('.'):\n    print(name)\n")
+        assert estimate(a, b) < 0.2
+
+
+class TestSimilarEndpoint:
+    """Similar snippet lookup tests."""
+
+    async def test_similar_lists_near_copies(self, client):
+        """Test that near-copies are found and deleted ones drop out."""
+        marker = uuid.uuid4().hex[:8]
+        ids = []
+        for variable, indent in (("result", "    "), ("acc", "  "), ("total", "\t")):
+            response = await client.post("/snippets", json={
+                "title": f"Total {variable} {marker}",
+                "content": function_source(marker, variable, indent)
+            })
+            ids.append(response.json()["id"])
+        await client.post("/snippets", json={
+            "title": f"Unrelated {marker}", "content": f"print('{marker}')"
+        })
+
+        response = await client.get(f"/snippets/{ids[0]}/similar")
+        assert response.status_code == 200
+        found = [item["id"] for item in response.json()["items"]]
+        assert sorted(found) == sorted(ids[1:])
+
+        await client.delete(f"/snippets/{ids[1]}")
+        response = await client.get(f"/snippets/{ids[0]}/similar")
+        assert [item["id"] for item in response.json()["items"]] == [ids[2]]
+
+    async def test_create_warns_on_near_duplicate(self, client):
+        """Test the opt-in near-duplicate report on create."""
+        marker = uuid.uuid4().hex[:8]
+        response = await client.post("/snippets", json={
+            "title": f"First {marker}", "content": function_source(marker)
+        })
+        first = response.json()["id"]
+        assert "similar" not in response.json()
+
+        response = await client.post("/snippets?check_similar=true", json={
+            "title": f"Second {marker}", "content": function_source(marker, "acc")
+        })
+        assert response.status_code == 201
+        assert [item["id"] for item in response.json()["similar"]] == [first]
+
+    async def test_content_update_reindexes(self, client):
+        """Test that changed content moves the snippet out of old buckets."""
+        marker = uuid.uuid4().hex[:8]
+        a = (await client.post("/snippets", json={
+            "title": f"A {marker}", "content": function_source(marker)
+        })).json()["id"]
+        b = (await client.post("/snippets", json={
+            "title": f"B {marker}", "content": function_source(marker, "acc")
+        })).json()["id"]
+        await client.patch(f"/snippets/{b}", json={"content": f"SELECT '{marker}' FROM dual;"})
+        response = await client.get(f"/snippets/{a}/similar")
+        assert response.json()["items"] == []
+
+    async def test_missing_snippet(self, client):
+        """Test 404 for unknown snippets."""
+        response = await client.get("/snippets/99999999/similar")
+        assert response.status_code == 404
@@ -0,0 +1,77 @@
+"""Slow query log tests."""
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings, Settings
+from src.querylog import normalize_sql, param_shapes, slow_query_log
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client with admin endpoints enabled, without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "ADMIN_ENABLED", True)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def log_every_query(monkeypatch):
+    """Treat every statement as slow."""
+    monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0)
+    slow_query_log.clear()
+    yield
+    slow_query_log.clear()
+
+
+class TestNormalization:
+    """SQL normalization tests."""
+
+    def test_normalize_collapses_whitespace_and_literals(self):
+        """Test that literals and whitespace do not split fingerprints."""
+        sql = "SELECT *  FROM snippets\n WHERE id = 42 AND title = 'x''y'"
+        assert normalize_sql(sql) == "SELECT * FROM snippets WHERE id = ? AND title = ?"
+
+    def test_param_shapes_hide_values(self):
+        """Test that parameter values are not exposed."""
+        assert param_shapes(["secret", 3, None]) == ["str(6)", "int", "NoneType"]
+
+
+class TestSlowQueryLog:
+    """Slow query capture tests."""
+
+    async def test_slow_search_captures_plan_and_trace(self, client, log_every_query):
+        """Test that a slow search is listed with its plan and trace_id."""
+        response = await client.get("/snippets?query=python")
+        assert response.status_code == 200
+        trace_id = response.headers["X-Trace-ID"]
+
+        response = await client.get("/admin/slow-queries")
+        assert response.status_code == 200
+        items = response.json()["items"]
+        search = [i for i in items if "snippets_fts MATCH" in i["sql"]]
+        assert search
+        entry = search[0]
+        assert entry["last_plan"]
+        assert entry["last_trace_id"] == trace_id
+        assert entry["last_param_shapes"][0] == "str(6)"
+
+    async def test_admin_disabled(self, client, monkeypatch):
+        """Test that admin endpoints are hidden when disabled."""
+        monkeypatch.setattr(settings, "ADMIN_ENABLED", False)
+        response = await client.get("/admin/slow-queries")
+        assert response.status_code == 404
+
+    async def test_admin_token_required(self, client, monkeypatch):
+        """Test that a configured ADMIN_TOKEN must be sent as X-Admin-Token."""
+        monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+        for headers in ({}, {"X-Admin-Token": "wrong"}):
+            response = await client.post("/admin/retention/run", headers=headers)
+            assert response.status_code == 401
+            assert response.json()["error_code"] == "UNAUTHORIZED"
+        response = await client.get("/admin/slow-queries", headers={"X-Admin-Token": "s3cret"})
+        assert response.status_code == 200
+
+    def test_disabled_by_default(self):
+        """Test that admin endpoints are off unless configured."""
+        assert Settings.model_fields["ADMIN_ENABLED"].default is False
@@ -0,0 +1,167 @@
+"""Python client tests, over the ASGI app and embedded."""
+import asyncio
+import uuid
+import httpx
+import pytest
+from src.main import app
+from src.config import settings
+from src.client import SnippetBoxClient, EmbeddedClient, SnippetBoxError
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """ASGI transport that remembers the requests it carried."""
+
+    def __init__(self):
+        self.inner = httpx.ASGITransport(app=app)
+        self.requests = []
+
+    async def handle_async_request(self, request):
+        self.requests.append((request.method, request.url.path))
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Recording transport without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    return RecordingTransport()
+
+
+@pytest.fixture
+async def client(transport):
+    """HTTP client talking to the app in-process."""
+    async with SnippetBoxClient("http://test", transport=transport) as c:
+        yield c
+
+
+@pytest.fixture
+async def embedded():
+    """Embedded client on the test database."""
+    async with EmbeddedClient() as c:
+        yield c
+
+
+def unique(prefix: str) -> str:
+    return f"{prefix} {uuid.uuid4()}"
+
+
+class TestSnippetBoxClient:
+    """HTTP client tests."""
+
+    async def test_crud_round_trip_matches_embedded(self, client, embedded):
+        """Test that both modes return the same bodies for every operation."""
+        tag = unique("client").replace(" ", "-")
+        created = await client.create(unique("Client"), "print(1)", [tag])
+        snippet_id = created["id"]
+        assert await client.get(snippet_id) == await embedded.get(snippet_id)
+
+        updated = await client.update(snippet_id, tags=[tag, "extra"], version=1)
+        assert updated["tags"] == [tag, "extra"]
+        assert await embedded.get(snippet_id) == updated
+        assert await client.search(tag=tag) == await embedded.search(tag=tag)
+
+        with pytest.raises(SnippetBoxError) as e:
+            await client.update(snippet_id, title="stale", version=1)
+        assert (e.value.status_code, e.value.error_code) == (412, "PRECONDITION_FAILED")
+
+        assert await client.delete(snippet_id) is True
+        assert await client.get(snippet_id) is None
+        assert await client.delete(snippet_id) is False
+        with pytest.raises(SnippetBoxError) as e:
+            await client.update(snippet_id, title="gone")
+        assert e.value.error_code == "SNIPPET_NOT_FOUND"
+
+    async def test_concurrent_searches_are_batched(self, client, transport):
+        """Test that searches issued together go out as one batch request, in order."""
+        tag = unique("batch").replace(" ", "-")
+        for n in range(3):
+            await client.create(unique(f"Batched {n}"), f"x = {n}", [tag])
+        transport.requests.clear()
+
+        results = await asyncio.gather(
+            client.search(tag=tag),
+            client.search(tag=tag, page_size=1),
+            client.search(tag=tag, page=2, page_size=2),
+        )
+        assert transport.requests == [("POST", "/snippets/search/batch")]
+        assert [r["total"] for r in results] == [3, 3, 3]
+        assert [len(r["items"]) for r in results] == [3, 1, 1]
+        assert results[1]["items"][0] == results[0]["items"][0]
+
+        transport.requests.clear()
+        await client.search(tag=tag)
+        assert transport.requests == [("GET", "/snippets")]
+
+    async def test_concurrent_gets_and_creates_share_requests(self, client, transport):
+        """Test that identical concurrent reads and creates are sent once."""
+        title = unique("Shared")
+        created = await asyncio.gather(*(client.create(title, "shared") for _ in range(4)))
+        assert len({c["id"] for c in created}) == 1
+        snippets = await asyncio.gather(*(client.get(created[0]["id"]) for _ in range(4)))
+        assert all(s == snippets[0] for s in snippets)
+        assert transport.requests.count(("POST", "/snippets")) == 1
+        assert transport.requests.count(("GET", f"/snippets/{created[0]['id']}")) == 1
+
+    async def test_concurrent_gets_are_batched(self, client, transport):
+        """Test that gets for different ids go out as one batch request, missing ids as None."""
+        ids = [(await client.create(unique(f"Get {n}"), unique("get")))["id"] for n in range(3)]
+        await client.delete(ids[2])
+        transport.requests.clear()
+
+        results = await asyncio.gather(
+            client.get(ids[1]), client.get(ids[0]), client.get(ids[2]), client.get(ids[1]), client.get(10 ** 9)
+        )
+        assert transport.requests == [("GET", "/snippets/batch")]
+        assert [r and r["id"] for r in results] == [ids[1], ids[0], None, ids[1], None]
+        assert results[1] == await client.get(ids[0])
+
+    async def test_retries_overload_responses(self):
+        """Test that 503/429 are retried with backoff and surface once retries run out."""
+        calls = []
+
+        async def handler(request):
+            calls.append(request.url.path)
+            if len(calls) <= 2:
+                return httpx.Response(
+                    503 if len(calls) == 1 else 429,
+                    headers={"Retry-After": "0"},
+                    json={"error_code": "SERVICE_OVERLOADED", "message": "busy", "trace_id": "t"},
+                )
+            return httpx.Response(200, json={"id": 1})
+
+        async with SnippetBoxClient("http://test", transport=httpx.MockTransport(handler), backoff=0.001) as c:
+            assert await c.get(1) == {"id": 1}
+        assert len(calls) == 3
+
+        calls.clear()
+        async with SnippetBoxClient(
+            "http://test", transport=httpx.MockTransport(handler), retries=1, backoff=0.001
+        ) as c:
+            with pytest.raises(SnippetBoxError) as e:
+                await c.get(1)
+        assert len(calls) == 2
+        assert (e.value.status_code, e.value.error_code, e.value.trace_id) == (429, "SERVICE_OVERLOADED", "t")
+
+
+class TestEmbeddedClient:
+    """Embedded client tests."""
+
+    async def test_errors_match_http(self, client, embedded):
+        """Test that validation and missing snippets raise the same errors in both modes."""
+        for c in (client, embedded):
+            with pytest.raises(SnippetBoxError) as e:
+                await c.create("", "content")
+            assert (e.value.status_code, e.value.error_code) == (422, "VALIDATION_ERROR")
+            with pytest.raises(SnippetBoxError) as e:
+                await c.search(page_size=1000)
+            assert e.value.status_code == 422
+            assert await c.get(999999999) is None
+            assert await c.delete(999999999) is False
+
+    async def test_create_is_idempotent(self, embedded):
+        """Test that creating the same snippet twice returns the same id."""
+        title = unique("Embedded")
+        first = await embedded.create(title, "body", ["python"])
+        second = await embedded.create(title, "body", ["python"])
+        assert first == second
+        assert (await embedded.get(first["id"]))["tags"] == ["python"]
@@ -0,0 +1,128 @@
+"""Type-ahead suggestion tests."""
+import sqlite3
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.database import shard_path
+from src.suggest import SuggestIndex, suggest_index
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+class TestSuggestIndex:
+    """Prefix index tests."""
+
+    def test_ranks_by_frequency_then_recency(self):
+        """Test that common terms win and ties go to the newest."""
+        index = SuggestIndex(max_snippets=10)
+        index.add(1, "Parse JSON", ["python"])
+        index.add(2, "Print table", ["python", "pandas"])
+        index.add(3, "Pandas pivot", [])
+        texts = [s["text"] for s in index.suggest("p", limit=3)]
+        assert texts == ["python", "Pandas pivot", "pandas"]
+
+    def test_case_insensitive_prefix(self):
+        """Test that matching ignores case but keeps the original text."""
+        index = SuggestIndex(max_snippets=10)
+        index.add(1, "FastAPI Router", ["FastAPI"])
+        assert {s["text"] for s in index.suggest("fasta")} == {"FastAPI Router", "FastAPI"}
+
+    def test_discard_and_update(self):
+        """Test that removed or changed snippets stop contributing terms."""
+        index = SuggestIndex(max_snippets=10)
+        index.add(1, "Old title", ["legacy"])
+        index.add(1, "New title", [])
+        assert index.suggest("old") == []
+        assert index.suggest("legacy") == []
+        index.discard(1)
+        assert len(index) == 0
+
+    def test_memory_bounded_to_newest_snippets(self):
+        """Test that the oldest snippets are evicted past the limit."""
+        index = SuggestIndex(max_snippets=2)
+        for i in range(5):
+            index.add(i, f"Title {i}", [])
+        assert [s["text"] for s in index.suggest("title")] == ["Title 4", "Title 3"]
+        assert len(index) == 2
+
+    def test_ranks_beyond_the_first_terms_alphabetically(self):
+        """Test that a popular term wins even when many rarer terms sort before it."""
+        index = SuggestIndex(max_snippets=2000)
+        for i in range(1500):
+            index.add(i, f"a{i:05d}", [])
+        for i in range(1500, 1550):
+            index.add(i, f"Zebra {i}", ["azure"])
+        assert index.suggest("a", limit=3)[0] == {"text": "azure", "type": "tag", "count": 50}
+        assert index.suggest("azu", limit=1)[0]["text"] == "azure"
+        assert index.suggest("azur", limit=1)[0]["text"] == "azure"
+
+    def test_cached_top_terms_follow_changes(self):
+        """Test that short-prefix results stay right as terms gain and lose snippets."""
+        index = SuggestIndex(max_snippets=200)
+        for i in range(60):
+            index.add(i, f"b{i:03d}", ["beta"] if i < 2 else [])
+        assert index.suggest("b", limit=1)[0]["text"] == "beta"
+
+        index.discard(0)
+        index.discard(1)
+        texts = [s["text"] for s in index.suggest("b", limit=50)]
+        assert "beta" not in texts and len(texts) == 50
+
+        index.add(100, "Gamma", ["bravo"])
+        index.add(101, "Delta", ["bravo"])
+        assert index.suggest("b", limit=1)[0] == {"text": "bravo", "type": "tag", "count": 2}
+        assert index.suggest("br", limit=1)[0]["text"] == "bravo"
+
+
+class TestSuggestEndpoint:
+    """Suggestion endpoint tests."""
+
+    async def test_writes_update_suggestions(self, client):
+        """Test that create, update and delete are reflected immediately."""
+        word = f"zq{uuid.uuid4().hex[:8]}"
+        response = await client.post("/snippets", json={
+            "title": f"{word} helper", "content": "pass", "tags": [f"{word}-tag"]
+        })
+        snippet_id = response.json()["id"]
+
+        response = await client.get("/suggest", params={"prefix": word.upper()})
+        assert response.status_code == 200
+        assert {i["text"] for i in response.json()["items"]} == {f"{word} helper", f"{word}-tag"}
+
+        await client.patch(f"/snippets/{snippet_id}", json={"title": f"{word} renamed"})
+        response = await client.get("/suggest", params={"prefix": word})
+        assert f"{word} renamed" in {i["text"] for i in response.json()["items"]}
+
+        await client.delete(f"/snippets/{snippet_id}")
+        response = await client.get("/suggest", params={"prefix": word})
+        assert response.json()["items"] == []
+
+    async def test_prefix_required(self, client):
+        """Test that an empty prefix is rejected."""
+        response = await client.get("/suggest", params={"prefix": ""})
+        assert response.status_code == 422
+
+    async def test_refresh_follows_other_writers(self, client):
+        """Test that refresh picks up rows changed outside this process."""
+        word = f"zr{uuid.uuid4().hex[:8]}"
+        response = await client.post("/snippets", json={"title": f"{word} local", "content": "pass"})
+        snippet_id = response.json()["id"]
+
+        # Another worker renames, then deletes, the snippet
+        with sqlite3.connect(shard_path(snippet_id)) as conn:
+            conn.execute("UPDATE snippets SET title = ? WHERE id = ?", (f"{word} remote", snippet_id))
+        await suggest_index.refresh(snippet_id)
+        assert [i["text"] for i in suggest_index.suggest(word)] == [f"{word} remote"]
+
+        with sqlite3.connect(shard_path(snippet_id)) as conn:
+            conn.execute("UPDATE snippets SET deleted_at = 1 WHERE id = ?", (snippet_id,))
+        await suggest_index.refresh(snippet_id)
+        assert suggest_index.suggest(word) == []
@@ -0,0 +1,86 @@
+"""Tag catalog tests."""
+import uuid
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+def prefix():
+    """A tag prefix unique to the test."""
+    return f"t{uuid.uuid4().hex[:8]}-"
+
+
+async def create(client, tags) -> int:
+    response = await client.post("/snippets", json={
+        "title": f"Tagged {uuid.uuid4()}",
+        "content": "pass",
+        "tags": tags
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+async def counts(client, prefix) -> dict:
+    response = await client.get("/tags", params={"prefix": prefix})
+    assert response.status_code == 200
+    return {item["tag"]: item["count"] for item in response.json()["items"]}
+
+
+class TestTagCatalog:
+    """Tag count maintenance tests."""
+
+    async def test_counts_follow_writes(self, client, prefix):
+        """Test that create, tag edit and delete keep counts exact."""
+        a, b = f"{prefix}a", f"{prefix}b"
+        first = await create(client, [a, b, a])
+        await create(client, [a])
+        assert await counts(client, prefix) == {a: 2, b: 1}
+
+        await client.patch(f"/snippets/{first}", json={"tags": [b, f"{prefix}c"]})
+        assert await counts(client, prefix) == {a: 1, b: 1, f"{prefix}c": 1}
+
+        await client.patch(f"/snippets/{first}", json={"title": f"Retitled {uuid.uuid4()}"})
+        assert await counts(client, prefix) == {a: 1, b: 1, f"{prefix}c": 1}
+
+        await client.delete(f"/snippets/{first}")
+        assert await counts(client, prefix) == {a: 1}
+
+    async def test_top_n_ordering(self, client, prefix):
+        """Test that the most used tags come first and limit applies."""
+        for tags in ([f"{prefix}x"], [f"{prefix}x", f"{prefix}y"], [f"{prefix}x", f"{prefix}y", f"{prefix}z"]):
+            await create(client, tags)
+        response = await client.get("/tags", params={"prefix": prefix, "limit": 2})
+        assert response.json()["items"] == [
+            {"tag": f"{prefix}x", "count": 3},
+            {"tag": f"{prefix}y", "count": 2},
+        ]
+
+    async def test_unknown_prefix(self, client):
+        """Test that an unmatched prefix returns no tags."""
+        response = await client.get("/tags", params={"prefix": "no-such-tag-prefix"})
+        assert response.status_code == 200
+        assert response.json()["items"] == []
+
+    async def test_prefix_ending_in_highest_code_points(self, client, prefix):
+        """Test that prefixes ending in U+D7FF or U+10FFFF match without a server error."""
+        below, above = f"{prefix}\ud7ff", f"{prefix}\U0010ffff"
+        await create(client, [below, f"{below}x", f"{prefix}", above, f"{above}x"])
+        assert await counts(client, below) == {below: 1, f"{below}x": 1}
+        assert await counts(client, above) == {above: 1, f"{above}x": 1}
+        assert len(await counts(client, prefix)) == 5
+
+    async def test_prefix_of_only_highest_code_points(self, client):
+        """Test that a prefix with no successor string scans to the end of the tags."""
+        tag = f"\U0010ffff{uuid.uuid4().hex[:8]}"
+        await create(client, [tag])
+        assert (await counts(client, "\U0010ffff"))[tag] == 1
@@ -0,0 +1,133 @@
+"""Epoch-millisecond timestamp tests: migration and range filters."""
+import asyncio
+import shutil
+import sqlite3
+import uuid
+from datetime import datetime, timedelta
+import pytest
+from httpx import AsyncClient
+from src.main import app
+from src.config import settings
+from src.migrations import MIGRATIONS_DIR, run_migrations
+from src.utils import epoch_ms, from_epoch_ms
+
+TRIGGERS = {
+    "snippets_ai", "snippets_ad", "snippets_au",
+    "snippets_tags_ai", "snippets_tags_au", "snippets_tags_ad",
+    "snippets_similarity_sd", "snippets_similarity_ad",
+    "snippets_changes_ai", "snippets_changes_au", "snippets_changes_ad",
+}
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    """Create test client without write rate limiting."""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.fixture
+async def legacy_db(tmp_path):
+    """A database on the schema before 0009, with text timestamps."""
+    old = tmp_path / "migrations"
+    old.mkdir()
+    for path in MIGRATIONS_DIR.iterdir():
+        if path.suffix in (".sql", ".py") and path.name < "0009":
+            shutil.copy(path, old / path.name)
+    db_path = str(tmp_path / "legacy.db")
+    await run_migrations(db_path, old)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        """INSERT INTO snippets (title, content, tags, content_hash, created_at, updated_at, deleted_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [
+            ("live", "hello world", '["py"]', "h1", "2024-01-01 00:00:00", "2024-01-02 12:00:00.250", None),
+            ("gone", "bye", '["py"]', "h2", "2024-01-01 00:00:00", "2024-01-01 00:00:00", "2024-02-01 00:00:00"),
+            ("purged", "x", "[]", "h3", "2024-01-01 00:00:00", "2024-01-01 00:00:00", None),
+        ]
+    )
+    conn.execute("DELETE FROM snippets WHERE title = 'purged'")
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+class TestTimestampMigration:
+    """0009 rebuild tests."""
+
+    async def test_converts_text_timestamps(self, legacy_db):
+        """Test that existing timestamps become epoch milliseconds."""
+        await run_migrations(legacy_db)
+        conn = sqlite3.connect(legacy_db)
+        rows = conn.execute(
+            "SELECT title, created_at, updated_at, deleted_at FROM snippets ORDER BY id"
+        ).fetchall()
+        assert rows == [
+            ("live", 1704067200000, 1704196800250, None),
+            ("gone", 1704067200000, 1704067200000, 1706745600000),
+        ]
+        changed = conn.execute("SELECT DISTINCT typeof(changed_at) FROM snippet_changes").fetchall()
+        assert changed == [("integer",)]
+        conn.close()
+
+    async def test_keeps_triggers_and_sequence(self, legacy_db):
+        """Test that triggers, FTS, tag counts and the id high-water mark survive the rebuild."""
+        await run_migrations(legacy_db)
+        conn = sqlite3.connect(legacy_db)
+        triggers = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'snippets'"
+            )
+        }
+        assert triggers == TRIGGERS
+        assert conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'snippets'").fetchone() == (3,)
+
+        cursor = conn.execute(
+            "INSERT INTO snippets (title, content, tags, content_hash) VALUES ('new', 'hello again', '[\"py\"]', 'h4')"
+        )
+        assert cursor.lastrowid == 4
+        created = conn.execute("SELECT created_at FROM snippets WHERE id = 4").fetchone()[0]
+        assert abs(created - epoch_ms(datetime.utcnow())) < 60000
+        matches = conn.execute("SELECT rowid FROM snippets_fts WHERE snippets_fts MATCH 'hello' ORDER BY rowid")
+        assert matches.fetchall() == [(1,), (4,)]
+        assert conn.execute("SELECT count FROM tag_counts WHERE tag = 'py'").fetchone() == (2,)
+        conn.close()
+
+
+class TestTimeRangeFilters:
+    """GET /snippets created_after/updated_before tests."""
+
+    async def test_created_after_and_updated_before(self, client):
+        """Test that the bounds are exclusive and combine with tag filters."""
+        tag = f"range-{uuid.uuid4()}"
+        ids = []
+        for n in range(2):
+            response = await client.post("/snippets", json={"title": f"Range {n} {tag}", "content": "x", "tags": [tag]})
+            ids.append(response.json()["id"])
+            await asyncio.sleep(0.01)
+        first = (await client.get(f"/snippets/{ids[0]}")).json()
+        created = datetime.fromisoformat(first["created_at"])
+
+        response = await client.get("/snippets", params={"tag": tag, "created_after": created.isoformat()})
+        assert [s["id"] for s in response.json()["items"]] == [ids[1]]
+
+        before = (created + timedelta(milliseconds=1)).isoformat()
+        response = await client.get("/snippets", params={"tag": tag, "updated_before": before})
+        assert [s["id"] for s in response.json()["items"]] == [ids[0]]
+
+        response = await client.get("/snippets", params={"tag": tag, "created_after": "2000-01-01T00:00:00Z"})
+        assert response.json()["total"] == 2
+
+    async def test_invalid_bound_rejected(self, client):
+        """Test that an unparseable time is a validation error."""
+        response = await client.get("/snippets", params={"created_after": "yesterday"})
+        assert response.status_code == 422
+
+
+def test_epoch_ms_round_trip():
+    """Test that conversion keeps millisecond precision and treats naive times as UTC."""
+    dt = datetime(2024, 1, 2, 3, 4, 5, 678000)
+    assert from_epoch_ms(epoch_ms(dt)) == dt
+    assert epoch_ms(datetime.fromisoformat("2024-01-01T01:00:00+01:00")) == 1704067200000
+    assert from_epoch_ms(None) is None